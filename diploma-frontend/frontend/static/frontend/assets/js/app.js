@@ -95,9 +95,9 @@ createApp({
 		// },
 		addToBasket(item, count = 1) {
 			const { id } = item
-			this.postData('/api/basket', { id, count })
+			this.postData('/api/basket?delta=1', { id, count })
 				.then(({ data }) => {
-					this.basket = data
+					this.applyBasketDelta(data)
 				})
 				.catch(() => {
 					console.warn('Ошибка при добавлении заказа в корзину')
@@ -105,7 +105,7 @@ createApp({
 		},
 		removeFromBasket(id, count) {
 			axios
-				.delete('/api/basket', {
+				.delete('/api/basket?delta=1', {
 					data: JSON.stringify({ id, count }),
 					headers: {
 						'X-CSRFToken': this.getCookie('csrftoken'),
@@ -113,12 +113,21 @@ createApp({
 					},
 				})
 				.then(({ data }) => {
-					this.basket = data
+					this.applyBasketDelta(data)
 				})
 				.catch(() => {
 					console.warn('Ошибка при удалении заказа из корзины')
 				})
 		},
+		applyBasketDelta({ id, item }) {
+			const basket = { ...this.basket }
+			if (item) {
+				basket[id] = item
+			} else {
+				delete basket[id]
+			}
+			this.basket = basket
+		},
 		signOut() {
 			this.postData('/api/sign-out').finally(() => {
 				location.assign(`/`)
@@ -1,12 +1,11 @@
 var mix = {
 	methods: {
 		getHistoryOrder() {
-			this.getData("/api/orders")
+			this.getData("/api/orders", { cursor: this.ordersCursor || '' })
 				.then(data => {
-					console.log(data)
-					this.orders = data
+					this.orders = [...this.orders, ...data.items]
+					this.ordersCursor = data.nextCursor
 				}).catch(() => {
-				this.orders = []
 				console.warn('Ошибка при получении списка заказов')
 			})
 		}
@@ -17,6 +16,7 @@ var mix = {
 	data() {
 		return {
 			orders: [],
+			ordersCursor: null,
 		}
 	}
 }
\ No newline at end of file
@@ -17,14 +17,8 @@ var mix = {
 				year: this.year,
 				month: this.month,
 				code: this.code
-			}).then(() => {
-				alert('Успешная оплата')
-				this.number1 = ''
-				this.name = ''
-				this.year = ''
-				this.month = ''
-				this.code = ''
-				location.assign('/')
+			}, { 'Idempotency-Key': this.idempotencyKey }).then(() => {
+				location.assign(`/progress-payment/?order=${orderId}`)
 			}).catch(() => {
 			 	console.warn('Ошибка при оплате')
 			})
@@ -36,7 +30,8 @@ var mix = {
 			month: '',
 			year: '',
 			name: '',
-			code: ''
+			code: '',
+			idempotencyKey: window.crypto?.randomUUID ? window.crypto.randomUUID() : `${Date.now()}-${Math.random()}`
 		}
 	}
 }
\ No newline at end of file
@@ -33,7 +33,10 @@ var mix = {
                 text: this.review.text,
                 rate: this.review.rate
             }).then(({data}) => {
-                this.product.reviews = data
+                if (!this.product.reviewsCursor) {
+                    this.product.reviews = [...this.product.reviews, data]
+                }
+                this.product.reviewsCount += 1
                 alert('Отзыв опубликован')
                 this.review.author = ''
                 this.review.email = ''
@@ -43,6 +46,15 @@ var mix = {
                 console.warn('Ошибка при публикации отзыва')
             })
         },
+        getReviews() {
+            this.getData(`/api/product/${this.product.id}/reviews`, { cursor: this.product.reviewsCursor })
+                .then(data => {
+                    this.product.reviews = [...this.product.reviews, ...data.items]
+                    this.product.reviewsCursor = data.nextCursor
+                }).catch(() => {
+                    console.warn('Ошибка при получении отзывов')
+                })
+        },
         setActivePhoto(index) {
             this.activePhoto = index
         }
@@ -0,0 +1,28 @@
+var mix = {
+	methods: {
+		checkPayment() {
+			const orderId = new URLSearchParams(location.search).get('order')
+			if (!orderId) return
+			this.getData(`/api/payment/${orderId}`)
+				.then(({ status }) => {
+					if (status === 'succeeded') {
+						alert('Успешная оплата')
+						location.assign('/')
+					} else if (status === 'failed') {
+						alert('Ошибка при оплате')
+						location.assign(`/orders/${orderId}/`)
+					} else {
+						setTimeout(this.checkPayment, 1000)
+					}
+				}).catch(() => {
+					setTimeout(this.checkPayment, 3000)
+				})
+		}
+	},
+	mounted() {
+		this.checkPayment()
+	},
+	data() {
+		return {}
+	}
+}
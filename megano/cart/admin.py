@@ -1,3 +1,11 @@
 from django.contrib import admin
 
-# Register your models here.
+from cart.models import CartItem
+
+
+@admin.register(CartItem)
+class CartItemAdmin(admin.ModelAdmin):
+    """Настройки панели администратора для модели CartItem."""
+    list_display = ['pk', 'owner', 'product', 'count', 'price', 'updatedAt']
+    list_display_links = ['pk', 'owner']
+    ordering = ['pk']
@@ -0,0 +1,32 @@
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from django.http import HttpRequest, HttpResponse
+
+from cart.serializers import BasketSerializer
+from cart.views import BasketView, basket_products, get_cart_items
+from products.async_views import AsyncAPIView
+
+
+class AsyncBasketView(AsyncAPIView):
+    """
+    Асинхронное Api корзины (как BasketView): список товаров отдается асинхронно,
+    а добавление и удаление товаров выполняет синхронный BasketView.
+    """
+
+    basket_view = staticmethod(sync_to_async(BasketView.as_view()))
+
+    async def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        """Функция для получения списка товаров в корзине."""
+        # Сессия и корзина в базе данных читаются синхронным кодом, товары - асинхронным запросом.
+        items = await sync_to_async(get_cart_items)(request)
+        products = [product async for product in basket_products(items)]
+        return self.render(BasketSerializer(products, many=True, context=items).data)
+
+    async def post(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        """Функция для добавления товара в корзину."""
+        return await self.basket_view(request, *args, **kwargs)
+
+    async def delete(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        """Функция для удаления товара в корзине."""
+        return await self.basket_view(request, *args, **kwargs)
@@ -1,13 +1,20 @@
-import datetime
+import uuid
 from decimal import Decimal
-from typing import Any
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils.module_loading import import_string
 
 from megano.settings import CART_SESSION_ID
-from products.models import Product, Sale
+from products.models import Product
+
+from .models import CartItem
 
 
 class Cart(object):
-    """Класс Cart представляет корзину покупок в интернет-магазине."""
+    """Класс Cart представляет корзину покупок в интернет-магазине (хранится в сессии)."""
 
     def __init__(self, request: Any) -> None:
         """Функция для инициализации объекта Cart."""
@@ -20,19 +27,13 @@ class Cart(object):
     def add(self, product: Product, count: int) -> None:
         """Функция для добавления товаров в корзину."""
         product_id = str(product.id)
-        available_quantity = Product.objects.filter(pk=product.id).values('count').first()
-        if product_id not in self.cart and available_quantity != 0:
-            today = datetime.date.today()
-            sales = Sale.objects.filter(
-                dateFrom__lte=today, dateTo__gte=today, product=product_id).values('salePrice').first()
-            if sales:
-                self.cart[product_id] = {'count': count,
-                                         'price': str(sales['salePrice'])}
-            else:
-                self.cart[product_id] = {'count': count,
-                                         'price': str(product.price)}
+        stock = Product.objects.with_sale_price().filter(pk=product.id).values('count', 'price', 'sale_price').first()
+        if product_id not in self.cart:
+            price = stock['sale_price'] if stock['sale_price'] is not None else stock['price']
+            self.cart[product_id] = {'count': count,
+                                     'price': str(price)}
         else:
-            if available_quantity['count'] >= self.cart[product_id]['count'] + count:
+            if stock['count'] >= self.cart[product_id]['count'] + count:
                 self.cart[product_id]['count'] += count
         self.save()
 
@@ -76,3 +77,91 @@ class Cart(object):
         """Функция для сохранения состояние корзины в сессии."""
         self.session[CART_SESSION_ID] = self.cart
         self.session.modified = True
+
+
+class DatabaseCart(Cart):
+    """
+    Корзина, хранящая товары строками CartItem в базе данных.
+    В сессии хранится только токен анонимной корзины; корзина пользователя привязана к нему самому,
+    а анонимная корзина переносится к пользователю при первом запросе после входа.
+    """
+
+    def __init__(self, request: Any) -> None:
+        """Функция для инициализации объекта DatabaseCart."""
+        self.session = request.session
+        self.owner = self.get_owner(getattr(request, 'user', None))
+        self._cart: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def get_owner(self, user: Any) -> str:
+        """Функция для определения владельца корзины по пользователю или токену сессии."""
+        token = self.session.get(CART_SESSION_ID)
+        if not isinstance(token, str):
+            token = None
+        if user is not None and user.is_authenticated:
+            owner = f'user:{user.pk}'
+            if token:
+                self.merge(f'session:{token}', owner)
+                del self.session[CART_SESSION_ID]
+            return owner
+        if not token:
+            token = self.session[CART_SESSION_ID] = uuid.uuid4().hex
+        return f'session:{token}'
+
+    @staticmethod
+    def merge(source: str, target: str) -> None:
+        """Функция для переноса товаров корзины source в корзину target (совпадающие товары берутся из source)."""
+        with transaction.atomic():
+            CartItem.objects.filter(
+                owner=target, product__in=CartItem.objects.filter(owner=source).values('product')).delete()
+            CartItem.objects.filter(owner=source).update(owner=target)
+
+    @property
+    def cart(self) -> Dict[str, Dict[str, Any]]:
+        """Товары корзины в формате сессионной корзины: {id продукта: {'count', 'price'}}, одним запросом."""
+        if self._cart is None:
+            items = CartItem.objects.filter(owner=self.owner).values_list('product_id', 'count', 'price')
+            self._cart = {str(product_id): {'count': count, 'price': str(price)} for product_id, count, price in items}
+        return self._cart
+
+    def add(self, product: Product, count: int) -> None:
+        """
+        Функция для добавления товаров в корзину.
+        Количество уже добавленного товара увеличивается одним UPDATE с проверкой остатка,
+        новый товар добавляется с ценой на момент добавления.
+        """
+        items = CartItem.objects.filter(owner=self.owner, product=product)
+        if not items.filter(product__count__gte=F('count') + count).update(count=F('count') + count):
+            sale_price = product.get_sale_price()
+            CartItem.objects.bulk_create(
+                [CartItem(owner=self.owner, product=product, count=count,
+                          price=sale_price if sale_price is not None else product.price)],
+                ignore_conflicts=True,
+            )
+        self.save()
+
+    def remove(self, product: Product, count: int) -> None:
+        """Функция для удаления товаров из корзины"""
+        items = CartItem.objects.filter(owner=self.owner, product=product)
+        if count != 1 or not items.filter(count__gt=1).update(count=F('count') - 1):
+            items.delete()
+        self.save()
+
+    def __iter__(self) -> None:
+        """Итератор по товарам в корзине."""
+        for item in CartItem.objects.filter(owner=self.owner).select_related('product'):
+            yield {'count': item.count, 'price': item.price, 'product': item.product,
+                   'total_price': item.price * item.count}
+
+    def clear(self) -> None:
+        """Функция для очищения корзины от всех товаров."""
+        CartItem.objects.filter(owner=self.owner).delete()
+        self.save()
+
+    def save(self) -> None:
+        """Функция для сброса прочитанного состояния корзины (строки уже сохранены в базе)."""
+        self._cart = None
+
+
+def get_cart(request: Any) -> Cart:
+    """Функция для получения корзины запроса с бэкендом из настройки CART_BACKEND."""
+    return import_string(getattr(settings, 'CART_BACKEND', 'cart.cart.Cart'))(request)
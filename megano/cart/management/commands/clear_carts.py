@@ -0,0 +1,20 @@
+from datetime import timedelta
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.utils import timezone
+
+from cart.models import CartItem
+
+
+class Command(BaseCommand):
+    """Команда для удаления брошенных анонимных корзин бэкенда DatabaseCart (аналог clearsessions)."""
+    help = 'Delete anonymous cart items that have not been updated for the given number of days'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--days', type=int, default=30)
+
+    def handle(self, *args: Any, days: int, **options: Any) -> None:
+        deleted, _ = CartItem.objects.filter(
+            owner__startswith='session:', updatedAt__lt=timezone.now() - timedelta(days=days)).delete()
+        self.stdout.write(self.style.SUCCESS(f'Anonymous cart items deleted: {deleted}'))
@@ -1,3 +1,26 @@
 from django.db import models
 
-# Create your models here.
+from products.models import Product
+
+
+class CartItem(models.Model):
+    """
+    Модель для хранения строки корзины в базе данных (бэкенд корзины DatabaseCart).
+    owner - владелец корзины: 'user:<id>' для пользователя или 'session:<токен>' для анонимной сессии.
+    """
+    class Meta:
+        verbose_name = 'Cart item'
+        verbose_name_plural = 'Cart items'
+        ordering = ['pk']
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'product'], name='cart_item_owner_product'),
+        ]
+
+    owner = models.CharField(max_length=64)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='cart_items')
+    count = models.PositiveIntegerField(default=1)
+    price = models.DecimalField(max_digits=8, decimal_places=2)
+    updatedAt = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f'{self.owner}: {self.product_id} x {self.count}'
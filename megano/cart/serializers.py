@@ -3,18 +3,19 @@ from typing import Dict, List
 
 from rest_framework import serializers
 
+from products.images import responsive_image
 from products.models import Product
 
 
 class BasketSerializer(serializers.ModelSerializer):
-    """Сериализатор для корзины покупок."""
+    """Сериализатор для корзины покупок (только поля, нужные странице корзины)."""
     count = serializers.SerializerMethodField()
     price = serializers.SerializerMethodField()
     images = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
-        fields = '__all__'
+        fields = 'id', 'category', 'title', 'price', 'count', 'images'
 
     def get_count(self, obj: Product) -> int:
         """Функция для возвращения количества товаров в корзине."""
@@ -30,5 +31,5 @@ class BasketSerializer(serializers.ModelSerializer):
         images = []
         images_tmp = instance.images.all()
         for image in images_tmp:
-            images.append({"src": f"/media{image.__str__()}", "alt": image.name})
+            images.append({"src": f"/media{image.__str__()}", "alt": image.name, **responsive_image(image.variants)})
         return images
@@ -1,3 +1,100 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from products.models import Product, ProductImage, Sale
+
+from .models import CartItem
+
+
+@override_settings(CART_BACKEND='cart.cart.DatabaseCart')
+class DatabaseCartTestCase(TestCase):
+    """Тесты для бэкенда корзины DatabaseCart."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.product = Product.objects.create(title='product', price=100, count=3)
+        cls.sale_product = Product.objects.create(title='sale product', price=200, count=10)
+        Sale.objects.create(product=cls.sale_product, salePrice=150, dateFrom='2000-01-01', dateTo='2100-01-01')
+
+    def test_add_and_remove(self) -> None:
+        url = reverse('cart:basket')
+        self.client.post(url, {'id': self.product.pk, 'count': 2}, content_type='application/json')
+        self.client.post(url, {'id': self.product.pk, 'count': 2}, content_type='application/json')
+        response = self.client.post(url, {'id': self.sale_product.pk, 'count': 1}, content_type='application/json')
+        self.assertEqual({item['id']: (item['count'], item['price']) for item in response.json()},
+                         {self.product.pk: (2, 100), self.sale_product.pk: (1, 150)})
+        self.assertIsInstance(self.client.session['cart'], str)
+
+        self.client.delete(url, {'id': self.product.pk, 'count': 1}, content_type='application/json')
+        self.assertEqual(CartItem.objects.get(product=self.product).count, 1)
+        self.client.delete(url, {'id': self.product.pk, 'count': 1}, content_type='application/json')
+        self.assertFalse(CartItem.objects.filter(product=self.product).exists())
+
+    def test_anonymous_cart_moves_to_user(self) -> None:
+        url = reverse('cart:basket')
+        self.client.post(url, {'id': self.product.pk, 'count': 1}, content_type='application/json')
+        user = User.objects.create_user(username='user', password='password')
+        self.client.force_login(user)
+        response = self.client.get(url)
+        self.assertEqual([item['id'] for item in response.json()], [self.product.pk])
+        self.assertEqual(list(CartItem.objects.values_list('owner', 'price')), [(f'user:{user.pk}', Decimal('100'))])
+
+
+class BasketViewTestCase(TestCase):
+    """Тесты для Api корзины."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.products = [Product.objects.create(title=f'product {number}', price=10, count=5) for number in range(20)]
+        for product in cls.products:
+            ProductImage.objects.create(product=product, image=f'products/images/{product.pk}.webp')
+
+    def test_basket_query_count_does_not_depend_on_size(self) -> None:
+        url = reverse('cart:basket')
+        for products in (self.products[:2], self.products[2:]):
+            for product in products:
+                self.client.post(url, {'id': product.pk, 'count': 1}, content_type='application/json')
+            with self.assertNumQueries(3):
+                response = self.client.get(url)
+        self.assertEqual(len(response.json()), 20)
+        self.assertEqual(set(response.json()[0]), {'id', 'category', 'title', 'price', 'count', 'images'})
+
+    def test_delta_response(self) -> None:
+        url = reverse('cart:basket') + '?delta=1'
+        product = self.products[0]
+        self.client.post(url, {'id': self.products[1].pk, 'count': 1}, content_type='application/json')
+        data = self.client.post(url, {'id': product.pk, 'count': 2}, content_type='application/json').json()
+        self.assertEqual((data['id'], data['item']['count'], data['totalCount'], data['totalPrice']),
+                         (product.pk, 2, 3, 30))
+
+        response = self.client.delete(url, {'id': product.pk, 'count': 2}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['item'], response.json()['totalCount']), (None, 1))
+
+
+
+class AsyncBasketViewTestCase(TestCase):
+    """Тесты для асинхронного Api корзины ASGI-развертывания."""
+
+    def test_basket_matches_sync_view(self) -> None:
+        products = [Product.objects.create(title=f'product {number}', price=10, count=5) for number in range(3)]
+
+        async def basket() -> HttpResponse:
+            for product in products:
+                response = await self.async_client.post(
+                    '/api/basket', {'id': product.pk, 'count': 1}, content_type='application/json')
+                self.assertEqual(response.status_code, 200)
+            return await self.async_client.get('/api/basket')
+
+        with override_settings(ROOT_URLCONF=settings.ASGI_URLCONF):
+            response = async_to_sync(basket)()
+        self.assertEqual([item['id'] for item in response.json()], [product.pk for product in products])
+
+        self.client.cookies = self.async_client.cookies
+        self.assertEqual(response.json(), self.client.get('/api/basket').json())
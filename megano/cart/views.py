@@ -1,23 +1,64 @@
+from typing import Any, Dict
+
+from django.db.models import QuerySet
 from drf_spectacular.types import OpenApiTypes
 from rest_framework.decorators import api_view
 from rest_framework.generics import get_object_or_404
+from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiExample, OpenApiRequest, OpenApiParameter
 from rest_framework import serializers
 
-from cart.cart import Cart
+from cart.cart import Cart, get_cart
 from cart.serializers import BasketSerializer
 from products.models import Product
 
 
+BASKET_PRODUCT_FIELDS = 'id', 'category', 'title', 'price'
+
+
+def basket_products(items: Dict[str, Dict[str, Any]]) -> QuerySet[Product]:
+    """Функция для запроса товаров корзины (изображения загружаются одним запросом для всех товаров)."""
+    return Product.objects.filter(pk__in=list(items)).only(*BASKET_PRODUCT_FIELDS).prefetch_related('images')
+
+
 def get_products(cart: Cart) -> BasketSerializer:
-    """Функция для получения товаров в корзине"""
-    products_in_cart = [product for product in cart.cart.keys()]
-    products = Product.objects.filter(pk__in=products_in_cart)
-    serializer = BasketSerializer(products, many=True, context=cart.cart)
+    """Функция для получения товаров в корзине."""
+    serializer = BasketSerializer(basket_products(cart.cart), many=True, context=cart.cart)
     return serializer
+
+
+def get_cart_items(request: Any) -> Dict[str, Dict[str, Any]]:
+    """Функция для получения строк корзины запроса: {id продукта: {'count', 'price'}}."""
+    return get_cart(request).cart
+
+
+def get_basket_product(request: Request) -> Product:
+    """Функция для получения продукта из тела запроса к корзине."""
+    products = Product.objects.only(*BASKET_PRODUCT_FIELDS).prefetch_related('images')
+    return get_object_or_404(products, id=request.data.get('id'))
+
+
+def get_delta(cart: Cart, product: Product) -> Dict[str, Any]:
+    """
+    Функция для получения изменения корзины: измененная строка (None, если товар удален из корзины)
+    и итоги корзины.
+    """
+    item = BasketSerializer(product, context=cart.cart).data if str(product.pk) in cart.cart else None
+    return {'id': product.pk, 'item': item, 'totalCount': cart.total_count(), 'totalPrice': cart.total_price()}
+
+
+def is_delta(request: Request) -> bool:
+    """Функция для проверки, запрошен ли ответ только с изменением корзины (параметр delta)."""
+    return request.GET.get('delta') in ('1', 'true')
+
+
+DELTA_PARAMETER = OpenApiParameter(
+    'delta', OpenApiTypes.BOOL, description='Вернуть только измененную строку корзины и итоги (id, item, totalCount, totalPrice)')
+
+
 class OrderIdSerialize(serializers.Serializer):
     """Сериализатор для Order id"""
     id = serializers.IntegerField()
@@ -31,12 +72,13 @@ class BasketView(APIView):
     def get(self, *args, **kwargs) -> Response:
         """Функция для получения списока товаров в корзине."""
 
-        cart = Cart(self.request)
+        cart = get_cart(self.request)
         serializer = get_products(cart)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
     @extend_schema(
+        parameters=[DELTA_PARAMETER],
         responses={
             status.HTTP_200_OK: OpenApiResponse(
                 response=serializer_class,
@@ -63,15 +105,17 @@ class BasketView(APIView):
     def post(self, *args, **kwargs) -> Response:
         """Функция для добавления товара в корзину."""
 
-        cart = Cart(self.request)
-        product = get_object_or_404(Product, id=self.request.data.get('id'))
+        cart = get_cart(self.request)
+        product = get_basket_product(self.request)
         cart.add(product=product, count=self.request.data.get('count'))
+        if is_delta(self.request):
+            return Response(get_delta(cart, product), status=status.HTTP_200_OK)
         serializer = get_products(cart)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
     @extend_schema(
-
+        parameters=[DELTA_PARAMETER],
         responses={
             status.HTTP_204_NO_CONTENT: OpenApiResponse(
                 response=serializer_class,
@@ -83,9 +127,11 @@ class BasketView(APIView):
     def delete(self, *args, **kwargs) -> Response:
         """Функция для удаления товара в корзине"""
 
-        cart = Cart(self.request)
-        product = get_object_or_404(Product, id=self.request.data.get('id'))
+        cart = get_cart(self.request)
+        product = get_basket_product(self.request)
         count = self.request.data.get('count', False)
         cart.remove(product, count=count)
+        if is_delta(self.request):
+            return Response(get_delta(cart, product), status=status.HTTP_200_OK)
         serializer = get_products(cart)
         return Response(serializer.data, status=status.HTTP_204_NO_CONTENT)
@@ -2,6 +2,8 @@
 ASGI config for megano project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests are resolved with settings.ASGI_URLCONF, which serves the hot read
+endpoints with async views.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -9,8 +11,21 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.http import HttpRequest, HttpResponse
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'megano.settings')
 
-application = get_asgi_application()
+
+class MeganoASGIHandler(ASGIHandler):
+    """ASGI-обработчик, разрешающий адреса по settings.ASGI_URLCONF (асинхронные Api)."""
+
+    async def get_response_async(self, request: HttpRequest) -> HttpResponse:
+        request.urlconf = settings.ASGI_URLCONF
+        return await super().get_response_async(request)
+
+
+django.setup(set_prefix=False)
+application = MeganoASGIHandler()
@@ -0,0 +1,20 @@
+"""
+URL configuration for the ASGI deployment (settings.ASGI_URLCONF).
+
+Hot read endpoints are served by async views; every other URL falls through to megano.urls.
+"""
+from django.urls import path
+
+from cart.async_views import AsyncBasketView
+from products.async_views import AsyncCategoryList, AsyncProductDetail, AsyncProductListView, AsyncTagsList
+
+from .urls import urlpatterns as wsgi_urlpatterns
+
+urlpatterns = [
+    path('api/product/<int:pk>/', AsyncProductDetail.as_view(), name='product_detail'),
+    path('api/tags/', AsyncTagsList.as_view(), name='tags_list'),
+    path('api/categories/', AsyncCategoryList.as_view(), name='categories_list'),
+    path('api/catalog/', AsyncProductListView.as_view(), name='product-list'),
+    path('api/basket', AsyncBasketView.as_view(), name='basket'),
+    path('api/cart/', AsyncBasketView.as_view(), name='cart'),
+] + wsgi_urlpatterns
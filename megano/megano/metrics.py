@@ -0,0 +1,117 @@
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# Границы корзин гистограмм: время в секундах и количество запросов к базе данных.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+Labels = Tuple[str, ...]
+
+
+def escape_label(value: str) -> str:
+    """Функция для экранирования значения метки в текстовом формате Prometheus."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names: Sequence[str], values: Labels, extra: str = '') -> str:
+    """Функция для записи меток в виде {name="value",...}."""
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def format_value(value: float) -> str:
+    """Функция для записи значения метрики (целые - без дробной части)."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Счетчик Prometheus с метками, хранящийся в памяти процесса."""
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values: Dict[Labels, float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, labels: Labels, amount: float = 1) -> None:
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self.lock:
+            values = sorted(self.values.items())
+        for labels, value in values:
+            yield f'{self.name}{format_labels(self.labels, labels)} {format_value(value)}'
+
+
+class Histogram:
+    """Гистограмма Prometheus с метками, хранящаяся в памяти процесса."""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str], buckets: Sequence[float]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Для каждой комбинации меток: количества по корзинам (последняя - +Inf) и сумма наблюдений.
+        self.values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels: Labels, value: float) -> None:
+        with self.lock:
+            counts, total = self.values.setdefault(labels, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def samples(self) -> Iterable[str]:
+        with self.lock:
+            values = sorted((labels, (list(counts), total[0])) for labels, (counts, total) in self.values.items())
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="{}"'.format('+Inf' if bound == float('inf') else format_value(bound))
+                yield f'{self.name}_bucket{format_labels(self.labels, labels, le)} {cumulative}'
+            yield f'{self.name}_sum{format_labels(self.labels, labels)} {format_value(total)}'
+            yield f'{self.name}_count{format_labels(self.labels, labels)} {cumulative}'
+
+
+ROUTE_LABELS = ('route', 'method')
+
+REQUEST_DURATION = Histogram(
+    'megano_request_duration_seconds', 'Request wall time by route.', ROUTE_LABELS, DURATION_BUCKETS)
+DB_QUERIES = Histogram(
+    'megano_db_queries', 'Database queries per request by route.', ROUTE_LABELS, COUNT_BUCKETS)
+DB_DURATION = Histogram(
+    'megano_db_duration_seconds', 'Database time per request by route.', ROUTE_LABELS, DURATION_BUCKETS)
+SERIALIZER_DURATION = Histogram(
+    'megano_serializer_duration_seconds', 'Serializer time per request by route (including lazy queries).',
+    ROUTE_LABELS, DURATION_BUCKETS)
+DUPLICATE_QUERIES = Counter(
+    'megano_db_duplicate_queries_total', 'Queries repeating an earlier query of the same request (N+1 lookups).',
+    ROUTE_LABELS)
+RESPONSES = Counter('megano_responses_total', 'Responses by route and status code.', ROUTE_LABELS + ('status',))
+
+METRICS = [REQUEST_DURATION, DB_QUERIES, DB_DURATION, SERIALIZER_DURATION, DUPLICATE_QUERIES, RESPONSES]
+
+
+def render_metrics() -> str:
+    """Функция для вывода всех метрик процесса в текстовом формате Prometheus."""
+    lines: List[str] = []
+    for metric in METRICS:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+def reset_metrics() -> None:
+    """Функция для очистки всех метрик процесса."""
+    for metric in METRICS:
+        with metric.lock:
+            metric.values.clear()
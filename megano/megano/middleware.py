@@ -0,0 +1,159 @@
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Optional, Union
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.utils import CursorWrapper
+from django.http import HttpRequest, HttpResponse
+from rest_framework.serializers import ListSerializer, Serializer
+
+from .metrics import DB_DURATION, DB_QUERIES, DUPLICATE_QUERIES, REQUEST_DURATION, RESPONSES, SERIALIZER_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+class RequestStats:
+    """Статистика одного запроса: запросы к базе данных (по тексту SQL), время базы и сериализаторов."""
+
+    def __init__(self) -> None:
+        self.queries: Counter = Counter()
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+    def __call__(self, execute: Callable, sql: str, params: Any, many: bool, context: Any) -> Any:
+        """Обертка выполнения SQL (сигнатура connection.execute_wrapper): считает запрос и его время."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries[sql] += 1
+
+    def duplicates(self) -> int:
+        """Количество запросов, повторяющих SQL уже выполненного в этом запросе (с другими параметрами)."""
+        return sum(count - 1 for count in self.queries.values() if count > 1)
+
+
+current_stats: ContextVar[Optional[RequestStats]] = ContextVar('megano_request_stats', default=None)
+
+
+def timed_data(data: property) -> property:
+    """
+    Функция для замера свойства data сериализатора. Время вложенных сериализаторов
+    учитывается один раз - во внешнем.
+    """
+    def wrapper(serializer: Any) -> Any:
+        stats = current_stats.get()
+        if stats is None or stats.serializing:
+            return data.fget(serializer)
+        stats.serializing = True
+        started = time.perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            stats.serializer_time += time.perf_counter() - started
+            stats.serializing = False
+    wrapper.timed = True
+    return property(wrapper)
+
+
+def instrument_serializers() -> None:
+    """Функция для подключения замера времени к сериализаторам DRF (один раз на процесс)."""
+    for serializer_class in (Serializer, ListSerializer):
+        if not getattr(serializer_class.data.fget, 'timed', False):
+            serializer_class.data = timed_data(serializer_class.data)
+
+
+def recorded_execute(execute: Callable, many: bool) -> Callable:
+    """
+    Функция для записи SQL курсора в статистику текущего запроса (current_stats). Переменная контекста
+    переходит в потоки sync_to_async, поэтому учитываются и соединения асинхронного ORM.
+    """
+    def wrapper(cursor: CursorWrapper, sql: str, params: Any = None) -> Any:
+        stats = current_stats.get()
+        if stats is None:
+            return execute(cursor, sql, params)
+        return stats(lambda sql, params, many, context: execute(cursor, sql, params),
+                     sql, params, many, {'connection': cursor.db, 'cursor': cursor})
+    wrapper.recorded = True
+    return wrapper
+
+
+def instrument_cursors() -> None:
+    """
+    Функция для подключения учета SQL к курсорам Django (один раз на процесс): в отличие от
+    connection.execute_wrapper, действует на соединения всех потоков, в том числе открытые раньше.
+    """
+    for name, many in (('execute', False), ('executemany', True)):
+        method = getattr(CursorWrapper, name)
+        if not getattr(method, 'recorded', False):
+            setattr(CursorWrapper, name, recorded_execute(method, many))
+
+
+class InstrumentationMiddleware:
+    """
+    Middleware для метрик по маршрутам: время запроса, количество и время запросов к базе данных,
+    время сериализаторов и повторяющиеся запросы (N+1). Метрики копятся в памяти процесса
+    (megano.metrics) и отдаются администраторам Api /api/metrics в формате Prometheus.
+    Если SQL повторяется в одном запросе не меньше INSTRUMENTATION_DUPLICATE_QUERY_LOG раз,
+    маршрут и запрос пишутся в журнал (один раз для каждой пары).
+    Работает и синхронно (WSGI), и асинхронно (ASGI), не переводя асинхронные Api в потоки.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], Union[HttpResponse, Awaitable[HttpResponse]]]) -> None:
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.reported = set()
+        instrument_serializers()
+        instrument_cursors()
+
+    def __call__(self, request: HttpRequest) -> Union[HttpResponse, Awaitable[HttpResponse]]:
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        self.record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        """Асинхронный вариант __call__ для ASGI."""
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        self.record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    def record(self, request: HttpRequest, response: HttpResponse, stats: RequestStats, duration: float) -> None:
+        """Добавляет статистику запроса в метрики маршрута."""
+        match = getattr(request, 'resolver_match', None)
+        labels = (match.route if match else 'unmatched', request.method)
+        REQUEST_DURATION.observe(labels, duration)
+        DB_QUERIES.observe(labels, sum(stats.queries.values()))
+        DB_DURATION.observe(labels, stats.db_time)
+        SERIALIZER_DURATION.observe(labels, stats.serializer_time)
+        RESPONSES.inc(labels + (str(response.status_code),))
+        duplicates = stats.duplicates()
+        if duplicates:
+            DUPLICATE_QUERIES.inc(labels, duplicates)
+            sql, count = stats.queries.most_common(1)[0]
+            threshold = getattr(settings, 'INSTRUMENTATION_DUPLICATE_QUERY_LOG', 5)
+            if count >= threshold and (labels, sql) not in self.reported:
+                self.reported.add((labels, sql))
+                logger.warning('%s %s runs the same query %s times: %s', labels[1], labels[0], count, sql)
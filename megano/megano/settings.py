@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'megano.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,8 +64,16 @@ MIDDLEWARE = [
 ]
 
 
+# InstrumentationMiddleware собирает метрики по маршрутам (время, запросы к базе, сериализаторы) для /api/metrics
+# и пишет в журнал маршруты, в которых один SQL повторяется не меньше INSTRUMENTATION_DUPLICATE_QUERY_LOG раз.
+INSTRUMENTATION_DUPLICATE_QUERY_LOG = 5
+
 ROOT_URLCONF = 'megano.urls'
 
+# Адреса для ASGI-развертывания (megano.asgi): каталог, продукт, категории, теги и корзина
+# обслуживаются асинхронными Api, остальные адреса - как в ROOT_URLCONF.
+ASGI_URLCONF = 'megano.asgi_urls'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -95,6 +104,26 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Кэш ответов витрины, их поколений и дерева категорий. Кэш должен быть общим для всех процессов:
+# поколения сбрасывают и процессы сервера, и команды (activate_sales, import_products, apply_supply),
+# поэтому кэш в памяти процесса (LocMemCache) подходит только для одного процесса без команд.
+# Для нескольких серверов используйте Redis или Memcached. Тесты работают с кэшем в памяти (megano.test_runner).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    }
+}
+
+TEST_RUNNER = 'megano.test_runner.TestRunner'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -130,9 +159,24 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'uploads'
 
+# collectstatic добавляет в имена статических файлов хэш содержимого и сохраняет сжатые копии (.gz, .br).
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'megano.storage.CompressedManifestStaticFilesStorage'},
+}
+
+# Статика (без DEBUG) и медиа отдаются представлениями megano.views.serve_static/serve_media:
+# файлы с хэшем содержимого в имени кэшируются браузером на год как неизменяемые,
+# остальные - на FILES_MAX_AGE секунд с проверкой по ETag/Last-Modified.
+FILES_MAX_AGE = 60 * 60
+# Префикс внутреннего location nginx (например, '/internal'): если задан, файл отдает nginx
+# по заголовку X-Accel-Redirect (<префикс><адрес файла>), а веб-процесс только проверяет запрос.
+FILES_ACCEL_REDIRECT = ''
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -161,3 +205,29 @@ SPECTACULAR_SETTINGS = {
 }
 
 CART_SESSION_ID = 'cart'
+
+# Бэкенд корзины: 'cart.cart.Cart' хранит корзину в сессии,
+# 'cart.cart.DatabaseCart' - строками CartItem в базе данных (в сессии остается только токен).
+CART_BACKEND = 'cart.cart.Cart'
+
+# Время (в секундах), на которое резервируются товары оформленного заказа до оплаты.
+# Просроченные резервы снимаются командой: python manage.py release_expired_reservations
+STOCK_RESERVATION_TIMEOUT = 30 * 60
+
+# Оплаты обрабатываются из очереди PaymentAttempt: пулом из PAYMENT_WORKER_THREADS потоков веб-процесса
+# и/или командой python manage.py process_payments (тогда пул в веб-процессе можно отключить, указав 0).
+# Попытка, зависшая в обработке дольше PAYMENT_PROCESSING_TIMEOUT секунд, обрабатывается заново.
+PAYMENT_WORKER_THREADS = 2
+PAYMENT_PROCESSING_TIMEOUT = 60
+
+# Отдавать каталог, популярные и лимитированные товары из таблицы ProductCatalogEntry.
+# Перед включением заполните таблицу командой: python manage.py rebuild_catalog
+CATALOG_READ_MODEL = False
+
+# Уменьшенные копии загруженных изображений продуктов и иконок категорий (ширина в пикселях и форматы).
+# Копии строятся пулом из IMAGE_WORKER_THREADS потоков веб-процесса (0 - сразу при сохранении);
+# для уже загруженных изображений: python manage.py build_image_derivatives.
+# В srcset попадает первый формат; 'avif' пропускается, если его не поддерживает установленный Pillow.
+IMAGE_DERIVATIVE_WIDTHS = [160, 320, 640]
+IMAGE_DERIVATIVE_FORMATS = ['webp']
+IMAGE_WORKER_THREADS = 2
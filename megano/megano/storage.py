@@ -0,0 +1,63 @@
+import gzip
+import re
+from typing import Any, Dict, Iterator, Tuple
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # brotli - необязательная зависимость: без нее собираются только .gz
+    brotli = None
+
+# Имя файла с хэшем содержимого: style.0123456789ab.css (статика) или 1.jpg.0123456789ab.320w.webp (копии медиа).
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.')
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.html', '.txt', '.json', '.xml', '.map', '.ico', '.ttf', '.eot')
+# Файлы меньше этого размера не сжимаются: выигрыш меньше накладных расходов.
+MIN_COMPRESS_SIZE = 256
+
+# Суффиксы сжатых копий в порядке предпочтения и соответствующие значения Content-Encoding.
+ENCODINGS = (('.br', 'br'), ('.gz', 'gzip'))
+
+
+def compress(data: bytes) -> Dict[str, bytes]:
+    """Функция для сжатия содержимого всеми доступными способами: {суффикс: сжатые данные}."""
+    compressed = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressed['.br'] = brotli.compress(data)
+    return compressed
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Хранилище статики для collectstatic: файлы получают хэш содержимого в имени (staticfiles.json - манифест
+    соответствия имен), а текстовые файлы дополнительно сохраняются сжатыми (.gz и, если установлен brotli, .br),
+    чтобы отдавать их без сжатия на лету.
+    Пока collectstatic не запускался (разработка, тесты), {% static %} возвращает исходные имена.
+    """
+
+    def stored_name(self, name: str) -> str:
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths: Dict[str, Any], dry_run: bool = False,
+                     **options: Any) -> Iterator[Tuple[str, str, Any]]:
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = {name for name in paths if name.endswith(COMPRESSIBLE_EXTENSIONS)}
+        names.update(name for name in self.hashed_files.values() if name.endswith(COMPRESSIBLE_EXTENSIONS))
+        for name in sorted(names):
+            for suffix, _ in ENCODINGS:
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+            with self.open(name) as file:
+                data = file.read()
+            if len(data) < MIN_COMPRESS_SIZE:
+                continue
+            for suffix, content in compress(data).items():
+                if len(content) < len(data):
+                    self._save(name + suffix, ContentFile(content))
+                    yield name, name + suffix, True
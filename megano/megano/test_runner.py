@@ -0,0 +1,27 @@
+from typing import Any
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'megano-tests',
+    }
+}
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Запуск тестов с кэшем в памяти процесса: общий файловый кэш сервера не влияет на тесты
+    (закэшированные ответы и поколения прошлых запусков) и не засоряется ими.
+    """
+
+    def setup_test_environment(self, **kwargs: Any) -> None:
+        super().setup_test_environment(**kwargs)
+        self.caches_override = override_settings(CACHES=TEST_CACHES)
+        self.caches_override.enable()
+
+    def teardown_test_environment(self, **kwargs: Any) -> None:
+        self.caches_override.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,151 @@
+import gzip
+import shutil
+import tempfile
+from pathlib import Path
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.templatetags.static import static
+from django.test import TestCase, override_settings
+
+from products.models import Product, Sale
+
+from .metrics import render_metrics, reset_metrics
+from .middleware import RequestStats, current_stats, instrument_cursors
+
+
+class InstrumentationTestCase(TestCase):
+    """Тесты для InstrumentationMiddleware и Api метрик."""
+
+    def setUp(self) -> None:
+        cache.clear()
+        reset_metrics()
+        for number in range(3):
+            product = Product.objects.create(title=f'product {number}', price=100)
+            Sale.objects.create(product=product, salePrice=50, dateFrom='2000-01-01', dateTo='2100-01-01')
+
+    def test_route_metrics(self) -> None:
+        self.client.get('/api/catalog/')
+        self.client.get('/api/catalog/')
+        metrics = render_metrics()
+        self.assertIn('megano_request_duration_seconds_count{route="api/catalog/",method="GET"} 2', metrics)
+        self.assertIn('megano_db_queries_sum{route="api/catalog/",method="GET"} 10', metrics)
+        self.assertIn('megano_responses_total{route="api/catalog/",method="GET",status="200"} 2', metrics)
+        self.assertIn('megano_serializer_duration_seconds_count{route="api/catalog/",method="GET"} 2', metrics)
+
+    @override_settings(ROOT_URLCONF=settings.ASGI_URLCONF, DEBUG=True)
+    def test_asgi_route_metrics(self) -> None:
+        async def get() -> None:
+            await self.async_client.get('/api/catalog/')
+            await self.async_client.get(f'/api/product/{product.pk}/')
+
+        product = Product.objects.first()
+        # С DEBUG Django пишет в журнал django.request каждый перевод middleware между sync и async
+        with self.assertNoLogs('django.request', 'DEBUG'):
+            async_to_sync(get)()
+        metrics = render_metrics()
+        self.assertIn('megano_request_duration_seconds_count{route="api/catalog/",method="GET"} 1', metrics)
+        self.assertIn('megano_db_queries_sum{route="api/catalog/",method="GET"} 5', metrics)
+        self.assertIn('megano_db_queries_sum{route="api/product/<int:pk>/",method="GET"} 5', metrics)
+        self.assertIn('megano_serializer_duration_seconds_count{route="api/catalog/",method="GET"} 1', metrics)
+
+    def test_queries_of_other_threads_are_counted(self) -> None:
+        def query() -> None:
+            try:
+                with connections['default'].cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            finally:
+                connections.close_all()
+
+        instrument_cursors()
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        try:
+            async_to_sync(sync_to_async(query, thread_sensitive=False))()
+        finally:
+            current_stats.reset(token)
+        self.assertEqual(sum(stats.queries.values()), 1)
+
+    @override_settings(INSTRUMENTATION_DUPLICATE_QUERY_LOG=3)
+    def test_duplicate_queries_are_counted_and_logged(self) -> None:
+        with self.assertLogs('megano.middleware', 'WARNING') as logs:
+            self.client.get('/api/sales/')
+        self.assertIn('GET api/sales/ runs the same query 3 times', logs.output[0])
+        self.assertIn('megano_db_duplicate_queries_total{route="api/sales/",method="GET"}', render_metrics())
+
+    def test_metrics_endpoint_is_admin_only(self) -> None:
+        self.client.get('/api/catalog/')
+        self.assertEqual(self.client.get('/api/metrics').status_code, 403)
+        self.client.force_login(User.objects.create_superuser(username='admin', password='admin'))
+        response = self.client.get('/api/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('# TYPE megano_request_duration_seconds histogram', response.content.decode())
+        self.assertIn('le="+Inf"', response.content.decode())
+
+
+class FileServingTestCase(TestCase):
+    """Тесты для сборки статики с хэшами и сжатыми копиями и для отдачи статики и медиа."""
+
+    def setUp(self) -> None:
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        for directory in ('source', 'static', 'media'):
+            (self.root / directory).mkdir()
+        settings_override = override_settings(
+            STATICFILES_DIRS=[self.root / 'source'], STATIC_ROOT=self.root / 'static', MEDIA_ROOT=self.root / 'media',
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'])
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_collected_static_is_hashed_compressed_and_immutable(self) -> None:
+        css = 'body { background: url("logo.svg"); }\n' * 50
+        (self.root / 'source' / 'style.css').write_text(css)
+        (self.root / 'source' / 'logo.svg').write_text('<svg xmlns="http://www.w3.org/2000/svg"></svg>')
+        self.assertEqual(static('style.css'), '/static/style.css')
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+        url = static('style.css')
+        self.assertRegex(url, r'^/static/style\.[0-9a-f]{12}\.css$')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertIn('logo.', gzip.decompress(b''.join(response.streaming_content)).decode())
+
+        response = self.client.get('/static/style.css')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+        self.assertEqual(response['Content-Type'], 'text/css')
+
+    def test_media_conditional_and_range_requests(self) -> None:
+        (self.root / 'media' / 'photo.0123456789ab.320w.webp').write_bytes(bytes(range(256)) * 4)
+        url = '/media/photo.0123456789ab.320w.webp'
+        response = self.client.get(url)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Content-Length'], '1024')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+        response = self.client.get(url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+        response = self.client.get(url, HTTP_RANGE='bytes=-4')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(252, 256)))
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=2000-').status_code, 416)
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"').status_code, 200)
+
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, 404)
+        self.assertEqual(self.client.get('/media/missing.webp').status_code, 404)
+
+    @override_settings(FILES_ACCEL_REDIRECT='/internal')
+    def test_accel_redirect(self) -> None:
+        (self.root / 'media' / 'photo.webp').write_bytes(b'data')
+        response = self.client.get('/media/photo.webp')
+        self.assertEqual(response['X-Accel-Redirect'], '/internal/media/photo.webp')
+        self.assertEqual(response.content, b'')
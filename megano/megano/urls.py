@@ -15,14 +15,16 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
+from .views import MetricsView, serve_media, serve_static
+
 urlpatterns = [
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='docs'),
+    path('api/metrics', MetricsView.as_view(), name='metrics'),
     path("", include("frontend.urls")),
     path("", include("products.urls")),
     path("", include("users.urls")),
@@ -31,7 +33,12 @@ urlpatterns = [
     path('admin/', admin.site.urls),
 ]
 
-if settings.DEBUG:
-    urlpatterns.extend(
-        static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+urlpatterns.append(
+    re_path(rf'^{settings.MEDIA_URL.strip("/")}/(?P<path>.+)$', serve_media, name='media')
+)
+
+# При DEBUG статику из приложений отдает runserver, без DEBUG - собранную collectstatic из STATIC_ROOT.
+if not settings.DEBUG:
+    urlpatterns.append(
+        re_path(rf'^{settings.STATIC_URL.strip("/")}/(?P<path>.+)$', serve_static, name='static')
     )
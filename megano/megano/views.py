@@ -0,0 +1,158 @@
+import mimetypes
+import posixpath
+import re
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpRequest, HttpResponse, HttpResponseNotAllowed,
+                         HttpResponseNotModified, StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags
+from django.views.static import was_modified_since
+from rest_framework.permissions import IsAdminUser
+from rest_framework.request import Request
+from rest_framework.views import APIView
+
+from .metrics import render_metrics
+from .storage import ENCODINGS, HASHED_NAME
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+BLOCK_SIZE = 64 * 1024
+
+
+class MetricsView(APIView):
+    """Api для метрик процесса (InstrumentationMiddleware) в текстовом формате Prometheus, только для администраторов"""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request: Request) -> HttpResponse:
+        return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def cache_control(path: str) -> str:
+    """Функция для заголовка Cache-Control: файлы с хэшем содержимого в имени не меняются."""
+    if HASHED_NAME.search(posixpath.basename(path)):
+        return f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return f'public, max-age={settings.FILES_MAX_AGE}'
+
+
+def accepted_encoding(request: HttpRequest, fullpath: Path) -> Tuple[Path, Optional[str]]:
+    """Функция для выбора заранее сжатой копии файла (.br, .gz), которую принимает клиент."""
+    accepted = {value.split(';')[0].strip() for value in request.META.get('HTTP_ACCEPT_ENCODING', '').split(',')}
+    for suffix, encoding in ENCODINGS:
+        compressed = fullpath.with_name(fullpath.name + suffix)
+        if encoding in accepted and compressed.is_file():
+            return compressed, encoding
+    return fullpath, None
+
+
+def not_modified(request: HttpRequest, etag: str, mtime: float) -> bool:
+    """Функция для проверки условного запроса (If-None-Match, иначе If-Modified-Since)."""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in parse_etags(if_none_match)
+    return not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), int(mtime))
+
+
+def requested_range(request: HttpRequest, etag: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Функция для разбора заголовка Range с одним диапазоном байтов: (начало, конец включительно)
+    или None, если нужен весь файл. Несколько диапазонов и устаревший If-Range дают весь файл,
+    недопустимый диапазон - ValueError.
+    """
+    header = request.META.get('HTTP_RANGE')
+    if not header or request.META.get('HTTP_IF_RANGE', etag) != etag:
+        return None
+    match = RANGE.match(header.strip())
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def read_range(fullpath: Path, start: int, length: int) -> Iterator[bytes]:
+    """Функция для чтения части файла блоками."""
+    with open(fullpath, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            block = file.read(min(BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def serve_file(request: HttpRequest, path: str, document_root: Path, url: str) -> HttpResponse:
+    """
+    Функция для отдачи файла из document_root: заголовки долгого кэширования (cache_control), ETag
+    и Last-Modified с ответом 304 на условные запросы, заранее сжатые копии, запросы диапазонов (206).
+    Файл целиком отдается через FileResponse, то есть wsgi.file_wrapper сервера (sendfile без копирования
+    в веб-процессе); если задан FILES_ACCEL_REDIRECT, файл отдает nginx по X-Accel-Redirect.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    try:
+        fullpath = Path(safe_join(document_root, path))
+    except SuspiciousFileOperation:
+        raise Http404
+    if not fullpath.is_file():
+        raise Http404
+    content_type = mimetypes.guess_type(fullpath.name)[0] or 'application/octet-stream'
+    if settings.FILES_ACCEL_REDIRECT:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = quote(settings.FILES_ACCEL_REDIRECT + url)
+        response['Cache-Control'] = cache_control(path)
+        return response
+
+    servedpath, encoding = accepted_encoding(request, fullpath)
+    stat = servedpath.stat()
+    etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}{"-" + encoding if encoding else ""}"'
+    headers = {'ETag': etag, 'Last-Modified': http_date(stat.st_mtime), 'Cache-Control': cache_control(path)}
+    if any(fullpath.with_name(fullpath.name + suffix).is_file() for suffix, _ in ENCODINGS):
+        headers['Vary'] = 'Accept-Encoding'
+    if not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+    elif encoding:
+        response = FileResponse(open(servedpath, 'rb'), filename=fullpath.name, content_type=content_type)
+        response['Content-Encoding'] = encoding
+    else:
+        headers['Accept-Ranges'] = 'bytes'
+        try:
+            byte_range = requested_range(request, etag, stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        if byte_range is None:
+            response = FileResponse(open(servedpath, 'rb'), filename=fullpath.name, content_type=content_type)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(read_range(servedpath, start, end - start + 1),
+                                             status=206, content_type=content_type)
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def serve_static(request: HttpRequest, path: str) -> HttpResponse:
+    """Функция для отдачи собранной collectstatic статики из STATIC_ROOT."""
+    return serve_file(request, path, Path(settings.STATIC_ROOT), settings.STATIC_URL.rstrip('/') + '/' + path)
+
+
+def serve_media(request: HttpRequest, path: str) -> HttpResponse:
+    """Функция для отдачи загруженных файлов из MEDIA_ROOT."""
+    return serve_file(request, path, Path(settings.MEDIA_ROOT), settings.MEDIA_URL.rstrip('/') + '/' + path)
@@ -0,0 +1,38 @@
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, Tuple
+
+from products.models import Product
+
+EXPRESS_DELIVERY_COST = Decimal(500)
+DELIVERY_COST = Decimal(200)
+FREE_DELIVERY_FROM = Decimal(2000)
+
+
+def group_lines(lines: Iterable[Tuple[int, int]]) -> Dict[int, int]:
+    """Функция для суммирования количества по продуктам (id продукта -> количество)."""
+    counts: Dict[int, int] = defaultdict(int)
+    for product_id, count in lines:
+        counts[int(product_id)] += int(count)
+    return counts
+
+
+def snapshot_prices(product_ids: Iterable[int]) -> Dict[int, Decimal]:
+    """Функция для получения текущих цен продуктов (с учетом активных скидок) одним запросом."""
+    rows = Product.objects.with_sale_price().filter(pk__in=list(product_ids)).values_list('pk', 'price', 'sale_price')
+    return {pk: sale_price if sale_price is not None else price for pk, price, sale_price in rows}
+
+
+def lines_cost(counts: Dict[int, int], prices: Dict[int, Decimal]) -> Decimal:
+    """Функция для подсчета стоимости строк заказа (id продукта -> количество) по снимку цен."""
+    return sum((prices[product_id] * count for product_id, count in counts.items() if product_id in prices),
+               Decimal(0))
+
+
+def delivery_cost(delivery_type: str, cost: Decimal) -> Decimal:
+    """Функция для расчета стоимости доставки: экспресс - всегда платная, обычная - бесплатная от FREE_DELIVERY_FROM."""
+    if delivery_type == 'express':
+        return EXPRESS_DELIVERY_COST
+    if cost < FREE_DELIVERY_FROM:
+        return DELIVERY_COST
+    return Decimal(0)
@@ -0,0 +1,61 @@
+import statistics
+import time
+from typing import Any, List
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from orders.models import Order
+from products.models import Product
+from users.models import Profile
+
+SIZES = [1, 10, 50, 100, 200]
+
+
+class Command(BaseCommand):
+    """
+    Команда для замера оформления заказа (POST /api/order/<id>) в зависимости от количества строк заказа.
+    Работает на временной тестовой базе данных.
+    """
+    help = 'Benchmark checkout latency and query count for orders with 1 to 200 lines (uses a throwaway test database)'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args: Any, repeat: int, **options: Any) -> None:
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                self.benchmark(repeat)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def benchmark(self, repeat: int) -> None:
+        """Оформляет repeat заказов каждого размера и выводит медиану времени и количество запросов."""
+        products = Product.objects.bulk_create(
+            Product(title=f'product {number}', price=100 + number, count=10 ** 6) for number in range(max(SIZES)))
+        profile = Profile.objects.create(user=User.objects.create_user(username='benchmark'))
+        client = Client()
+        self.stdout.write(f'{"lines":>6} {"median, ms":>12} {"max, ms":>10} {"queries":>8}')
+        for size in SIZES:
+            data = {
+                'fullName': 'name', 'phone': '1', 'email': 'a@a.ru', 'deliveryType': 'ordinary', 'city': 'city',
+                'address': 'address', 'paymentType': 'online',
+                'products': [{'id': product.pk, 'count': 1} for product in products[:size]],
+            }
+            timings: List[float] = []
+            queries = 0
+            for _ in range(repeat):
+                order = Order.objects.create(user=profile)
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = client.post(f'/api/order/{order.pk}', data, content_type='application/json')
+                    timings.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 201:
+                    self.stderr.write(f'Checkout failed with status {response.status_code}')
+                    return
+                queries = len(captured)
+            self.stdout.write(f'{size:>6} {statistics.median(timings):>12.1f} {max(timings):>10.1f} {queries:>8}')
@@ -0,0 +1,264 @@
+import datetime
+import json
+import os
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from products.models import Category, Product
+from products.synthetic import generate_storefront
+from users.models import Profile
+
+CHECKOUT = {
+    'fullName': 'Benchmark', 'phone': '+70000000000', 'email': 'benchmark@example.com', 'deliveryType': 'ordinary',
+    'city': 'Москва', 'address': 'Красная площадь, 1', 'paymentType': 'online',
+}
+CARD = {'number': '4242424242424242', 'name': 'BENCHMARK', 'month': '12', 'year': '2030', 'code': '123'}
+SORTS = ['price', 'rating', 'date', 'reviews']
+# Сравнение с базовым прогоном: доля ухудшения, после которой значение отмечается как регрессия.
+REGRESSION_THRESHOLD = 0.1
+
+
+class Scenario:
+    """Сценарий нагрузки на одно Api: prepare готовит запрос (не замеряется), request выполняет его."""
+
+    def __init__(self, name: str, request: Callable[[Client, Any], HttpResponse], expected: int = 200,
+                 prepare: Optional[Callable[[Client, random.Random], Any]] = None) -> None:
+        self.name = name
+        self.request = request
+        self.expected = expected
+        self.prepare = prepare or (lambda client, rnd: rnd)
+
+
+class Command(BaseCommand):
+    """
+    Команда нагрузочного тестирования витрины: заполняет временную тестовую базу синтетическими данными
+    (products.synthetic), прогоняет реальные адреса Api (каталог, продукт, корзина, оформление заказа, оплата)
+    параллельными клиентами и выводит пропускную способность, перцентили задержки и количество запросов
+    к базе данных по каждому Api. Результаты сохраняются в JSON для сравнения между коммитами (--compare).
+    На SQLite параллельные записи завершаются ошибкой блокировки базы (столбец errors);
+    для сравнения записывающих Api используйте PostgreSQL или --concurrency 1.
+    """
+    help = 'Load-test the storefront API on synthetic data and store throughput, latency percentiles and ' \
+           'query counts per endpoint as JSON (uses a throwaway test database)'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--products', type=int, default=100000)
+        parser.add_argument('--reviews', type=int, default=1000000)
+        parser.add_argument('--sale-share', type=float, default=0.1, help='share of products with an active sale')
+        parser.add_argument('--requests', type=int, default=200, help='requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--endpoints', nargs='+', help='run only these endpoints')
+        parser.add_argument('--output', help='JSON file for the results (default: benchmarks/<commit>.json)')
+        parser.add_argument('--compare', help='JSON file of a previous run to compare with')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args: Any, products: int, reviews: int, sale_share: float, requests: int, concurrency: int,
+               endpoints: Optional[List[str]], output: Optional[str], compare: Optional[str], seed: int,
+               **options: Any) -> None:
+        scenarios = self.scenarios()
+        if endpoints:
+            unknown = set(endpoints) - {scenario.name for scenario in scenarios}
+            if unknown:
+                raise CommandError(f'Unknown endpoints: {", ".join(sorted(unknown))}')
+            scenarios = [scenario for scenario in scenarios if scenario.name in endpoints]
+        baseline = self.load(compare) if compare else None
+
+        directory = tempfile.TemporaryDirectory()
+        if connection.vendor == 'sqlite':
+            # Потоки должны работать с одной базой, а не каждый со своей базой в памяти.
+            connection.settings_dict['TEST']['NAME'] = os.path.join(directory.name, 'benchmark_storefront.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Оплаты остаются в очереди: замеряется Api, а не тестовый платежный шлюз.
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver'], PAYMENT_WORKER_THREADS=0):
+                started = time.perf_counter()
+                data = generate_storefront(products, reviews, sale_share, seed, progress=self.progress)
+                self.stdout.write(f'Data generated in {time.perf_counter() - started:.0f} s: {data}')
+                self.ids = list(Product.objects.values_list('pk', flat=True))
+                self.category_ids = list(Category.objects.values_list('pk', flat=True))
+                clients = [self.client(number) for number in range(concurrency)]
+                connections.close_all()
+                results = {scenario.name: self.run(scenario, clients, requests, random.Random(seed))
+                           for scenario in scenarios}
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            directory.cleanup()
+
+        commit = self.commit()
+        report = {
+            'commit': commit,
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'options': {'products': products, 'reviews': reviews, 'sale_share': sale_share, 'requests': requests,
+                        'concurrency': concurrency, 'seed': seed},
+            'data': data,
+            'endpoints': results,
+        }
+        self.print_report(results, baseline)
+        path = Path(output) if output else Path(settings.BASE_DIR) / 'benchmarks' / f'{commit or "results"}.json'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        self.stdout.write(self.style.SUCCESS(f'Results saved to {path}'))
+
+    def progress(self, message: str) -> None:
+        self.stdout.write(message)
+
+    @staticmethod
+    def client(number: int) -> Client:
+        """Клиент с новым пользователем; корзина клиента сохраняется между сценариями."""
+        user = User.objects.create_user(username=f'benchmark{number}')
+        Profile.objects.create(user=user)
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def scenarios(self) -> List[Scenario]:
+        """Сценарии нагрузки в порядке запуска (корзина заполняется до ее чтения и оформления заказов)."""
+        return [
+            Scenario('catalog', lambda client, params: client.get('/api/catalog/', params),
+                     prepare=lambda client, rnd: self.catalog_params(rnd)),
+            Scenario('product', lambda client, pk: client.get(f'/api/product/{pk}/'),
+                     prepare=lambda client, rnd: rnd.choice(self.ids)),
+            Scenario('basket-add', lambda client, pk: client.post(
+                '/api/basket', {'id': pk, 'count': 1}, content_type='application/json'),
+                prepare=lambda client, rnd: rnd.choice(self.ids)),
+            Scenario('basket', lambda client, _: client.get('/api/basket')),
+            Scenario('order-create', lambda client, lines: client.post(
+                '/api/orders', lines, content_type='application/json'),
+                prepare=lambda client, rnd: self.order_lines(rnd)),
+            Scenario('checkout', lambda client, order: client.post(
+                f'/api/order/{order[0]}', {**CHECKOUT, 'products': order[1]}, content_type='application/json'),
+                expected=201, prepare=self.create_order),
+            Scenario('payment', lambda client, pk: client.post(
+                f'/api/payment/{pk}', CARD, content_type='application/json'),
+                expected=202, prepare=self.checked_out_order),
+        ]
+
+    def catalog_params(self, rnd: random.Random) -> Dict[str, Any]:
+        """
+        Параметры страницы каталога: случайные сортировка и страница из первых 20 или,
+        в половине запросов, первая страница случайной категории.
+        """
+        params = {'limit': 20, 'sort': rnd.choice(SORTS), 'sortType': rnd.choice(['inc', 'dec'])}
+        if rnd.random() < 0.5:
+            params.update(category=rnd.choice(self.category_ids), currentPage=1)
+        else:
+            params.update(currentPage=rnd.randint(1, max(1, min(20, len(self.ids) // 20))))
+        return params
+
+    def order_lines(self, rnd: random.Random) -> List[Dict[str, int]]:
+        """Строки заказа: три случайных продукта."""
+        return [{'id': pk, 'count': rnd.randint(1, 3)} for pk in rnd.sample(self.ids, 3)]
+
+    def create_order(self, client: Client, rnd: random.Random) -> Tuple[int, List[Dict[str, int]]]:
+        """Создает заказ, возвращает его id и строки."""
+        lines = self.order_lines(rnd)
+        return client.post('/api/orders', lines, content_type='application/json').json()['orderId'], lines
+
+    def checked_out_order(self, client: Client, rnd: random.Random) -> int:
+        """Создает и оформляет заказ, возвращает его id."""
+        pk, lines = self.create_order(client, rnd)
+        client.post(f'/api/order/{pk}', {**CHECKOUT, 'products': lines}, content_type='application/json')
+        return pk
+
+    def run(self, scenario: Scenario, clients: List[Client], requests: int, rnd: random.Random) -> Dict[str, Any]:
+        """
+        Выполняет requests запросов сценария параллельно, по потоку на клиента.
+        Подготовка запросов (создание заказов для оформления и оплаты) выполняется заранее и не замеряется.
+        """
+        arguments: List[List[Any]] = [[] for _ in clients]
+        for number in range(requests):
+            arguments[number % len(clients)].append(
+                scenario.prepare(clients[number % len(clients)], random.Random(rnd.random())))
+        connections.close_all()
+
+        def measure(client: Client, argument: Any) -> Tuple[float, int, bool]:
+            with CaptureQueriesContext(connections['default']) as captured:
+                started = time.perf_counter()
+                try:
+                    ok = scenario.request(client, argument).status_code == scenario.expected
+                except Exception:
+                    ok = False
+                latency = (time.perf_counter() - started) * 1000
+            return latency, len(captured), ok
+
+        def worker(client: Client, client_arguments: List[Any]) -> List[Tuple[float, int, bool]]:
+            try:
+                return [measure(client, argument) for argument in client_arguments]
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=len(clients)) as executor:
+            started = time.perf_counter()
+            results = [result for results in executor.map(worker, clients, arguments) for result in results]
+            elapsed = time.perf_counter() - started
+
+        latencies = [latency for latency, _, _ in results]
+        queries = [count for _, count, _ in results]
+        percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        summary = {
+            'requests': requests,
+            'errors': sum(not ok for _, _, ok in results),
+            'rps': round(requests / elapsed, 1),
+            'p50': round(percentiles[49], 2),
+            'p90': round(percentiles[89], 2),
+            'p99': round(percentiles[98], 2),
+            'max': round(max(latencies), 2),
+            'queries': round(statistics.mean(queries), 1),
+            'max_queries': max(queries),
+        }
+        self.stdout.write(f'{scenario.name}: {summary}')
+        return summary
+
+    def print_report(self, results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Any]]) -> None:
+        """Выводит таблицу результатов; при сравнении - изменения относительно базового прогона."""
+        columns = ['rps', 'p50', 'p90', 'p99', 'queries', 'errors']
+        self.stdout.write(f'{"endpoint":<14}' + ''.join(f'{column:>16}' for column in columns))
+        for name, summary in results.items():
+            line = f'{name:<14}'
+            previous = (baseline or {}).get('endpoints', {}).get(name)
+            for column in columns:
+                cell = f'{summary[column]}'
+                if previous and previous.get(column):
+                    change = (summary[column] - previous[column]) / previous[column]
+                    cell += f' ({change:+.0%})'
+                    worse = -change if column == 'rps' else change
+                    if worse > REGRESSION_THRESHOLD:
+                        cell = self.style.ERROR(f'{cell:>16}')
+                line += f'{cell:>16}'
+            self.stdout.write(line)
+        if baseline:
+            self.stdout.write(f'Compared with commit {baseline.get("commit")} ({baseline.get("date")}); '
+                              f'changes worse than {REGRESSION_THRESHOLD:.0%} are highlighted')
+
+    @staticmethod
+    def load(path: str) -> Dict[str, Any]:
+        """Загружает результаты предыдущего прогона."""
+        try:
+            return json.loads(Path(path).read_text())
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Cannot read {path}: {error}')
+
+    @staticmethod
+    def commit() -> Optional[str]:
+        """Возвращает короткий хэш текущего коммита (None вне git-репозитория)."""
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True,
+                                  text=True, check=True).stdout.strip() or None
+        except (OSError, subprocess.CalledProcessError):
+            return None
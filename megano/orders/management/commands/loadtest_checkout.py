@@ -0,0 +1,111 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Any, List, Tuple
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import OperationalError, connection, connections
+from django.db.models import Sum
+
+from orders.models import Order, ProductOrder
+from orders.reservations import OutOfStock, reserve_stock
+from products.models import Product
+from users.models import Profile
+
+RETRIES = 50
+
+
+class Command(BaseCommand):
+    """
+    Команда нагрузочной проверки резервирования товаров: параллельные оформления заказов
+    на временной тестовой базе данных с последующей сверкой остатков (перепродаж быть не должно).
+    """
+    help = 'Run concurrent checkouts against a throwaway test database and check that no stock is oversold'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--products', type=int, default=20)
+        parser.add_argument('--stock', type=int, default=100)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--checkouts', type=int, default=100, help='checkouts per thread')
+        parser.add_argument('--lines', type=int, default=3, help='lines per order')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args: Any, products: int, stock: int, threads: int, checkouts: int, lines: int, seed: int,
+               **options: Any) -> None:
+        directory = tempfile.TemporaryDirectory()
+        if connection.vendor == 'sqlite':
+            # Потоки должны работать с одной базой, а не каждый со своей базой в памяти.
+            connection.settings_dict['TEST']['NAME'] = os.path.join(directory.name, 'loadtest_checkout.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            product_ids = [product.pk for product in Product.objects.bulk_create(
+                Product(title=f'product {number}', price=100, count=stock) for number in range(products))]
+            profile = Profile.objects.create(user=User.objects.create_user(username='loadtest'))
+            connections.close_all()
+
+            results: Counter = Counter()
+            lock = threading.Lock()
+            workers = [
+                threading.Thread(target=self.checkout, args=(
+                    profile, product_ids, checkouts, lines, random.Random(seed + number), results, lock))
+                for number in range(threads)
+            ]
+            started = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - started
+
+            self.stdout.write(
+                f'{threads} threads x {checkouts} checkouts in {elapsed:.1f} s '
+                f'({(results["reserved"] + results["out_of_stock"]) / elapsed:.0f} checkouts/s): '
+                f'{results["reserved"]} reserved, {results["out_of_stock"]} out of stock, '
+                f'{results["failed"]} failed, {results["retries"]} retries on locked database')
+            oversold = self.oversold(product_ids, stock)
+            if oversold:
+                self.stdout.write(self.style.ERROR(f'Oversold products: {oversold}'))
+            else:
+                self.stdout.write(self.style.SUCCESS('No oversold products'))
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            directory.cleanup()
+
+    @staticmethod
+    def checkout(profile: Profile, product_ids: List[int], checkouts: int, lines: int, rnd: random.Random,
+                 results: Counter, lock: threading.Lock) -> None:
+        """Оформляет checkouts заказов со случайными строками, повторяя попытку при блокировке базы."""
+        try:
+            for _ in range(checkouts):
+                order_lines: List[Tuple[int, int]] = [
+                    (rnd.choice(product_ids), rnd.randint(1, 5)) for _ in range(lines)]
+                outcome = 'failed'
+                for _ in range(RETRIES):
+                    try:
+                        reserve_stock(Order.objects.create(user=profile), order_lines)
+                        outcome = 'reserved'
+                        break
+                    except OutOfStock:
+                        outcome = 'out_of_stock'
+                        break
+                    except OperationalError:
+                        with lock:
+                            results['retries'] += 1
+                        time.sleep(rnd.uniform(0, 0.01))
+                with lock:
+                    results[outcome] += 1
+        finally:
+            connections.close_all()
+
+    @staticmethod
+    def oversold(product_ids: List[int], stock: int) -> List[int]:
+        """Возвращает продукты, у которых остаток отрицательный или не сходится с зарезервированным количеством."""
+        reserved = dict(ProductOrder.objects.filter(order__reservedUntil__isnull=False).values_list(
+            'product').annotate(total=Sum('count')))
+        counts = dict(Product.objects.filter(pk__in=product_ids).values_list('pk', 'count'))
+        return [pk for pk in product_ids if counts[pk] < 0 or counts[pk] + reserved.get(pk, 0) != stock]
@@ -0,0 +1,31 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from orders.payments import claimable_attempts, run_attempt
+
+
+class Command(BaseCommand):
+    """Команда-обработчик очереди оплат: забирает ожидающие попытки оплаты и обрабатывает их пулом потоков."""
+    help = 'Process queued payment attempts with a thread pool (runs until interrupted unless --once is given)'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--interval', type=float, default=1.0, help='seconds to wait when the queue is empty')
+        parser.add_argument('--batch', type=int, default=100)
+        parser.add_argument('--once', action='store_true', help='process the current queue and exit')
+
+    def handle(self, *args: Any, workers: int, interval: float, batch: int, once: bool, **options: Any) -> None:
+        processed = 0
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='payments') as executor:
+            while True:
+                ids = list(claimable_attempts().order_by('pk').values_list('pk', flat=True)[:batch])
+                list(executor.map(run_attempt, ids))
+                processed += len(ids)
+                if once and not ids:
+                    break
+                if not ids:
+                    time.sleep(interval)
+        self.stdout.write(self.style.SUCCESS(f'Payment attempts processed: {processed}'))
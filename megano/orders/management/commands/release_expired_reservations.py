@@ -0,0 +1,14 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from orders.reservations import release_expired_reservations
+
+
+class Command(BaseCommand):
+    """Команда для снятия просроченных резервов товаров неоплаченных заказов (запускайте по расписанию, например раз в минуту)."""
+    help = 'Return stock of unpaid orders whose reservation has expired'
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        released = release_expired_reservations()
+        self.stdout.write(self.style.SUCCESS(f'Expired reservations released: {released}'))
@@ -0,0 +1,70 @@
+# Generated by Django 4.2 on 2026-10-18 19:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('products', '0001_initial'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('createdAt', models.DateTimeField(auto_now_add=True)),
+                ('deliveryType', models.CharField(default='', max_length=150)),
+                ('paymentType', models.CharField(default='', max_length=150)),
+                ('totalCost', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('status', models.CharField(default='', max_length=150)),
+                ('city', models.CharField(default='', max_length=255)),
+                ('address', models.TextField(default='', max_length=255)),
+                ('reservedUntil', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('products', models.ManyToManyField(related_name='orders', to='products.product')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='orders', to='users.profile')),
+            ],
+            options={
+                'verbose_name': 'Order',
+                'verbose_name_plural': 'Orders',
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField()),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='orders.order')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='products.product')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PaymentAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotencyKey', models.CharField(max_length=128, unique=True)),
+                ('cardLast4', models.CharField(max_length=4)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('pending', 'Ожидает обработки'), ('processing', 'Обрабатывается'), ('succeeded', 'Оплачен'), ('failed', 'Ошибка при оплате')], default='pending', max_length=16)),
+                ('createdAt', models.DateTimeField(auto_now_add=True)),
+                ('updatedAt', models.DateTimeField(auto_now=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='orders.order')),
+            ],
+            options={
+                'verbose_name': 'Payment attempt',
+                'verbose_name_plural': 'Payment attempts',
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='paymentattempt',
+            index=models.Index(fields=['status', 'updatedAt'], name='orders_paym_status_aca9de_idx'),
+        ),
+    ]
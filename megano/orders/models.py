@@ -20,6 +20,8 @@ class Order(models.Model):
     city = models.CharField(max_length=255,  default='')
     address = models.TextField(max_length=255,  default='')
     products = models.ManyToManyField(Product, related_name='orders')
+    # Срок резерва товаров заказа, ожидающего оплаты; пусто, если товары не зарезервированы или заказ оплачен.
+    reservedUntil = models.DateTimeField(null=True, blank=True, db_index=True)
 
     def __str__(self) -> str:
         return f'{self.pk}'
@@ -42,3 +44,42 @@ class ProductOrder(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
     count = models.PositiveIntegerField()
+    # Цена единицы товара (с учетом скидки) на момент оформления заказа; пусто для строк, созданных до ее сохранения.
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+
+class PaymentAttempt(models.Model):
+    """
+    Модель для хранения попытки оплаты заказа (очередь платежей в базе данных).
+    Повторная отправка с тем же ключом идемпотентности возвращает уже созданную попытку.
+    """
+    class Meta:
+        verbose_name = 'Payment attempt'
+        verbose_name_plural = 'Payment attempts'
+        ordering = ['pk']
+        indexes = [
+            models.Index(fields=['status', 'updatedAt']),
+        ]
+
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUSES = [
+        (PENDING, 'Ожидает обработки'),
+        (PROCESSING, 'Обрабатывается'),
+        (SUCCEEDED, 'Оплачен'),
+        (FAILED, 'Ошибка при оплате'),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='payments')
+    idempotencyKey = models.CharField(max_length=128, unique=True)
+    # Номер карты целиком не хранится: платежному шлюзу магазина достаточно последних цифр.
+    cardLast4 = models.CharField(max_length=4)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=16, choices=STATUSES, default=PENDING)
+    createdAt = models.DateTimeField(auto_now_add=True)
+    updatedAt = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f'{self.order_id}: {self.status}'
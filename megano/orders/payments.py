@@ -0,0 +1,138 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+from .models import Order, PaymentAttempt
+from .reservations import OutOfStock, confirm_stock, release_stock
+
+logger = logging.getLogger(__name__)
+
+PAID = 'Оплачен'
+PAYMENT_FAILED = 'Ошибка при оплате'
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def charge(card_last4: str, amount: Decimal, idempotency_key: str) -> bool:
+    """
+    Функция тестового платежного шлюза: одобряет оплату картой с четным номером, не оканчивающимся на 0.
+    Попытка, зависшая в обработке, списывается повторно (доставка "хотя бы один раз"), поэтому шлюз получает
+    ключ идемпотентности попытки: настоящий шлюз по нему возвращает результат первого списания, а не списывает снова.
+    """
+    last_digit = int(card_last4[-1])
+    return last_digit % 2 == 0 and last_digit != 0
+
+
+def default_idempotency_key(order: Order, card: Dict[str, Any]) -> str:
+    """
+    Функция для ключа идемпотентности, если клиент не передал заголовок Idempotency-Key:
+    повторная отправка тех же данных карты для того же заказа дает тот же ключ, пока не завершилась
+    ошибкой очередная попытка оплаты (в ключ входит число неудачных попыток), после чего оплату можно повторить.
+    """
+    fingerprint = '|'.join(str(card.get(field, '')) for field in ('number', 'name', 'month', 'year'))
+    failed = order.payments.filter(status=PaymentAttempt.FAILED).count()
+    return f'{order.pk}:{failed}:{salted_hmac("orders.payments", fingerprint).hexdigest()}'
+
+
+def enqueue_payment(order: Order, number: str, key: str) -> Tuple[PaymentAttempt, bool]:
+    """
+    Функция для постановки оплаты заказа в очередь. Возвращает попытку и признак того, что она создана сейчас;
+    для уже известного ключа возвращается существующая попытка без повторной обработки.
+    """
+    attempt, created = PaymentAttempt.objects.get_or_create(
+        idempotencyKey=key, defaults={'order': order, 'cardLast4': number[-4:], 'amount': order.totalCost})
+    if created:
+        transaction.on_commit(lambda: submit_attempt(attempt.pk))
+    return attempt, created
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Функция для получения пула потоков веб-процесса, обрабатывающего попытки оплаты."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.PAYMENT_WORKER_THREADS, thread_name_prefix='payments')
+        return _executor
+
+
+def submit_attempt(pk: int) -> None:
+    """
+    Функция для передачи попытки оплаты в пул потоков веб-процесса (если он включен настройкой PAYMENT_WORKER_THREADS).
+    Иначе попытка остается в очереди до команды process_payments.
+    """
+    if settings.PAYMENT_WORKER_THREADS > 0:
+        get_executor().submit(run_attempt, pk)
+
+
+def run_attempt(pk: int) -> None:
+    """Функция для обработки попытки оплаты в потоке пула с управлением соединениями с базой данных."""
+    close_old_connections()
+    try:
+        process_attempt(pk)
+    except Exception:
+        logger.exception('Payment attempt %s failed', pk)
+    finally:
+        close_old_connections()
+
+
+def claimable_attempts() -> QuerySet:
+    """
+    Функция для получения попыток, ожидающих обработки, и попыток, зависших в обработке дольше таймаута
+    (обработчик мог упасть до или после списания, поэтому повторная обработка передает шлюзу тот же ключ).
+    """
+    stale = timezone.now() - timedelta(seconds=settings.PAYMENT_PROCESSING_TIMEOUT)
+    return PaymentAttempt.objects.filter(
+        Q(status=PaymentAttempt.PENDING) | Q(status=PaymentAttempt.PROCESSING, updatedAt__lt=stale))
+
+
+def claim_attempt(pk: int) -> bool:
+    """Функция для захвата попытки одним обработчиком (условный UPDATE); возвращает True, если захват удался."""
+    return claimable_attempts().filter(pk=pk).update(
+        status=PaymentAttempt.PROCESSING, updatedAt=timezone.now()) == 1
+
+
+def process_attempt(pk: int) -> bool:
+    """
+    Функция для обработки попытки оплаты: списание через платежный шлюз, затем в одной транзакции
+    закрепление резерва товаров и статус заказа (или снятие резерва при отказе).
+    Возвращает False, если попытку уже обрабатывает или обработал другой обработчик.
+    """
+    if not claim_attempt(pk):
+        return False
+    attempt = PaymentAttempt.objects.get(pk=pk)
+    if Order.objects.filter(pk=attempt.order_id, status=PAID).exists():
+        approved = True
+    else:
+        approved = charge(attempt.cardLast4, attempt.amount, attempt.idempotencyKey)
+        with transaction.atomic():
+            order = Order.objects.select_for_update().get(pk=attempt.order_id)
+            if approved:
+                try:
+                    confirm_stock(order)
+                except OutOfStock:
+                    approved = False
+            if approved:
+                order.status = PAID
+            else:
+                release_stock(order)
+                order.status = PAYMENT_FAILED
+            order.save(update_fields=['status'])
+    attempt.status = PaymentAttempt.SUCCEEDED if approved else PaymentAttempt.FAILED
+    attempt.save(update_fields=['status', 'updatedAt'])
+    return True
+
+
+def process_pending(limit: int = 100) -> int:
+    """Функция для обработки очереди попыток оплаты в текущем потоке, возвращает количество обработанных."""
+    ids = list(claimable_attempts().order_by('pk').values_list('pk', flat=True)[:limit])
+    return sum(process_attempt(pk) for pk in ids)
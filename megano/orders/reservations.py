@@ -0,0 +1,125 @@
+from datetime import timedelta
+from typing import Dict, Iterable, List, Tuple, Type
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, IntegerField, Model
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from products.models import Product, ProductCatalogEntry
+from products.response_cache import PRODUCT, bump_generation
+
+from .checkout import group_lines, snapshot_prices
+from .models import Order, ProductOrder
+
+
+class OutOfStock(Exception):
+    """Исключение: для части товаров заказа не хватает остатка."""
+
+    def __init__(self, product_ids: List[int]) -> None:
+        super().__init__(f'Not enough stock for products: {product_ids}')
+        self.product_ids = product_ids
+
+
+def stock_delta(model: Type[Model], counts: Dict[int, int]) -> RawSQL:
+    """
+    Функция для построения выражения CASE id WHEN ... THEN ... END с количеством по id продукта
+    (для UPDATE всех строк одним запросом). Выражение собирается строкой: компиляция сотен When
+    средствами ORM обходится дороже самого запроса.
+    """
+    column = connection.ops.quote_name(model._meta.pk.column)
+    branches = ' '.join('WHEN %s THEN %s' for _ in counts)
+    params = [value for line in sorted(counts.items()) for value in line]
+    return RawSQL(f'CASE {column} {branches} END', params, output_field=IntegerField())
+
+
+def take_stock(counts: Dict[int, int]) -> None:
+    """
+    Функция для списания остатков всех продуктов одним условным UPDATE ... WHERE count >= n.
+    Вызывается внутри транзакции: если хотя бы одного товара не хватает, списание откатывается
+    до точки сохранения и поднимается OutOfStock со списком таких продуктов. UPDATE не отправляет сигналы,
+    поэтому закэшированные ответы витрины с остатками сбрасываются после фиксации.
+    """
+    if not counts:
+        return
+    delta = stock_delta(Product, counts)
+    try:
+        with transaction.atomic():
+            if Product.objects.filter(pk__in=counts, count__gte=delta).update(count=F('count') - delta) != len(counts):
+                raise OutOfStock([])
+    except OutOfStock:
+        available = dict(Product.objects.filter(pk__in=counts).values_list('pk', 'count'))
+        missing = sorted(pk for pk, count in counts.items() if available.get(pk, 0) < count)
+        raise OutOfStock(missing or sorted(counts))
+    transaction.on_commit(lambda: bump_generation(PRODUCT))
+    if settings.CATALOG_READ_MODEL:
+        ProductCatalogEntry.objects.filter(pk__in=counts).update(
+            count=F('count') - stock_delta(ProductCatalogEntry, counts))
+
+
+def return_stock(counts: Dict[int, int]) -> None:
+    """Функция для возврата остатков всех продуктов одним UPDATE (кэши витрины сбрасываются после фиксации)."""
+    if not counts:
+        return
+    Product.objects.filter(pk__in=counts).update(count=F('count') + stock_delta(Product, counts))
+    transaction.on_commit(lambda: bump_generation(PRODUCT))
+    if settings.CATALOG_READ_MODEL:
+        ProductCatalogEntry.objects.filter(pk__in=counts).update(
+            count=F('count') + stock_delta(ProductCatalogEntry, counts))
+
+
+def order_lines(order: Order) -> Dict[int, int]:
+    """Функция для получения строк заказа (id продукта -> количество)."""
+    return group_lines(ProductOrder.objects.filter(order=order).values_list('product_id', 'count'))
+
+
+def reserve_stock(order: Order, lines: Iterable[Tuple[int, int]]) -> List[ProductOrder]:
+    """
+    Функция для резервирования товаров заказа: в одной транзакции списывает остатки по всем строкам
+    (пары id продукта и количества), создает строки ProductOrder с текущими ценами одним запросом
+    и устанавливает срок резерва. Предыдущий резерв заказа, если он есть, снимается.
+    При нехватке товаров поднимает OutOfStock без изменений в базе.
+    """
+    counts = group_lines(lines)
+    with transaction.atomic():
+        release_stock(order)
+        take_stock(counts)
+        prices = snapshot_prices(counts)
+        ProductOrder.objects.filter(order=order).delete()
+        created = ProductOrder.objects.bulk_create(
+            ProductOrder(order=order, product_id=product_id, count=count, price=prices[product_id])
+            for product_id, count in counts.items())
+        order.reservedUntil = timezone.now() + timedelta(seconds=settings.STOCK_RESERVATION_TIMEOUT)
+        Order.objects.filter(pk=order.pk).update(reservedUntil=order.reservedUntil)
+    return created
+
+
+def release_stock(order: Order) -> bool:
+    """
+    Функция для снятия резерва заказа (истек срок или оплата не прошла): возвращает остатки продуктов.
+    Резерв снимается не более одного раза; возвращает True, если резерв был.
+    """
+    with transaction.atomic():
+        released = Order.objects.filter(pk=order.pk, reservedUntil__isnull=False).update(reservedUntil=None)
+        if released:
+            return_stock(order_lines(order))
+    order.reservedUntil = None
+    return bool(released)
+
+
+def confirm_stock(order: Order) -> None:
+    """
+    Функция для закрепления товаров оплаченного заказа: резерв становится бессрочным.
+    Если резерв уже снят (например, истек срок), товары резервируются заново; при нехватке поднимает OutOfStock.
+    """
+    with transaction.atomic():
+        if not Order.objects.filter(pk=order.pk, reservedUntil__isnull=False).update(reservedUntil=None):
+            take_stock(order_lines(order))
+    order.reservedUntil = None
+
+
+def release_expired_reservations() -> int:
+    """Функция для снятия всех просроченных резервов, возвращает количество заказов."""
+    expired = Order.objects.filter(reservedUntil__lt=timezone.now())
+    return sum(release_stock(order) for order in expired.only('pk'))
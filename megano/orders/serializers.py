@@ -1,8 +1,33 @@
 import datetime
+from typing import Optional
 
 from rest_framework import serializers
-from orders.models import Order
-from products.serializers import ProductSerializer
+from orders.models import Order, PaymentAttempt, ProductOrder
+from products.models import Product
+from products.serializers import ProductListSerializer
+
+
+class OrderProductSerializer(ProductListSerializer):
+    """
+    Сериализатор для продукта в заказе: количество и цена берутся из строки заказа (контекст lines),
+    а для еще не оформленного заказа количество берется из корзины (контекст cart).
+    """
+    count = serializers.SerializerMethodField()
+
+    def get_line(self, instance: Product) -> Optional[ProductOrder]:
+        return self.context.get('lines', {}).get(instance.pk)
+
+    def get_count(self, instance: Product) -> int:
+        line = self.get_line(instance)
+        if line is not None:
+            return line.count
+        return self.context.get('cart', {}).get(str(instance.pk), {}).get('count', 0)
+
+    def get_price(self, instance: Product) -> float:
+        line = self.get_line(instance)
+        if line is not None and line.price is not None:
+            return float(line.price)
+        return super().get_price(instance)
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -11,17 +36,61 @@ class OrderSerializer(serializers.ModelSerializer):
     fullName = serializers.StringRelatedField()
     email = serializers.StringRelatedField()
     phone = serializers.StringRelatedField()
-    products = ProductSerializer(many=True, required=False)
+    products = OrderProductSerializer(many=True, required=False)
 
     class Meta:
         model = Order
-        fields = '__all__'
+        exclude = ['reservedUntil']
 
     def get_createdAt(self, instance: Order)  -> str:
         """Функция возвращает дату создания заказа в формате '%d.%m.%Y %H:%M'."""
         date = instance.createdAt + datetime.timedelta(hours=3)
         return datetime.datetime.strftime(date, '%d.%m.%Y %H:%M')
 
+
+class ProductOrderSummarySerializer(serializers.ModelSerializer):
+    """Сериализатор для строки заказа в истории заказов: id и название продукта, количество и цена."""
+    id = serializers.IntegerField(source='product_id')
+    title = serializers.CharField(source='product.title')
+
+    class Meta:
+        model = ProductOrder
+        fields = 'id', 'title', 'count', 'price'
+
+
+class OrderSummarySerializer(serializers.ModelSerializer):
+    """Сериализатор для краткой информации о заказе в истории заказов (без подробностей о продуктах)."""
+    createdAt = serializers.SerializerMethodField()
+    linesCount = serializers.SerializerMethodField()
+    products = ProductOrderSummarySerializer(source='productorder_set', many=True, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = 'id', 'createdAt', 'status', 'totalCost', 'deliveryType', 'paymentType', 'linesCount', 'products'
+
+    get_createdAt = OrderSerializer.get_createdAt
+
+    def get_linesCount(self, instance: Order) -> int:
+        """Функция возвращает количество строк заказа."""
+        return len(instance.productorder_set.all())
+
+
+class OrderLineSerializer(serializers.Serializer):
+    """Сериализатор для строки оформляемого заказа: id продукта и количество (не меньше 1)."""
+    id = serializers.IntegerField()
+    count = serializers.IntegerField(min_value=1)
+
+
 class OrderIdSerializer(serializers.Serializer):
     """Сериализатор для Order id"""
     orderId = serializers.IntegerField()
+
+
+class PaymentAttemptSerializer(serializers.ModelSerializer):
+    """Сериализатор для состояния попытки оплаты."""
+    orderId = serializers.IntegerField(source='order_id')
+    orderStatus = serializers.CharField(source='order.status')
+
+    class Meta:
+        model = PaymentAttempt
+        fields = 'id', 'orderId', 'status', 'orderStatus'
@@ -1,3 +1,278 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from products.models import Product, ProductImage, Review, Sale, Specification, Tag
+from users.models import Profile
+
+from .models import Order, PaymentAttempt, ProductOrder
+from .payments import process_attempt, process_pending
+from .reservations import OutOfStock, release_stock, reserve_stock
+
+
+class StockReservationTestCase(TestCase):
+    """Тесты для резервирования товаров заказа."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.profile = Profile.objects.create(user=User.objects.create_user(username='user', password='password'))
+
+    def setUp(self) -> None:
+        self.first = Product.objects.create(title='first', price=100, count=5)
+        self.second = Product.objects.create(title='second', price=200, count=1)
+        self.order = Order.objects.create(user=self.profile)
+
+    def assertStock(self, first: int, second: int) -> None:
+        self.assertEqual(list(Product.objects.order_by('pk').values_list('count', flat=True)), [first, second])
+
+    def test_reserve_and_release(self) -> None:
+        reserve_stock(self.order, [(self.first.pk, 2), (self.second.pk, 1), (self.first.pk, 1)])
+        self.assertStock(2, 0)
+        self.assertEqual(ProductOrder.objects.filter(order=self.order, product=self.first).get().count, 3)
+        self.assertIsNotNone(Order.objects.get(pk=self.order.pk).reservedUntil)
+
+        self.assertTrue(release_stock(self.order))
+        self.assertFalse(release_stock(self.order))
+        self.assertStock(5, 1)
+
+    def test_out_of_stock_changes_nothing(self) -> None:
+        with self.assertRaises(OutOfStock) as error:
+            reserve_stock(self.order, [(self.first.pk, 2), (self.second.pk, 2)])
+        self.assertEqual(error.exception.product_ids, [self.second.pk])
+        self.assertStock(5, 1)
+        self.assertFalse(ProductOrder.objects.exists())
+
+    def test_checkout_conflict_and_failed_payment(self) -> None:
+        other = Order.objects.create(user=self.profile)
+        reserve_stock(other, [(self.second.pk, 1)])
+        data = {'fullName': 'name', 'phone': '1', 'email': 'a@a.ru', 'deliveryType': 'ordinary', 'city': 'city',
+                'address': 'address', 'paymentType': 'online', 'products': [{'id': self.second.pk, 'count': 1}]}
+        response = self.client.post(f'/api/order/{self.order.pk}', data, content_type='application/json')
+        self.assertEqual((response.status_code, response.json()['products']), (409, [self.second.pk]))
+
+        data['products'] = [{'id': self.first.pk, 'count': 4}]
+        self.assertEqual(self.client.post(f'/api/order/{self.order.pk}', data, content_type='application/json')
+                         .status_code, 201)
+        self.assertStock(1, 0)
+        response = self.client.post(f'/api/payment/{self.order.pk}', {'number': '11'}, content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        process_pending()
+        self.assertStock(5, 0)
+
+    def test_paid_order_is_not_checked_out_again(self) -> None:
+        data = {'fullName': 'name', 'phone': '1', 'email': 'a@a.ru', 'deliveryType': 'ordinary', 'city': 'city',
+                'address': 'address', 'paymentType': 'online', 'products': [{'id': self.first.pk, 'count': 2}]}
+        self.client.post(f'/api/order/{self.order.pk}', data, content_type='application/json')
+        self.client.post(f'/api/payment/{self.order.pk}', {'number': '12'}, content_type='application/json')
+        process_pending()
+        self.assertStock(3, 1)
+
+        response = self.client.post(f'/api/order/{self.order.pk}', data, content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.assertStock(3, 1)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, 'Оплачен')
+
+    def test_line_counts_are_validated(self) -> None:
+        data = {'fullName': 'name', 'phone': '1', 'email': 'a@a.ru', 'deliveryType': 'ordinary', 'city': 'city',
+                'address': 'address', 'paymentType': 'online'}
+        for count in (-1, 0, 'two'):
+            data['products'] = [{'id': self.first.pk, 'count': count}]
+            response = self.client.post(f'/api/order/{self.order.pk}', data, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        self.assertStock(5, 1)
+        self.assertFalse(ProductOrder.objects.exists())
+
+        self.client.force_login(self.profile.user)
+        response = self.client.post('/api/orders', [{'id': self.first.pk, 'count': 0}], content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_cached_lists_follow_stock(self) -> None:
+        cache.clear()
+        Product.objects.filter(pk=self.first.pk).update(limited=True)
+        self.assertEqual(self.client.get('/api/products/limited/').json()[0]['count'], 5)
+        data = {'fullName': 'name', 'phone': '1', 'email': 'a@a.ru', 'deliveryType': 'ordinary', 'city': 'city',
+                'address': 'address', 'paymentType': 'online', 'products': [{'id': self.first.pk, 'count': 2}]}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/order/{self.order.pk}', data, content_type='application/json')
+        self.assertEqual(self.client.get('/api/products/limited/').json()[0]['count'], 3)
+
+        Order.objects.filter(pk=self.order.pk).update(reservedUntil=timezone.now() - timedelta(minutes=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('release_expired_reservations', stdout=StringIO())
+        self.assertEqual(self.client.get('/api/products/limited/').json()[0]['count'], 5)
+
+    def test_expired_reservations_released(self) -> None:
+        reserve_stock(self.order, [(self.first.pk, 5)])
+        Order.objects.filter(pk=self.order.pk).update(reservedUntil=timezone.now() - timedelta(minutes=1))
+        call_command('release_expired_reservations', stdout=StringIO())
+        self.assertStock(5, 1)
+
+
+class CheckoutTestCase(TestCase):
+    """Тесты для расчета стоимости заказа по строкам с ценами на момент оформления."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(username='user', password='password')
+        cls.profile = Profile.objects.create(user=cls.user)
+        cls.product = Product.objects.create(title='product', price=300, count=10)
+        cls.sale_product = Product.objects.create(title='sale product', price=1000, count=10)
+        Sale.objects.create(product=cls.sale_product, salePrice=800, dateFrom='2000-01-01', dateTo='2100-01-01')
+
+    def test_costs_are_computed_from_lines(self) -> None:
+        self.client.force_login(self.user)
+        lines = [{'id': self.product.pk, 'count': 2, 'price': 1}, {'id': self.sale_product.pk, 'count': 1, 'price': 1}]
+        order_id = self.client.post('/api/orders', lines, content_type='application/json').json()['orderId']
+        self.assertEqual(Order.objects.get(pk=order_id).totalCost, Decimal('1400'))
+
+        data = {'fullName': 'name', 'phone': '1', 'email': 'a@a.ru', 'deliveryType': 'express', 'city': 'city',
+                'address': 'address', 'paymentType': 'online', 'products': lines}
+        self.client.post(f'/api/order/{order_id}', data, content_type='application/json')
+        self.assertEqual(Order.objects.get(pk=order_id).totalCost, Decimal('1900'))
+        Product.objects.filter(pk=self.product.pk).update(price=1)
+        self.client.post(f'/api/order/{order_id}', data, content_type='application/json')
+        self.assertEqual(Order.objects.get(pk=order_id).totalCost, Decimal('1302'))
+        self.assertEqual(sorted(ProductOrder.objects.values_list('price', flat=True)), [Decimal('1'), Decimal('800')])
+
+
+class OrderHistoryTestCase(TestCase):
+    """Тесты для истории заказов."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(username='user', password='password')
+        profile = Profile.objects.create(user=cls.user)
+        products = [Product.objects.create(title=f'product {number}', price=100, count=100) for number in range(5)]
+        for number in range(12):
+            order = Order.objects.create(user=profile, status='Оплачен')
+            ProductOrder.objects.bulk_create(
+                ProductOrder(order=order, product=product, count=1, price=100) for product in products[:number % 5 + 1])
+
+    def setUp(self) -> None:
+        self.client.force_login(self.user)
+
+    def test_history_query_count_does_not_depend_on_orders(self) -> None:
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/orders')
+        self.assertEqual(len(response.json()), 12)
+        self.assertEqual(response.json()[1]['linesCount'], 2)
+        self.assertEqual([(line['title'], line['count'], line['price']) for line in response.json()[1]['products']],
+                         [('product 0', 1, '100.00'), ('product 1', 1, '100.00')])
+
+    def test_history_pages(self) -> None:
+        ids = []
+        cursor = ''
+        while cursor is not None:
+            data = self.client.get('/api/orders', {'cursor': cursor}).json()
+            ids += [order['id'] for order in data['items']]
+            cursor = data['nextCursor']
+        self.assertEqual(ids, sorted(Order.objects.values_list('pk', flat=True), reverse=True))
+
+
+class OrderDetailTestCase(TestCase):
+    """Тесты для получения заказа."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.profile = Profile.objects.create(user=User.objects.create_user(username='user'), fullName='name')
+        tag = Tag.objects.create(name='tag')
+        specification = Specification.objects.create(name='name', value='value')
+        cls.orders = []
+        for size in (2, 10):
+            order = Order.objects.create(user=cls.profile)
+            for number in range(size):
+                product = Product.objects.create(title=f'product {number}', price=100, count=5)
+                product.tags.add(tag)
+                product.specifications.add(specification)
+                ProductImage.objects.create(product=product, image=f'products/images/{number}.webp')
+                Review.objects.create(product=product, author='author', email='a@a.ru', text='text', rate=5)
+                Sale.objects.create(product=product, salePrice=90, dateFrom='2000-01-01', dateTo='2100-01-01')
+                ProductOrder.objects.create(order=order, product=product, count=number + 1, price=95)
+                order.products.add(product)
+            cls.orders.append(order)
+
+    def test_query_count_does_not_depend_on_products(self) -> None:
+        for order in self.orders:
+            with self.assertNumQueries(6):
+                data = self.client.get(f'/api/order/{order.pk}').json()
+            self.assertEqual(len(data['products']), len(order.productorder_set.all()))
+        self.assertEqual(data['fullName'], 'name')
+        self.assertEqual([(product['count'], product['price'], product['salePrice']) for product in data['products'][:2]],
+                         [(1, 95, 90), (2, 95, 90)])
+
+    def test_unknown_order(self) -> None:
+        self.assertEqual(self.client.get('/api/order/0').status_code, 404)
+
+
+@override_settings(PAYMENT_WORKER_THREADS=0)
+class PaymentPipelineTestCase(TestCase):
+    """Тесты для очереди оплат."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        profile = Profile.objects.create(user=User.objects.create_user(username='user'))
+        cls.product = Product.objects.create(title='product', price=100, count=5)
+        cls.order = Order.objects.create(user=profile, totalCost=200)
+        reserve_stock(cls.order, [(cls.product.pk, 2)])
+
+    def pay(self, number: str, key: str) -> dict:
+        response = self.client.post(f'/api/payment/{self.order.pk}', {'number': number},
+                                    content_type='application/json', HTTP_IDEMPOTENCY_KEY=key)
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def test_duplicate_submits_create_one_attempt(self) -> None:
+        first = self.pay('4242424242424242', 'key')
+        self.assertEqual(self.pay('4242424242424242', 'key')['id'], first['id'])
+        self.assertEqual((PaymentAttempt.objects.count(), first['status']), (1, PaymentAttempt.PENDING))
+
+        self.assertTrue(process_attempt(first['id']))
+        self.assertFalse(process_attempt(first['id']))
+        data = self.client.get(f'/api/payment/{self.order.pk}').json()
+        self.assertEqual((data['status'], data['orderStatus']), (PaymentAttempt.SUCCEEDED, 'Оплачен'))
+        self.assertIsNone(Order.objects.get(pk=self.order.pk).reservedUntil)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).count, 3)
+        self.assertEqual(PaymentAttempt.objects.get().cardLast4, '4242')
+
+    def test_declined_payment_releases_stock(self) -> None:
+        self.pay('4242424242424240', 'declined')
+        self.assertEqual(process_pending(), 1)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, 'Ошибка при оплате')
+        self.assertEqual(Product.objects.get(pk=self.product.pk).count, 5)
+
+    def test_declined_payment_can_be_retried_without_key(self) -> None:
+        url = f'/api/payment/{self.order.pk}'
+        first = self.client.post(url, {'number': '4242424242424240'}, content_type='application/json').json()
+        self.assertEqual(self.client.post(url, {'number': '4242424242424240'},
+                                          content_type='application/json').json()['id'], first['id'])
+        process_pending()
+        retry = self.client.post(url, {'number': '4242424242424240'}, content_type='application/json')
+        self.assertEqual(retry.status_code, 202)
+        self.assertNotEqual(retry.json()['id'], first['id'])
+        self.assertEqual(retry.json()['status'], PaymentAttempt.PENDING)
+
+    def test_long_idempotency_key(self) -> None:
+        response = self.client.post(f'/api/payment/{self.order.pk}', {'number': '42'},
+                                    content_type='application/json', HTTP_IDEMPOTENCY_KEY='k' * 129)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PaymentAttempt.objects.exists())
+
+    def test_stale_attempt_is_charged_with_its_key(self) -> None:
+        attempt = self.pay('4242424242424242', 'stale')
+        PaymentAttempt.objects.filter(pk=attempt['id']).update(
+            status=PaymentAttempt.PROCESSING, updatedAt=timezone.now() - timedelta(hours=1))
+        with mock.patch('orders.payments.charge', return_value=True) as charge:
+            self.assertEqual(process_pending(), 1)
+        charge.assert_called_once_with('4242', Decimal('200'), 'stale')
+
+    def test_invalid_card_number(self) -> None:
+        response = self.client.post(f'/api/payment/{self.order.pk}', {'number': 'abc'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
@@ -1,15 +1,30 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.request import Request
 from rest_framework.views import APIView
 from rest_framework import status
-from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiExample
-from cart.cart import Cart
-from .models import Order, ProductOrder
-from orders.serializers import OrderSerializer, OrderIdSerializer
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiExample, OpenApiParameter
+from cart.cart import get_cart
+from .models import Order, PaymentAttempt, ProductOrder
+from .checkout import delivery_cost, group_lines, lines_cost, snapshot_prices
+from .payments import PAID, default_idempotency_key, enqueue_payment
+from .reservations import OutOfStock, reserve_stock
+from orders.serializers import OrderSerializer, OrderIdSerializer, OrderLineSerializer, OrderSummarySerializer, \
+    PaymentAttemptSerializer
 from products.models import Product
+from products.pagination import page_limit, paginate_keyset
 from products.serializers import ProductSerializer
 
 
+# Количество заказов на странице истории заказов.
+ORDERS_PAGE_SIZE = 10
+
+
 class Orders(APIView):
     """Api для добавления товаров в заказ"""
 
@@ -19,6 +34,10 @@ class Orders(APIView):
         request=ProductSerializer,
         responses={
             status.HTTP_200_OK: OrderIdSerializer,
+            status.HTTP_400_BAD_REQUEST: OpenApiResponse(
+                    response=None,
+                    description="invalid product count"
+                ),
             status.HTTP_500_INTERNAL_SERVER_ERROR: OpenApiResponse(
                     response=None,
                     description="unsuccessful operation"
@@ -27,24 +46,46 @@ class Orders(APIView):
     )
 
     def post(self, request: Request, *args, **kwargs) -> Response:
-        products_in_order = [(obj["id"], obj["count"], obj["price"]) for obj in request.data]
-        products = Product.objects.filter(id__in=[obj[0] for obj in products_in_order])
+        lines = OrderLineSerializer(data=request.data, many=True)
+        lines.is_valid(raise_exception=True)
+        counts = group_lines((line['id'], line['count']) for line in lines.validated_data)
         if str(request.user) == 'AnonymousUser':
             return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        order = Order.objects.create(
-            user=request.user.profile,
-            totalCost=Cart(request).total_price(),
-        )
+        prices = snapshot_prices(counts)
+        with transaction.atomic():
+            order = Order.objects.create(
+                user=request.user.profile,
+                totalCost=lines_cost(counts, prices),
+            )
+            order.products.set(prices.keys())
         data = {
             "orderId": order.pk,
         }
-        order.products.set(products)
-        order.save()
         return Response(data, status=status.HTTP_200_OK)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('cursor', OpenApiTypes.STR,
+                             description='Курсор страницы (пустой для первой), ответ - {items, nextCursor}'),
+            OpenApiParameter('limit', OpenApiTypes.INT),
+        ],
+        responses={status.HTTP_200_OK: OrderSummarySerializer(many=True)},
+    )
     def get(self, request: Request) -> Response:
-        data = Order.objects.filter(user_id=request.user.profile.pk)
-        serialized = OrderSerializer(data, many=True)
+        """
+        Функция для получения истории заказов пользователя в кратком виде: строки заказов с названиями продуктов
+        загружаются одним запросом для всех заказов. С параметром cursor отдает страницы, начиная с новых заказов.
+        """
+        lines = ProductOrder.objects.select_related('product').only(
+            'order', 'product__title', 'count', 'price').order_by('pk')
+        data = Order.objects.filter(user_id=request.user.profile.pk).prefetch_related(
+            Prefetch('productorder_set', queryset=lines))
+        if 'cursor' in request.GET:
+            limit = page_limit(request, ORDERS_PAGE_SIZE)
+            orders, next_cursor = paginate_keyset(data, 'pk', True, request.GET['cursor'], limit)
+            serialized = OrderSummarySerializer(orders, many=True)
+            return Response({'items': serialized.data, 'nextCursor': next_cursor}, status=status.HTTP_200_OK)
+        serialized = OrderSummarySerializer(data, many=True)
         return Response(serialized.data, status=status.HTTP_200_OK)
 
 
@@ -54,23 +95,20 @@ class OrderDetail(APIView):
     serializer_class = OrderSerializer
 
     def get(self, request: Request, pk) -> Response:
-        """Функция для получения заказа."""
-        data = Order.objects.get(pk=pk)
-        serialized = OrderSerializer(data)
-        cart = Cart(request).cart
-        data = serialized.data
-
-        try:
-            products_in_order = data['products']
-            query = ProductOrder.objects.filter(order_id=pk)
-            prods = {obj.product.pk: obj.count for obj in query}
-            for prod in products_in_order:
-                prod['count'] = prods[prod['id']]
-        except:
-            products_in_order = data['products']
-            for prod in products_in_order:
-                prod['count'] = cart[str(prod['id'])]['count']
-        return Response(data, status=status.HTTP_200_OK)
+        """
+        Функция для получения заказа: заказ, строки, продукты с изображениями, тегами, характеристиками
+        и ценами со скидками загружаются фиксированным количеством запросов.
+        """
+        lines = ProductOrder.objects.only('order', 'product', 'count', 'price')
+        order = get_object_or_404(Order.objects.select_related('user').prefetch_related(
+            Prefetch('products', queryset=Product.objects.for_list()),
+            Prefetch('productorder_set', queryset=lines)), pk=pk)
+        lines = {line.product_id: line for line in order.productorder_set.all()}
+        cart = {}
+        if any(product.pk not in lines for product in order.products.all()):
+            cart = get_cart(request).cart
+        serialized = OrderSerializer(order, context={'lines': lines, 'cart': cart})
+        return Response(serialized.data, status=status.HTTP_200_OK)
 
     @extend_schema(
         responses={
@@ -78,52 +116,74 @@ class OrderDetail(APIView):
                 response=None,
                 description="successful creation"
             ),
+            status.HTTP_400_BAD_REQUEST: OpenApiResponse(
+                response=None,
+                description="invalid product count"
+            ),
+            status.HTTP_409_CONFLICT: OpenApiResponse(
+                response=None,
+                description="not enough stock or order already paid"
+            ),
         }
     )
 
     def post(self, request: Request, pk) -> Response:
-        """Функция для оформления заказаза."""
-        order = Order.objects.get(pk=pk)
+        """
+        Функция для оформления заказаза: в одной транзакции резервирует товары, сохраняет строки заказа
+        с ценами на момент оформления и считает стоимость заказа по этим строкам.
+        Оплаченный заказ повторно не оформляется (ответ 409).
+        """
         data = request.data
-        order.fullName = data['fullName']
-        order.phone = data['phone']
-        order.email = data['email']
-        order.deliveryType = data['deliveryType']
-        order.city = data['city']
-        order.address = data['address']
-        order.paymentType = data['paymentType']
-        order.status = 'Ожидает оплаты'
-        if data['deliveryType'] == 'express':
-            order.totalCost += 500
-        else:
-            if order.totalCost < 2000:
-                order.totalCost += 200
-
-        for product in data['products']:
-            ProductOrder.objects.get_or_create(
-                order_id=order.pk,
-                product_id=product['id'],
-                count=product['count']
-            )
-
-        order.save()
-        Cart(request).clear()
+        items = OrderLineSerializer(data=data.get('products'), many=True)
+        items.is_valid(raise_exception=True)
+        try:
+            with transaction.atomic():
+                order = Order.objects.select_for_update().get(pk=pk)
+                if order.status == PAID:
+                    return Response({'error': 'Order is already paid'}, status=status.HTTP_409_CONFLICT)
+                order.fullName = data['fullName']
+                order.phone = data['phone']
+                order.email = data['email']
+                order.deliveryType = data['deliveryType']
+                order.city = data['city']
+                order.address = data['address']
+                order.paymentType = data['paymentType']
+                order.status = 'Ожидает оплаты'
+                lines = reserve_stock(order, [(line['id'], line['count']) for line in items.validated_data])
+                cost = sum((line.price * line.count for line in lines), Decimal(0))
+                order.totalCost = cost + delivery_cost(order.deliveryType, cost)
+                order.save()
+        except OutOfStock as error:
+            return Response({'error': 'Not enough stock', 'products': error.product_ids},
+                            status=status.HTTP_409_CONFLICT)
+        get_cart(request).clear()
         return Response(request.data, status=status.HTTP_201_CREATED)
 
 
 class PaymentView(APIView):
-    """Api для оплаты заказа"""
+    """
+    Api для оплаты заказа: POST ставит попытку оплаты в очередь и сразу отвечает 202,
+    GET возвращает состояние последней попытки (страница progress-payment/ опрашивает его).
+    """
 
     @extend_schema(
         request=OrderSerializer,
+        parameters=[
+            OpenApiParameter('Idempotency-Key', OpenApiTypes.STR, OpenApiParameter.HEADER,
+                             description='Ключ для защиты от повторной обработки одной оплаты'),
+        ],
         responses={
-            status.HTTP_200_OK: OpenApiResponse(
+            status.HTTP_202_ACCEPTED: OpenApiResponse(
+                response=PaymentAttemptSerializer,
+                description="payment accepted for processing"
+            ),
+            status.HTTP_400_BAD_REQUEST: OpenApiResponse(
                 response=None,
-                description="successful operation"
+                description="invalid card number or idempotency key"
             ),
-            status.HTTP_500_INTERNAL_SERVER_ERROR: OpenApiResponse(
+            status.HTTP_409_CONFLICT: OpenApiResponse(
                 response=None,
-                description="unsuccessful operation"
+                description="idempotency key belongs to another order"
             ),
         },
         examples=[
@@ -138,18 +198,28 @@ class PaymentView(APIView):
                     "year": "2026",
                     "code": "123"
                 },
-                status_codes=[str(status.HTTP_200_OK)],
+                status_codes=[str(status.HTTP_202_ACCEPTED)],
             ),
         ],
     )
 
     def post(self, request: Request, pk: int) -> Response:
-        order = Order.objects.get(pk=pk)
-        if int(request.data['number']) % 2 == 0 and int(request.data['number']) % 10 != 0:
-            order.status = 'Оплачен'
-            order.save()
-            return Response(status=status.HTTP_200_OK)
-        else:
-            order.status = 'Ошибка при оплате'
-            order.save()
-            return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        order = get_object_or_404(Order, pk=pk)
+        number = str(request.data.get('number', ''))
+        if not number.isdigit():
+            return Response({'error': 'Invalid card number'}, status=status.HTTP_400_BAD_REQUEST)
+        key = request.headers.get('Idempotency-Key') or default_idempotency_key(order, request.data)
+        if len(key) > PaymentAttempt._meta.get_field('idempotencyKey').max_length:
+            return Response({'error': 'Idempotency key is too long'}, status=status.HTTP_400_BAD_REQUEST)
+        attempt, _ = enqueue_payment(order, number, key)
+        if attempt.order_id != order.pk:
+            return Response({'error': 'Idempotency key belongs to another order'}, status=status.HTTP_409_CONFLICT)
+        return Response(PaymentAttemptSerializer(attempt).data, status=status.HTTP_202_ACCEPTED)
+
+    @extend_schema(responses={status.HTTP_200_OK: PaymentAttemptSerializer})
+    def get(self, request: Request, pk: int) -> Response:
+        """Функция для получения состояния последней попытки оплаты заказа."""
+        attempt = PaymentAttempt.objects.filter(order=pk).select_related('order').order_by('-pk').first()
+        if attempt is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response(PaymentAttemptSerializer(attempt).data, status=status.HTTP_200_OK)
@@ -0,0 +1,105 @@
+from typing import Any, Callable, Dict, Optional
+
+from django.core.paginator import InvalidPage
+from django.http import Http404, HttpRequest, HttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+
+from .categories import aget_category_tree
+from .models import Product, Review, Tag
+from .pagination import KEYSET_SORT_FIELDS, apaginate_keyset, apaginate_page, page_limit
+from .response_cache import CATEGORY, TAG, cache_response
+from .serializers import ProductSerializer, TagsProductSerializer, CategoriesSerializer, REVIEWS_PAGE_SIZE
+from .views import catalog_products, order_catalog
+
+
+class AsyncAPIView(View):
+    """
+    Базовый класс асинхронных Api для ASGI (DRF 3.14 не поддерживает асинхронные обработчики).
+    Ответ - JSON того же вида, что у APIView; ошибки DRF и 404 превращаются в ответ {"detail": ...}.
+    """
+
+    renderer = JSONRenderer()
+
+    @classmethod
+    def as_view(cls, **initkwargs: Any) -> Callable:
+        view = super().as_view(**initkwargs)
+        # Как у APIView: CSRF проверяет SessionAuthentication там, где он нужен.
+        view.csrf_exempt = True
+        return view
+
+    def render(self, data: Any, status: int = status.HTTP_200_OK,
+               headers: Optional[Dict[str, str]] = None) -> HttpResponse:
+        """Функция для построения JSON-ответа; исходные данные доступны в атрибуте data (для кэша ответов)."""
+        content = b'' if data is None else self.renderer.render(data)
+        response = HttpResponse(content, status=status, headers=headers,
+                                content_type=None if data is None else self.renderer.media_type)
+        response.data = data
+        return response
+
+    async def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            return self.render({'detail': exc.detail}, status=exc.status_code)
+        except (Http404, InvalidPage):
+            return self.render({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+
+class AsyncProductDetail(AsyncAPIView):
+    """Асинхронное Api для получения продукта по id (как ProductDetail)"""
+
+    async def get(self, request: HttpRequest, pk: int) -> HttpResponse:
+        products = Product.objects.with_sale_price().prefetch_related('images', 'tags', 'specifications')
+        try:
+            product = await products.aget(pk=pk)
+        except Product.DoesNotExist:
+            raise Http404
+        product._reviews_page = await apaginate_keyset(
+            Review.objects.filter(product=product.pk), 'pk', False, None, REVIEWS_PAGE_SIZE)
+        return self.render(ProductSerializer(product).data)
+
+
+class AsyncTagsList(AsyncAPIView):
+    """Асинхронное Api для получения списка tags (как TagsList)"""
+
+    @cache_response(TAG, CATEGORY)
+    async def get(self, request: HttpRequest) -> HttpResponse:
+        category_pk = request.GET.get('category')
+        if category_pk:
+            category = (await aget_category_tree()).get(int(category_pk))
+            tags = category.tags.all() if category else []
+        else:
+            tags = [tag async for tag in Tag.objects.all()]
+        return self.render(TagsProductSerializer(tags, many=True).data)
+
+
+class AsyncCategoryList(AsyncAPIView):
+    """Асинхронное Api для получения списка categories (как CategoryList)"""
+
+    @cache_response(CATEGORY, TAG)
+    async def get(self, request: HttpRequest) -> HttpResponse:
+        categories = (await aget_category_tree()).roots()
+        return self.render(CategoriesSerializer(categories, many=True).data)
+
+
+class AsyncProductListView(AsyncAPIView):
+    """Асинхронное Api для получения списка продуктов для каталога (как ProductListView, с теми же параметрами)"""
+
+    async def get(self, request: HttpRequest) -> HttpResponse:
+        tree = await aget_category_tree() if request.GET.get('category') else None
+        products, serializer_class, rank_column = catalog_products(request, tree)
+        limit = page_limit(request, 20)
+
+        if 'cursor' in request.GET:
+            field = KEYSET_SORT_FIELDS.get(request.GET.get('sort'), 'pk')
+            descending = request.GET.get('sortType') == 'dec'
+            items, next_cursor = await apaginate_keyset(products, field, descending, request.GET['cursor'], limit)
+            return self.render({'items': serializer_class(items, many=True).data, 'nextCursor': next_cursor})
+
+        products = order_catalog(request, products, rank_column)
+        items, page_number, last_page = await apaginate_page(products, limit, request.GET.get('currentPage', 1))
+        return self.render({'items': serializer_class(items, many=True).data, 'currentPage': page_number,
+                            'lastPage': last_page})
@@ -0,0 +1,59 @@
+import random
+from typing import Dict, List, Optional
+
+from django.core.cache import cache
+
+from .models import Category, Product
+
+BANNER_POOL_CACHE_KEY = 'products:banner-pool'
+# Время жизни пула кандидатов: по его истечении выборка обновляется, и баннеры ротируются.
+BANNER_POOL_TIMEOUT = 5 * 60
+BANNER_POOL_SIZE = 50
+BANNER_CATEGORIES = 3
+
+
+def build_banner_pool(size: int = BANNER_POOL_SIZE, rnd: Optional[random.Random] = None) -> Dict[int, List[int]]:
+    """
+    Функция для построения пула кандидатов в баннеры: до size случайных id продуктов
+    для каждой избранной категории. Продукты всех категорий читаются одним запросом
+    и отбираются резервуарной выборкой, без сортировки ORDER BY RANDOM() в базе.
+    """
+    rnd = rnd or random.Random()
+    category_ids = list(Category.objects.filter(favourite=True).values_list('pk', flat=True)[:BANNER_CATEGORIES])
+    pool: Dict[int, List[int]] = {pk: [] for pk in category_ids}
+    seen: Dict[int, int] = {pk: 0 for pk in category_ids}
+    rows = Product.objects.filter(category__in=category_ids).values_list('category_id', 'pk')
+    for category_id, product_id in rows.iterator(chunk_size=2000):
+        seen[category_id] += 1
+        if len(pool[category_id]) < size:
+            pool[category_id].append(product_id)
+        else:
+            index = rnd.randrange(seen[category_id])
+            if index < size:
+                pool[category_id][index] = product_id
+    return pool
+
+
+def get_banner_pool() -> Dict[int, List[int]]:
+    """Функция для получения пула кандидатов в баннеры из кэша (с построением при промахе)."""
+    pool = cache.get(BANNER_POOL_CACHE_KEY)
+    if pool is None:
+        pool = build_banner_pool()
+        cache.set(BANNER_POOL_CACHE_KEY, pool, timeout=BANNER_POOL_TIMEOUT)
+    return pool
+
+
+def invalidate_banner_pool() -> None:
+    """Функция для сброса закэшированного пула кандидатов в баннеры."""
+    cache.delete(BANNER_POOL_CACHE_KEY)
+
+
+def get_banners() -> List[Product]:
+    """
+    Функция для выбора баннеров: по случайному продукту из пула каждой избранной категории.
+    Продукты загружаются одним пакетным запросом в порядке категорий.
+    """
+    pool = get_banner_pool()
+    picked = [random.choice(candidates) for candidates in pool.values() if candidates]
+    products = Product.objects.for_list().in_bulk(picked)
+    return [products[pk] for pk in picked if pk in products]
@@ -0,0 +1,65 @@
+from typing import Iterable, List
+
+from django.conf import settings
+
+from .models import Product, ProductCatalogEntry, ProductQuerySet
+
+CATALOG_ENTRY_FIELDS = [
+    'category', 'title', 'description', 'fullDescription', 'price', 'salePrice', 'count', 'date', 'freeDelivery',
+    'rating', 'num_reviews', 'limited', 'active', 'images', 'tags', 'specifications',
+]
+
+
+def catalog_products() -> ProductQuerySet:
+    """Функция для получения продуктов со всеми данными, нужными для записей каталога."""
+    return Product.objects.for_list()
+
+
+def build_catalog_entry(product: Product) -> ProductCatalogEntry:
+    """Функция для построения записи каталога по продукту из catalog_products."""
+    return ProductCatalogEntry(
+        product_id=product.pk,
+        category_id=product.category_id,
+        title=product.title,
+        description=product.description,
+        fullDescription=product.fullDescription,
+        price=product.price,
+        salePrice=product.get_sale_price(),
+        count=product.count,
+        date=product.date,
+        freeDelivery=product.freeDelivery,
+        rating=product.rating,
+        num_reviews=product.num_reviews,
+        limited=product.limited,
+        active=product.active,
+        images=[{'src': str(image), 'alt': image.name, 'variants': image.variants}
+                for image in product.images.all()],
+        tags=[{'id': tag.pk, 'name': tag.name} for tag in product.tags.all()],
+        specifications=[{'id': specification.pk, 'name': specification.name, 'value': specification.value}
+                        for specification in product.specifications.all()],
+    )
+
+
+def save_catalog_entries(products: Iterable[Product]) -> int:
+    """Функция для сохранения записей каталога одним запросом (insert или update)."""
+    entries: List[ProductCatalogEntry] = [build_catalog_entry(product) for product in products]
+    if entries:
+        ProductCatalogEntry.objects.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=CATALOG_ENTRY_FIELDS,
+        )
+    return len(entries)
+
+
+def refresh_catalog_entries(product_ids: Iterable[int]) -> None:
+    """
+    Функция для пересчета записей каталога указанных продуктов. Таблица каталога поддерживается
+    только при включенной настройке CATALOG_READ_MODEL (перед включением ее заполняет rebuild_catalog).
+    """
+    if not settings.CATALOG_READ_MODEL:
+        return
+    product_ids = {pk for pk in product_ids if pk is not None}
+    if product_ids:
+        save_catalog_entries(catalog_products().filter(pk__in=product_ids))
@@ -0,0 +1,78 @@
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from django.core.cache import cache
+from django.db.models import Prefetch, QuerySet
+
+from .models import Category
+
+CATEGORY_TREE_CACHE_KEY = 'products:category-tree'
+
+
+class CategoryTree:
+    """
+    Дерево категорий в памяти: категории с иконками, тегами и подкатегориями,
+    загруженные одним набором запросов и разрешающие потомков любой глубины без обращения к базе.
+    """
+
+    def __init__(self, categories: List[Category]) -> None:
+        self.categories: Dict[int, Category] = {category.pk: category for category in categories}
+        self.children: Dict[int, List[int]] = defaultdict(list)
+        for category in categories:
+            if category.parent_id is not None:
+                self.children[category.parent_id].append(category.pk)
+
+    @staticmethod
+    def queryset() -> QuerySet:
+        """Запрос всех категорий с иконками, тегами и подкатегориями."""
+        subcategories = Category.objects.select_related('image').prefetch_related('tags')
+        return Category.objects.select_related('image').prefetch_related(
+            'tags', Prefetch('subcategories', queryset=subcategories))
+
+    @classmethod
+    def load(cls) -> 'CategoryTree':
+        """Загружает все категории из базы данных."""
+        return cls(list(cls.queryset()))
+
+    @classmethod
+    async def aload(cls) -> 'CategoryTree':
+        """Асинхронно загружает все категории из базы данных."""
+        return cls([category async for category in cls.queryset()])
+
+    def roots(self) -> List[Category]:
+        """Возвращает категории верхнего уровня."""
+        return [category for category in self.categories.values() if category.parent_id is None]
+
+    def get(self, pk: int) -> Optional[Category]:
+        """Возвращает категорию по id или None."""
+        return self.categories.get(pk)
+
+    def descendant_ids(self, pk: int) -> List[int]:
+        """Возвращает id категории и всех ее потомков."""
+        ids = [pk]
+        for category_id in ids:
+            ids.extend(self.children.get(category_id, []))
+        return ids
+
+
+def get_category_tree() -> CategoryTree:
+    """Функция для получения дерева категорий из кэша (с загрузкой при промахе)."""
+    tree = cache.get(CATEGORY_TREE_CACHE_KEY)
+    if tree is None:
+        tree = CategoryTree.load()
+        cache.set(CATEGORY_TREE_CACHE_KEY, tree, timeout=None)
+    return tree
+
+
+async def aget_category_tree() -> CategoryTree:
+    """Асинхронная версия get_category_tree."""
+    tree = await cache.aget(CATEGORY_TREE_CACHE_KEY)
+    if tree is None:
+        tree = await CategoryTree.aload()
+        await cache.aset(CATEGORY_TREE_CACHE_KEY, tree, timeout=None)
+    return tree
+
+
+def invalidate_category_tree() -> None:
+    """Функция для сброса закэшированного дерева категорий."""
+    cache.delete(CATEGORY_TREE_CACHE_KEY)
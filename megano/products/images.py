@@ -0,0 +1,162 @@
+import hashlib
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Type, Union
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from django.db.models.fields.files import FieldFile
+from PIL import Image, ImageOps
+
+from .models import CategoryIcon, ProductImage
+
+logger = logging.getLogger(__name__)
+
+# Ширина изображения в карточках списков: src списков указывает на ближайшую копию не уже этой.
+CARD_WIDTH = 320
+QUALITY = 80
+
+ImageModel = Union[ProductImage, CategoryIcon]
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def image_field(instance: ImageModel) -> FieldFile:
+    """Функция для получения файла изображения продукта или иконки категории."""
+    return instance.src if isinstance(instance, CategoryIcon) else instance.image
+
+
+def derivative_formats() -> List[str]:
+    """Функция для получения форматов копий из IMAGE_DERIVATIVE_FORMATS, которые умеет сохранять Pillow."""
+    extensions = Image.registered_extensions()
+    return [fmt for fmt in settings.IMAGE_DERIVATIVE_FORMATS
+            if extensions.get(f'.{fmt}') in Image.SAVE]
+
+
+def derivative_name(name: str, digest: str, width: int, fmt: str) -> str:
+    """Функция для имени копии рядом с оригиналом: <имя>.<хэш содержимого>.<ширина>w.<формат>."""
+    directory, filename = posixpath.split(name)
+    return posixpath.join(directory, f'{filename.rsplit(".", 1)[0]}.{digest}.{width}w.{fmt}')
+
+
+def build_variants(file: FieldFile, overwrite: bool = False) -> Dict[str, Any]:
+    """
+    Функция для построения уменьшенных копий изображения шириной из IMAGE_DERIVATIVE_WIDTHS (не шире оригинала)
+    в каждом формате derivative_formats. Имена копий содержат хэш содержимого оригинала, поэтому уже
+    существующие копии не пересоздаются (если не задан overwrite), а замена файла дает новые имена.
+    В результате запоминаются настройки, с которыми построены копии (см. needs_variants).
+    """
+    with file.open('rb'):
+        data = file.read()
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    widths = sorted(set(settings.IMAGE_DERIVATIVE_WIDTHS))
+    formats = derivative_formats()
+    images = []
+    with Image.open(BytesIO(data)) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ('RGB', 'RGBA'):
+            original = original.convert('RGBA')
+        for width in sorted({min(width, original.width) for width in widths}):
+            resized = None
+            for fmt in formats:
+                name = derivative_name(file.name, digest, width, fmt)
+                if overwrite or not file.storage.exists(name):
+                    if resized is None:
+                        height = max(1, round(original.height * width / original.width))
+                        resized = original.resize((width, height), Image.LANCZOS)
+                    buffer = BytesIO()
+                    resized.save(buffer, format=Image.registered_extensions()[f'.{fmt}'], quality=QUALITY)
+                    file.storage.delete(name)
+                    file.storage.save(name, ContentFile(buffer.getvalue()))
+                images.append({'src': name, 'width': width, 'format': fmt})
+    return {'source': file.name, 'widths': widths, 'formats': formats, 'images': images}
+
+
+def needs_variants(instance: ImageModel) -> bool:
+    """
+    Функция для проверки, что копии отсутствуют, построены для другого файла или с другими
+    IMAGE_DERIVATIVE_WIDTHS/IMAGE_DERIVATIVE_FORMATS.
+    """
+    name = image_field(instance).name
+    variants = instance.variants
+    return bool(name) and (variants.get('source') != name
+                           or variants.get('widths') != sorted(set(settings.IMAGE_DERIVATIVE_WIDTHS))
+                           or variants.get('formats') != derivative_formats())
+
+
+def update_variants(model: Type[ImageModel], pk: int, force: bool = False) -> bool:
+    """
+    Функция для построения копий изображения и сохранения их списка (сохранение модели обновляет
+    каталог и кэши витрины сигналами). С force копии перестраиваются и перезаписываются, даже если актуальны.
+    Возвращает False, если копии уже актуальны или изображение удалено.
+    """
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or not (force or needs_variants(instance)):
+        return False
+    instance.variants = build_variants(image_field(instance), overwrite=force)
+    instance.save(update_fields=['variants'])
+    return True
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Функция для получения пула потоков веб-процесса, строящего копии изображений."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.IMAGE_WORKER_THREADS, thread_name_prefix='images')
+        return _executor
+
+
+def safe_update_variants(model: Type[ImageModel], pk: int) -> None:
+    """Функция для построения копий, при которой ошибка (например, поврежденный файл) только пишется в журнал."""
+    try:
+        update_variants(model, pk)
+    except Exception:
+        logger.exception('Building image variants for %s %s failed', model.__name__, pk)
+
+
+def run_update_variants(model: Type[ImageModel], pk: int) -> None:
+    """Функция для построения копий в потоке пула с управлением соединениями с базой данных."""
+    close_old_connections()
+    try:
+        safe_update_variants(model, pk)
+    finally:
+        close_old_connections()
+
+
+def submit_variants(model: Type[ImageModel], pk: int) -> None:
+    """
+    Функция для построения копий в пуле потоков веб-процесса (IMAGE_WORKER_THREADS) или,
+    если пул выключен (0), сразу в текущем потоке.
+    """
+    if settings.IMAGE_WORKER_THREADS > 0:
+        get_executor().submit(run_update_variants, model, pk)
+    else:
+        safe_update_variants(model, pk)
+
+
+def media_url(name: str) -> str:
+    """Функция для адреса файла в хранилище медиа."""
+    return ProductImage._meta.get_field('image').storage.url(name)
+
+
+def responsive_image(variants: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Функция для полей изображения в списках: src - копия для карточки (CARD_WIDTH), srcset - все копии
+    первого формата. Пустой словарь, если копий еще нет (тогда остается адрес оригинала).
+    """
+    images = variants.get('images') if variants else None
+    if not images:
+        return {}
+    fmt = images[0]['format']
+    images = sorted((image for image in images if image['format'] == fmt), key=lambda image: image['width'])
+    card = next((image for image in images if image['width'] >= CARD_WIDTH), images[-1])
+    return {
+        'src': media_url(card['src']),
+        'srcset': ', '.join(f'{media_url(image["src"])} {image["width"]}w' for image in images),
+    }
@@ -0,0 +1,17 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from products.sales import activate_sales
+
+
+class Command(BaseCommand):
+    """
+    Команда для пересчета действующих скидок (ActiveSale) и цен в каталоге на текущий день.
+    Запускайте по расписанию в начале каждого дня и после loaddata.
+    """
+    help = 'Materialize the sales active today (one per product) and refresh affected catalog entries'
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        changed = activate_sales()
+        self.stdout.write(self.style.SUCCESS(f'Active sales refreshed: {len(changed)} products changed'))
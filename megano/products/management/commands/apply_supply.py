@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from products.serializers import ProductSupplySerializer
+from products.supply import CHUNK_SIZE, apply_product_updates
+from products.transfer import FORMATS, batched, read_records
+
+
+class Command(BaseCommand):
+    """
+    Команда для пакетного изменения цен и остатков из файла поставщика (JSONL или CSV с колонками id, price, count).
+    Файл читается потоково и применяется одной транзакцией: при ошибке в любой записи база не меняется.
+    """
+    help = 'Apply a supplier feed of product prices and stock counts'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('path', help='file to read, "-" for stdin')
+        parser.add_argument('--format', choices=FORMATS, help='defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def validated(self, records: Iterable[Dict[str, Any]], chunk_size: int) -> Iterator[Dict[str, Any]]:
+        """Проверяет записи частями сериализатором Api поставщика."""
+        for number, chunk in enumerate(batched(records, chunk_size)):
+            serializer = ProductSupplySerializer(data=chunk, many=True)
+            if not serializer.is_valid():
+                index, errors = next((index, errors) for index, errors in enumerate(serializer.errors) if errors)
+                raise CommandError(f'Record {number * chunk_size + index + 1}: {errors}; nothing was saved')
+            yield from serializer.validated_data
+
+    def handle(self, *args: Any, path: str, format: str, chunk_size: int, **options: Any) -> None:
+        fmt = format or os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt not in FORMATS:
+            raise CommandError(f'Unknown format {fmt!r}, use --format {"/".join(FORMATS)}')
+        started = time.perf_counter()
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+        try:
+            result = apply_product_updates(self.validated(read_records(stream, fmt), chunk_size), chunk_size)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        elapsed = time.perf_counter() - started
+        if result['missing']:
+            self.stderr.write(f'Unknown product ids skipped: {", ".join(map(str, result["missing"][:20]))}'
+                              f'{" ..." if len(result["missing"]) > 20 else ""}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Supply applied in {elapsed:.1f}s: {result["updated"]} updated, {result["unchanged"]} unchanged, '
+            f'{len(result["missing"])} missing'))
@@ -0,0 +1,177 @@
+import asyncio
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+from wsgiref.util import setup_testing_defaults
+
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connection, connections
+from django.test import override_settings
+
+from megano.settings import CART_SESSION_ID
+from products.models import Category, Product, ProductImage, Review, Specification, Tag
+
+MODES = ['wsgi', 'asgi-sync', 'asgi']
+
+
+class Command(BaseCommand):
+    """
+    Команда для сравнения развертываний WSGI и ASGI на горячих Api (каталог, продукт, категории, теги, корзина)
+    под параллельной нагрузкой: запросов в секунду, медиана и 99-й перцентиль задержки.
+    Приложения вызываются напрямую (без сети и HTTP-сервера): WSGI - из пула потоков, как многопоточный сервер,
+    ASGI - конкурентными задачами одного цикла событий, как один процесс uvicorn.
+    Режим asgi-sync - ASGI с синхронными Api (ROOT_URLCONF), asgi - с асинхронными (ASGI_URLCONF).
+    Работает на временной тестовой базе данных.
+    """
+    help = 'Compare requests/sec and p99 latency of the hot read endpoints under WSGI and ASGI ' \
+           '(uses a throwaway test database)'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=500, help='requests per endpoint and mode')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args: Any, products: int, requests: int, concurrency: int, modes: List[str], seed: int,
+               **options: Any) -> None:
+        directory = tempfile.TemporaryDirectory()
+        if connection.vendor == 'sqlite':
+            # Потоки должны работать с одной базой, а не каждый со своей базой в памяти.
+            connection.settings_dict['TEST']['NAME'] = os.path.join(directory.name, 'benchmark_asgi.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=['localhost']):
+                endpoints, cookie = self.generate_data(products, random.Random(seed))
+                connections.close_all()
+                self.stdout.write(f'{requests} requests per endpoint, concurrency {concurrency}')
+                self.stdout.write(f'{"endpoint":<12} {"mode":<10} {"req/s":>8} {"p50, ms":>9} {"p99, ms":>9} '
+                                  f'{"errors":>7}')
+                for name, path, query in endpoints:
+                    for mode in modes:
+                        latencies, elapsed, errors = self.run(mode, path, query, cookie, requests, concurrency)
+                        p50 = statistics.median(latencies)
+                        p99 = statistics.quantiles(latencies, n=100)[98]
+                        self.stdout.write(f'{name:<12} {mode:<10} {requests / elapsed:>8.0f} {p50:>9.1f} '
+                                          f'{p99:>9.1f} {errors:>7}')
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            directory.cleanup()
+
+    @staticmethod
+    def generate_data(size: int, rnd: random.Random) -> Tuple[List[Tuple[str, str, str]], str]:
+        """Создает категории, теги и size продуктов с изображениями и отзывами; возвращает Api и cookie сессии."""
+        tags = Tag.objects.bulk_create(Tag(name=f'tag {number}') for number in range(10))
+        specification = Specification.objects.create(name='name', value='value')
+        roots = Category.objects.bulk_create(Category(title=f'category {number}', active=True) for number in range(5))
+        children = Category.objects.bulk_create(
+            Category(title=f'{root.title}.{number}', parent=root, active=True) for root in roots for number in range(3))
+        for category in roots:
+            category.tags.set(rnd.sample(tags, 3))
+        products = Product.objects.bulk_create(
+            Product(title=f'product {number}', price=rnd.randint(10, 5000), count=100, review_count=2, rating=4,
+                    rating_sum=8, active=True, category=rnd.choice(children))
+            for number in range(size))
+        ProductImage.objects.bulk_create(
+            ProductImage(product=product, image=f'products/images/{product.pk}.webp') for product in products)
+        Product.tags.through.objects.bulk_create(
+            Product.tags.through(product=product, tag=tag) for product in products for tag in rnd.sample(tags, 2))
+        Product.specifications.through.objects.bulk_create(
+            Product.specifications.through(product=product, specification=specification) for product in products)
+        Review.objects.bulk_create(
+            Review(product=product, author='author', email='a@a.ru', text='text', rate=4)
+            for product in products for _ in range(2))
+
+        session = SessionStore()
+        session[CART_SESSION_ID] = {
+            str(product.pk): {'count': 1, 'price': str(product.price)} for product in rnd.sample(products, 5)}
+        session.create()
+
+        endpoints = [
+            ('catalog', '/api/catalog/', 'currentPage=2&limit=20&sort=price&sortType=inc'),
+            ('product', f'/api/product/{products[0].pk}/', ''),
+            ('categories', '/api/categories/', ''),
+            ('tags', '/api/tags/', ''),
+            ('basket', '/api/basket', ''),
+        ]
+        return endpoints, f'sessionid={session.session_key}'
+
+    def run(self, mode: str, path: str, query: str, cookie: str, requests: int,
+            concurrency: int) -> Tuple[List[float], float, int]:
+        """Выполняет requests запросов в режиме mode; возвращает задержки (мс), общее время (с) и число ошибок."""
+        if mode == 'wsgi':
+            from megano.wsgi import application
+            return self.run_wsgi(application, path, query, cookie, requests, concurrency)
+        if mode == 'asgi-sync':
+            application = ASGIHandler()
+        else:
+            from megano.asgi import application
+        return asyncio.run(self.run_asgi(application, path, query, cookie, requests, concurrency))
+
+    @staticmethod
+    def run_wsgi(application: Callable, path: str, query: str, cookie: str, requests: int,
+                 concurrency: int) -> Tuple[List[float], float, int]:
+        """Нагрузка на WSGI-приложение из пула concurrency потоков."""
+        def request(_: int) -> Tuple[float, bool]:
+            environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'HTTP_HOST': 'localhost',
+                       'HTTP_COOKIE': cookie, 'wsgi.input': io.BytesIO()}
+            setup_testing_defaults(environ)
+            statuses: List[str] = []
+            started = time.perf_counter()
+            body = b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+            return (time.perf_counter() - started) * 1000, bool(body) and statuses[0].startswith('200')
+
+        for number in range(concurrency):
+            request(number)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            started = time.perf_counter()
+            results = list(executor.map(request, range(requests)))
+            elapsed = time.perf_counter() - started
+        return [latency for latency, _ in results], elapsed, sum(not ok for _, ok in results)
+
+    @staticmethod
+    async def run_asgi(application: Callable, path: str, query: str, cookie: str, requests: int,
+                       concurrency: int) -> Tuple[List[float], float, int]:
+        """Нагрузка на ASGI-приложение: не более concurrency одновременных запросов в одном цикле событий."""
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+            'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+            'client': ('127.0.0.1', 50000), 'server': ('localhost', 80),
+        }
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request() -> Tuple[float, bool]:
+            messages: List[Dict[str, Any]] = []
+            received = False
+
+            async def receive() -> Dict[str, Any]:
+                nonlocal received
+                if received:
+                    await asyncio.Future()
+                received = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message: Dict[str, Any]) -> None:
+                messages.append(message)
+
+            async with semaphore:
+                started = time.perf_counter()
+                await application(dict(scope), receive, send)
+                latency = (time.perf_counter() - started) * 1000
+            body = b''.join(message.get('body', b'') for message in messages if message['type'] == 'http.response.body')
+            return latency, bool(body) and messages[0]['status'] == 200
+
+        await asyncio.gather(*(request() for _ in range(concurrency)))
+        started = time.perf_counter()
+        results = await asyncio.gather(*(request() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+        return [latency for latency, _ in results], elapsed, sum(not ok for _, ok in results)
@@ -0,0 +1,83 @@
+import random
+import statistics
+import time
+from typing import Any, List
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connection
+
+from products.models import Product, Tag
+from products.search import ProductSearchBackend, get_search_backend
+
+NOUNS = ['Смартфон', 'Телевизор', 'Ноутбук', 'Планшет', 'Наушники', 'Смарт-часы', 'Приставка', 'Монитор',
+         'Колонка', 'Роутер', 'Фотоаппарат', 'Видеокарта']
+BRANDS = ['Xiaomi', 'Samsung', 'Apple', 'HUAWEI', 'Sony', 'LG', 'ASUS', 'Lenovo', 'Philips', 'Honor', 'Realme',
+          'Acer', 'Dell', 'Canon', 'Nikon', 'JBL', 'TP-Link', 'Lumax', 'Haier', 'Hisense']
+WORDS = ['черный', 'белый', 'зеленый', 'синий', 'Pro', 'Ultra', 'Max', 'Lite', 'Plus', 'OLED', 'LED', 'AMOLED',
+         'NFC', '5G', 'Wi-Fi', 'Bluetooth', 'HDMI', 'USB', 'GPS', 'ГБ', 'ядер', 'камера', 'дюйм', 'зарядка']
+TAGS = ['С беспроводной зарядкой', 'Водонепроницаемые', 'Wi-Fi', 'Игровые', 'Для дома', 'Новинка', 'Хит продаж']
+QUERIES = ['xiaomi', 'смартфон samsung', 'oled', 'телевизор', 'pro max', 'игровые', 'наушники jbl', 'зеленый']
+
+
+class Command(BaseCommand):
+    """
+    Команда для сравнения поиска по каталогу: icontains против индекса текущего поискового бэкенда.
+    Работает на временной тестовой базе данных со сгенерированным каталогом.
+    """
+    help = 'Benchmark catalog name search on a synthetic catalog (uses a throwaway test database)'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--products', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args: Any, products: int, repeat: int, seed: int, **options: Any) -> None:
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.generate_catalog(products, random.Random(seed))
+            backend = get_search_backend()
+            started = time.perf_counter()
+            backend.rebuild(batch_size=5000)
+            self.stdout.write(f'{type(backend).__name__}: index built in {time.perf_counter() - started:.1f} s')
+            self.stdout.write(f'{"query":<20} {"icontains, ms":>22} {type(backend).__name__ + ", ms":>32}')
+            for query in QUERIES:
+                baseline = self.measure(ProductSearchBackend(), query, repeat)
+                indexed = self.measure(backend, query, repeat)
+                self.stdout.write(f'{query:<20} {baseline:>22} {indexed:>32}')
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def generate_catalog(self, size: int, rnd: random.Random) -> None:
+        """Создает size продуктов со случайными названиями, описаниями и тегами."""
+        tags = Tag.objects.bulk_create(Tag(name=name) for name in TAGS)
+        through = Product.tags.through
+        started = time.perf_counter()
+        for offset in range(0, size, 5000):
+            batch = Product.objects.bulk_create(
+                Product(
+                    title=f'{rnd.choice(NOUNS)} {rnd.choice(BRANDS)} {" ".join(rnd.sample(WORDS, 3))}',
+                    description=' '.join(rnd.choices(WORDS, k=12)),
+                    price=rnd.randint(10, 5000),
+                    count=rnd.randint(0, 50),
+                    active=True,
+                )
+                for _ in range(min(5000, size - offset))
+            )
+            through.objects.bulk_create(
+                through(product_id=product.pk, tag_id=tag.pk)
+                for product in batch
+                for tag in rnd.sample(tags, 2)
+            )
+        self.stdout.write(f'{size} products generated in {time.perf_counter() - started:.1f} s')
+
+    def measure(self, backend: ProductSearchBackend, query: str, repeat: int) -> str:
+        """Замеряет запросы страницы каталога (COUNT и первые 20 строк), возвращает медиану и максимум."""
+        timings: List[float] = []
+        count = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            products = backend.filter(Product.objects.all(), query)
+            count = products.count()
+            list(products.order_by('pk')[:20])
+            timings.append((time.perf_counter() - started) * 1000)
+        return f'{statistics.median(timings):.1f} (max {max(timings):.1f}, {count} found)'
@@ -0,0 +1,31 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from products.images import needs_variants, update_variants
+from products.models import CategoryIcon, ProductImage
+
+
+class Command(BaseCommand):
+    """
+    Команда для построения уменьшенных копий уже загруженных изображений продуктов и иконок категорий
+    (после loaddata или изменения IMAGE_DERIVATIVE_WIDTHS/IMAGE_DERIVATIVE_FORMATS). С --force все копии
+    перестраиваются и перезаписываются в хранилище.
+    """
+    help = 'Build resized image variants for product images and category icons'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--force', action='store_true', help='Rebuild and overwrite variants that are already up to date')
+
+    def handle(self, *args: Any, force: bool, **options: Any) -> None:
+        built = failed = 0
+        for model in (ProductImage, CategoryIcon):
+            for instance in model.objects.order_by('pk').iterator():
+                if not force and not needs_variants(instance):
+                    continue
+                try:
+                    built += update_variants(model, instance.pk, force=force)
+                except (OSError, ValueError) as error:
+                    failed += 1
+                    self.stderr.write(f'{model.__name__} {instance.pk}: {error}')
+        self.stdout.write(self.style.SUCCESS(f'Image variants built: {built}, failed: {failed}'))
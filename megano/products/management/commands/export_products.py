@@ -0,0 +1,38 @@
+import os
+import sys
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from products.transfer import BATCH_SIZE, FORMATS, export_records, write_records
+
+
+class Command(BaseCommand):
+    """Команда для потоковой выгрузки продуктов со связями в JSONL или CSV (формат загрузки import_products)."""
+    help = 'Export products with tags, specifications, category, images and sales to a JSONL or CSV file'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('path', help='file to write, "-" for stdout')
+        parser.add_argument('--format', choices=FORMATS, help='defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args: Any, path: str, format: str, batch_size: int, **options: Any) -> None:
+        fmt = format or os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt not in FORMATS:
+            raise CommandError(f'Unknown format {fmt!r}, use --format {"/".join(FORMATS)}')
+        started = time.perf_counter()
+        # При выгрузке в stdout отчет о ходе пишется в stderr, чтобы не смешиваться с данными.
+        report = self.stderr if path == '-' else self.stdout
+        stream = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8', newline='')
+        exported = 0
+        try:
+            for exported in write_records(export_records(batch_size), stream, fmt):
+                if exported % batch_size == 0:
+                    rate = exported / (time.perf_counter() - started)
+                    report.write(f'{exported} products exported ({rate:.0f}/s)')
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        elapsed = time.perf_counter() - started
+        report.write(self.style.SUCCESS(f'Products exported: {exported} in {elapsed:.1f}s'))
@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+from typing import Any
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import transaction
+
+from products.transfer import BATCH_SIZE, FORMATS, ProductImporter, read_records
+
+
+class Command(BaseCommand):
+    """
+    Команда для потоковой загрузки продуктов из JSONL или CSV (формат записей - products.transfer,
+    такой же выгружает export_products). Загрузка идет пачками в одной транзакции: при ошибке
+    в любой записи база не меняется.
+    """
+    help = 'Import products with tags, specifications, category, images and sales from a JSONL or CSV file'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('path', help='file to read, "-" for stdin')
+        parser.add_argument('--format', choices=FORMATS, help='defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args: Any, path: str, format: str, batch_size: int, **options: Any) -> None:
+        fmt = format or os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt not in FORMATS:
+            raise CommandError(f'Unknown format {fmt!r}, use --format {"/".join(FORMATS)}')
+        importer = ProductImporter()
+        started = time.perf_counter()
+
+        def progress(loaded: int) -> None:
+            rate = loaded / (time.perf_counter() - started)
+            self.stdout.write(f'{loaded} products imported ({rate:.0f}/s)')
+
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+        try:
+            with transaction.atomic():
+                importer.run(read_records(stream, fmt), batch_size=batch_size, progress=progress)
+        except (ValidationError, ValueError, KeyError, TypeError) as error:
+            message = '; '.join(error.messages) if isinstance(error, ValidationError) else repr(error)
+            raise CommandError(f'Import failed, nothing was saved: {message}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Products imported: {importer.created} created, {importer.updated} updated in {elapsed:.1f}s'))
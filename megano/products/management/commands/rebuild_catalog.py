@@ -0,0 +1,29 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction
+
+from products.catalog import catalog_products, save_catalog_entries
+
+
+class Command(BaseCommand):
+    """
+    Команда для полного пересчета таблицы ProductCatalogEntry.
+    Нужна после loaddata; начало и окончание скидок учитывает ежедневная команда activate_sales.
+    """
+    help = 'Rebuild the denormalized product catalog table'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args: Any, batch_size: int, **options: Any) -> None:
+        saved = 0
+        last_pk = 0
+        with transaction.atomic():
+            while True:
+                products = list(catalog_products().filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+                if not products:
+                    break
+                saved += save_catalog_entries(products)
+                last_pk = products[-1].pk
+        self.stdout.write(self.style.SUCCESS(f'Catalog rebuilt: {saved} entries saved'))
@@ -0,0 +1,18 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from products.search import get_search_backend
+
+
+class Command(BaseCommand):
+    """Команда для полного перестроения поискового индекса продуктов (например, после loaddata)."""
+    help = 'Rebuild the product full-text search index'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args: Any, batch_size: int, **options: Any) -> None:
+        backend = get_search_backend()
+        indexed = backend.rebuild(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f'{type(backend).__name__}: {indexed} products indexed'))
@@ -0,0 +1,19 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from products.catalog import refresh_catalog_entries
+from products.models import Product
+from products.response_cache import PRODUCT, REVIEW, bump_generation
+
+
+class Command(BaseCommand):
+    """Команда для исправления расхождений счетчиков рейтинга продуктов с их отзывами (например, после loaddata)."""
+    help = 'Recompute rating_sum, review_count and rating for products whose counters drifted'
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        fixed = Product.objects.reconcile_ratings()
+        if fixed:
+            refresh_catalog_entries(fixed)
+            bump_generation(PRODUCT, REVIEW)
+        self.stdout.write(self.style.SUCCESS(f'Ratings reconciled: {len(fixed)} products fixed'))
@@ -0,0 +1,229 @@
+# Generated by Django 4.2 on 2026-10-18 19:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+import products.models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(db_index=True, max_length=128)),
+                ('active', models.BooleanField(default=False)),
+                ('favourite', models.BooleanField(default=False)),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='subcategories', to='products.category')),
+            ],
+            options={
+                'verbose_name': 'Category',
+                'verbose_name_plural': 'Categories',
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(db_index=True, max_length=100)),
+                ('description', models.TextField(blank=True, max_length=200)),
+                ('fullDescription', models.TextField(blank=True)),
+                ('price', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('count', models.IntegerField(default=0)),
+                ('date', models.DateTimeField(auto_now_add=True)),
+                ('freeDelivery', models.BooleanField(default=True)),
+                ('rating', models.DecimalField(decimal_places=1, default=0, max_digits=2)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('review_count', models.IntegerField(default=0)),
+                ('limited', models.BooleanField(default=False)),
+                ('active', models.BooleanField(default=False)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='products', to='products.category')),
+            ],
+            options={
+                'verbose_name': 'Product',
+                'verbose_name_plural': 'Products',
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Specification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('value', models.CharField(max_length=100)),
+            ],
+            options={
+                'verbose_name': 'Specification',
+                'verbose_name_plural': 'Specifications',
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+            ],
+            options={
+                'verbose_name': 'Tag',
+                'verbose_name_plural': 'Tags',
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ActiveSale',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='active_sale', serialize=False, to='products.product')),
+                ('salePrice', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('dateTo', models.DateField()),
+            ],
+            options={
+                'verbose_name': 'Active sale',
+                'verbose_name_plural': 'Active sales',
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductCatalogEntry',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='catalog_entry', serialize=False, to='products.product')),
+                ('title', models.CharField(db_index=True, max_length=100)),
+                ('description', models.TextField(blank=True, max_length=200)),
+                ('fullDescription', models.TextField(blank=True)),
+                ('price', models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=10)),
+                ('salePrice', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('count', models.IntegerField(default=0)),
+                ('date', models.DateTimeField(db_index=True)),
+                ('freeDelivery', models.BooleanField(default=True)),
+                ('rating', models.DecimalField(db_index=True, decimal_places=1, default=0, max_digits=2)),
+                ('num_reviews', models.IntegerField(db_index=True, default=0)),
+                ('limited', models.BooleanField(default=False)),
+                ('active', models.BooleanField(default=False)),
+                ('images', models.JSONField(blank=True, default=list)),
+                ('tags', models.JSONField(blank=True, default=list)),
+                ('specifications', models.JSONField(blank=True, default=list)),
+            ],
+            options={
+                'verbose_name': 'Catalog entry',
+                'verbose_name_plural': 'Catalog entries',
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Sale',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('salePrice', models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=10)),
+                ('dateFrom', models.DateField(blank=True, null=True)),
+                ('dateTo', models.DateField(blank=True, null=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='salePrice', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Sale',
+                'verbose_name_plural': 'Sales',
+            },
+        ),
+        migrations.CreateModel(
+            name='Review',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.CharField(max_length=100)),
+                ('email', models.EmailField(max_length=254)),
+                ('text', models.TextField()),
+                ('rate', models.IntegerField(default=5)),
+                ('date', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='products.product', verbose_name='product')),
+            ],
+            options={
+                'verbose_name': 'Review',
+                'verbose_name_plural': 'Reviews',
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.ImageField(upload_to=products.models.product_images_directory_path)),
+                ('name', models.CharField(blank=True, max_length=200)),
+                ('variants', models.JSONField(blank=True, default=dict, editable=False)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Product image',
+                'verbose_name_plural': 'Product images',
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='specifications',
+            field=models.ManyToManyField(related_name='products', to='products.specification'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='tags',
+            field=models.ManyToManyField(related_name='products', to='products.tag'),
+        ),
+        migrations.CreateModel(
+            name='CategoryIcon',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('src', models.ImageField(max_length=500, upload_to=products.models.category_icons_directory_path)),
+                ('alt', models.CharField(blank=True, max_length=200)),
+                ('variants', models.JSONField(blank=True, default=dict, editable=False)),
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='image', to='products.category')),
+            ],
+            options={
+                'verbose_name': 'Category icon',
+                'verbose_name_plural': 'Category icons',
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='tags',
+            field=models.ManyToManyField(related_name='categories', to='products.tag'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['dateFrom', 'id'], name='products_sa_dateFro_c4b3fb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['product', 'dateFrom', 'dateTo'], name='products_sa_product_a4f75c_idx'),
+        ),
+        migrations.AddField(
+            model_name='productcatalogentry',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.category'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price', 'id'], name='products_pr_price_dbec84_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['rating', 'id'], name='products_pr_rating_6f555e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['date', 'id'], name='products_pr_date_508d7a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['review_count', 'id'], name='products_pr_review__dd5cdf_idx'),
+        ),
+        migrations.AddField(
+            model_name='activesale',
+            name='sale',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='activation', to='products.sale'),
+        ),
+    ]
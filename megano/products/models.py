@@ -1,6 +1,10 @@
+import datetime
 from decimal import Decimal
+from typing import List, Optional
 
 from django.db import models
+from django.db.models import Case, Count, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Round
 
 
 class Tag(models.Model):
@@ -58,6 +62,8 @@ class CategoryIcon(models.Model):
     src = models.ImageField(upload_to=category_icons_directory_path, max_length=500)
     category = models.OneToOneField(Category, on_delete=models.CASCADE, related_name="image")
     alt = models.CharField(max_length=200, null=False, blank=True)
+    # Уменьшенные копии изображения (products.images): {'source': имя оригинала, 'images': [...]}.
+    variants = models.JSONField(default=dict, blank=True, editable=False)
 
     def href(self) -> str:
         return self.icon
@@ -80,12 +86,73 @@ class Specification(models.Model):
         return self.name
 
 
+class ProductQuerySet(models.QuerySet):
+    """QuerySet продуктов с аннотациями для сериализаторов."""
+
+    def with_sale_price(self) -> 'ProductQuerySet':
+        """Аннотирует продукты ценой действующей скидки одним запросом."""
+        sales = ActiveSale.objects.current().filter(product=OuterRef('pk'))
+        return self.annotate(sale_price=Subquery(sales.values('salePrice')[:1]))
+
+    def with_num_reviews(self) -> 'ProductQuerySet':
+        """Аннотирует продукты количеством отзывов (хранимым счетчиком review_count)."""
+        return self.annotate(num_reviews=F('review_count'))
+
+    def add_rating(self, rate: int, count: int = 1) -> int:
+        """
+        Атомарно добавляет оценку к счетчикам рейтинга продуктов и пересчитывает rating
+        одним UPDATE (rate=-оценка, count=-1 при удалении отзыва). Без отзывов rating равен 0.
+        """
+        average = ExpressionWrapper(
+            (F('rating_sum') + rate) * 1.0 / (F('review_count') + count),
+            output_field=models.FloatField(),
+        )
+        return self.update(
+            rating_sum=F('rating_sum') + rate,
+            review_count=F('review_count') + count,
+            rating=Case(When(review_count__gt=-count, then=Round(average, 1)), default=Value(0),
+                        output_field=models.DecimalField()),
+        )
+
+    def reconcile_ratings(self) -> List[int]:
+        """Пересчитывает счетчики рейтинга по отзывам для разошедшихся продуктов, возвращает их id."""
+        reviews = Review.objects.filter(product=OuterRef('pk')).order_by().values('product')
+        actual_sum = Coalesce(Subquery(reviews.annotate(total=Sum('rate')).values('total')), 0)
+        actual_count = Coalesce(Subquery(reviews.annotate(total=Count('pk')).values('total')), 0)
+        drifted = self.annotate(actual_sum=actual_sum, actual_count=actual_count).exclude(
+            rating_sum=F('actual_sum'), review_count=F('actual_count')).values_list('pk', flat=True)
+        drifted_ids = list(drifted)
+        if drifted_ids:
+            Product.objects.filter(pk__in=drifted_ids).update(rating_sum=actual_sum, review_count=actual_count)
+            Product.objects.filter(pk__in=drifted_ids).update(rating=Case(
+                When(review_count__gt=0, then=Round(ExpressionWrapper(
+                    F('rating_sum') * 1.0 / F('review_count'), output_field=models.FloatField()), 1)),
+                default=Value(0), output_field=models.DecimalField()))
+        return drifted_ids
+
+    def for_list(self) -> 'ProductQuerySet':
+        """
+        План загрузки для ProductListSerializer: цена скидки и количество отзывов
+        считаются в основном запросе, изображения, теги и спецификации
+        подгружаются отдельными запросами на всю страницу.
+        """
+        return self.with_sale_price().with_num_reviews().prefetch_related('images', 'tags', 'specifications')
+
+
 class Product(models.Model):
     """Модель продуктов"""
     class Meta:
         verbose_name = 'Product'
         verbose_name_plural = 'Products'
         ordering = ['pk']
+        indexes = [
+            models.Index(fields=['price', 'id']),
+            models.Index(fields=['rating', 'id']),
+            models.Index(fields=['date', 'id']),
+            models.Index(fields=['review_count', 'id']),
+        ]
+
+    objects = ProductQuerySet.as_manager()
 
     title = models.CharField(max_length=100, db_index=True)
     description = models.TextField(max_length=200, blank=True, null=False)
@@ -95,6 +162,8 @@ class Product(models.Model):
     date = models.DateTimeField(auto_now_add=True, null=False)
     freeDelivery = models.BooleanField(default=True)
     rating = models.DecimalField(default=0, max_digits=2, decimal_places=1, null=False)
+    rating_sum = models.IntegerField(default=0, null=False)
+    review_count = models.IntegerField(default=0, null=False)
     limited = models.BooleanField(default=False)
     active = models.BooleanField(default=False)
     tags = models.ManyToManyField(Tag, related_name='products')
@@ -104,13 +173,11 @@ class Product(models.Model):
     def __str__(self) -> str:
         return f'Product(pk={self.pk}, title={self.title!r})'
 
-    def update_rating(self) -> None:
-        reviews = self.reviews.all()
-        if reviews:
-            total_rating = sum(review.rate for review in reviews)
-            average_rating = total_rating / len(reviews)
-            self.rating = round(average_rating, 2)
-            self.save()
+    def get_sale_price(self) -> Optional[Decimal]:
+        """Возвращает цену действующей скидки или None, если скидки нет."""
+        if hasattr(self, 'sale_price'):
+            return self.sale_price
+        return ActiveSale.objects.current().filter(product=self.pk).values_list('salePrice', flat=True).first()
 
 
 def product_images_directory_path(instance: 'ProductImage', filename: str) -> str:
@@ -131,6 +198,8 @@ class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to=product_images_directory_path)
     name = models.CharField(max_length=200, null=False, blank=True)
+    # Уменьшенные копии изображения (products.images): {'source': имя оригинала, 'images': [...]}.
+    variants = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self) -> str:
         return f"/{self.image}"
@@ -158,6 +227,19 @@ class Review(models.Model):
         return f"{self.author}: {self.product.title}"
 
 
+class SaleQuerySet(models.QuerySet):
+    """QuerySet скидок на продукты."""
+
+    def active(self, day: Optional[datetime.date] = None) -> 'SaleQuerySet':
+        """Возвращает скидки, действующие в указанный день (по умолчанию сегодня)."""
+        day = day or datetime.date.today()
+        return self.filter(dateFrom__lte=day, dateTo__gte=day)
+
+    def effective(self, day: Optional[datetime.date] = None) -> 'SaleQuerySet':
+        """Возвращает скидки, выбранные в ActiveSale (не больше одной на продукт) и еще не закончившиеся."""
+        return self.filter(activation__isnull=False, dateTo__gte=day or datetime.date.today())
+
+
 class Sale(models.Model):
     """Модель скидок на продукты"""
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='salePrice')
@@ -165,9 +247,15 @@ class Sale(models.Model):
     dateFrom = models.DateField(blank=True, null=True)
     dateTo = models.DateField(blank=True, null=True)
 
+    objects = SaleQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Sale'
         verbose_name_plural = 'Sales'
+        indexes = [
+            models.Index(fields=['dateFrom', 'id']),
+            models.Index(fields=['product', 'dateFrom', 'dateTo']),
+        ]
 
     def price(self) -> Decimal:
 
@@ -180,3 +268,71 @@ class Sale(models.Model):
     def href(self) -> str:
 
         return f'/product/{self.product.pk}'
+
+
+class ActiveSaleQuerySet(models.QuerySet):
+    """QuerySet действующих скидок продуктов."""
+
+    def current(self, day: Optional[datetime.date] = None) -> 'ActiveSaleQuerySet':
+        """
+        Возвращает действующие скидки без закончившихся: если ActiveSale еще не пересчитана
+        на новый день, закончившаяся накануне скидка уже не применяется.
+        """
+        return self.filter(dateTo__gte=day or datetime.date.today())
+
+
+class ActiveSale(models.Model):
+    """
+    Действующая скидка продукта (не больше одной на продукт) - материализованная выборка из Sale,
+    из которой читаются цены со скидкой. Пересчитывается командой activate_sales в начале каждого дня
+    и сигналами при изменении скидок (products.sales).
+    """
+    class Meta:
+        verbose_name = 'Active sale'
+        verbose_name_plural = 'Active sales'
+        ordering = ['pk']
+
+    objects = ActiveSaleQuerySet.as_manager()
+
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='active_sale')
+    sale = models.OneToOneField(Sale, on_delete=models.CASCADE, related_name='activation')
+    salePrice = models.DecimalField(max_digits=10, decimal_places=2)
+    dateTo = models.DateField()
+
+    def __str__(self) -> str:
+        return f'ActiveSale(product={self.product_id}, sale={self.sale_id})'
+
+
+class ProductCatalogEntry(models.Model):
+    """
+    Денормализованная запись каталога: одна строка на продукт.
+    Поддерживается сигналами из products.signals при включенной настройке CATALOG_READ_MODEL
+    и заполняется командой rebuild_catalog.
+    """
+    class Meta:
+        verbose_name = 'Catalog entry'
+        verbose_name_plural = 'Catalog entries'
+        ordering = ['pk']
+
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='catalog_entry')
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    title = models.CharField(max_length=100, db_index=True)
+    description = models.TextField(max_length=200, blank=True, null=False)
+    fullDescription = models.TextField(blank=True, null=False)
+    # Цена продукта без скидки (по ней, как и в Product, сортирует каталог) и цена действующей скидки.
+    price = models.DecimalField(default=0, max_digits=10, decimal_places=2, db_index=True)
+    salePrice = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    count = models.IntegerField(default=0)
+    date = models.DateTimeField(db_index=True)
+    freeDelivery = models.BooleanField(default=True)
+    rating = models.DecimalField(default=0, max_digits=2, decimal_places=1, db_index=True)
+    num_reviews = models.IntegerField(default=0, db_index=True)
+    limited = models.BooleanField(default=False)
+    active = models.BooleanField(default=False)
+    # Изображения, теги и характеристики в том виде, в котором их отдает ProductListSerializer.
+    images = models.JSONField(default=list, blank=True)
+    tags = models.JSONField(default=list, blank=True)
+    specifications = models.JSONField(default=list, blank=True)
+
+    def __str__(self) -> str:
+        return f'CatalogEntry(product={self.product_id}, title={self.title!r})'
@@ -0,0 +1,115 @@
+import base64
+import binascii
+import datetime
+import json
+from decimal import Decimal
+from typing import Any, List, Optional, Tuple
+
+from django.core.paginator import Paginator
+from django.db.models import Model, Q, QuerySet
+from rest_framework.exceptions import ParseError
+
+# Наибольшее количество элементов на странице, которое можно запросить параметром limit.
+MAX_PAGE_SIZE = 100
+
+# Поля, по которым каталог умеет листать курсором (параметр sort -> поле модели).
+KEYSET_SORT_FIELDS = {
+    'pk': 'pk',
+    'price': 'price',
+    'rating': 'rating',
+    'date': 'date',
+    'reviews': 'num_reviews',
+}
+
+
+def page_limit(request: Any, default: int) -> int:
+    """
+    Функция для получения размера страницы из параметра limit: не целое число - ошибка 400,
+    значения вне диапазона 1..MAX_PAGE_SIZE приводятся к ближайшей границе.
+    """
+    value = request.GET.get('limit')
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ParseError('Invalid limit')
+    return min(max(limit, 1), MAX_PAGE_SIZE)
+
+
+def encode_cursor(field: str, descending: bool, value: Any, pk: int) -> str:
+    """Функция для упаковки позиции последнего элемента страницы в непрозрачную строку."""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        value = value.isoformat()
+    elif isinstance(value, Decimal):
+        value = str(value)
+    payload = json.dumps([field, descending, value, pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, field: str, descending: bool) -> Tuple[Any, int]:
+    """Функция для распаковки курсора; курсор должен соответствовать текущей сортировке."""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_field, cursor_descending, value, pk = json.loads(payload)
+    except (binascii.Error, ValueError, TypeError):
+        raise ParseError('Invalid cursor')
+    if cursor_field != field or cursor_descending != descending or not isinstance(pk, int):
+        raise ParseError('Cursor does not match the requested sorting')
+    return value, pk
+
+
+def keyset_queryset(queryset: QuerySet, field: str, descending: bool, cursor: Optional[str], limit: int) -> QuerySet:
+    """Функция для построения запроса страницы по ключу (field, pk): limit + 1 элементов после курсора."""
+    if descending:
+        queryset = queryset.order_by(f'-{field}', '-pk')
+    else:
+        queryset = queryset.order_by(field, 'pk')
+
+    if cursor:
+        value, pk = decode_cursor(cursor, field, descending)
+        lookup = 'lt' if descending else 'gt'
+        if field == 'pk':
+            queryset = queryset.filter(**{f'pk__{lookup}': pk})
+        else:
+            queryset = queryset.filter(Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'pk__{lookup}': pk}))
+
+    return queryset[:limit + 1]
+
+
+def keyset_page(items: List[Model], field: str, descending: bool, limit: int) -> Tuple[List[Model], Optional[str]]:
+    """Функция для получения элементов страницы и курсора следующей страницы из результата keyset_queryset."""
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    last = items[-1]
+    return items, encode_cursor(field, descending, getattr(last, field), last.pk)
+
+
+def paginate_keyset(queryset: QuerySet, field: str, descending: bool,
+                    cursor: Optional[str], limit: int) -> Tuple[List[Model], Optional[str]]:
+    """
+    Функция для постраничной выборки по ключу (field, pk) без COUNT и OFFSET.
+    Возвращает элементы страницы и курсор следующей страницы (None, если страница последняя).
+    """
+    items = list(keyset_queryset(queryset, field, descending, cursor, limit))
+    return keyset_page(items, field, descending, limit)
+
+
+async def apaginate_keyset(queryset: QuerySet, field: str, descending: bool,
+                           cursor: Optional[str], limit: int) -> Tuple[List[Model], Optional[str]]:
+    """Асинхронная версия paginate_keyset (для асинхронных Api)."""
+    items = [item async for item in keyset_queryset(queryset, field, descending, cursor, limit)]
+    return keyset_page(items, field, descending, limit)
+
+
+async def apaginate_page(queryset: QuerySet, limit: int, page_number: Any) -> Tuple[List[Model], int, int]:
+    """
+    Асинхронный аналог Paginator.page: возвращает элементы страницы, ее номер и номер последней страницы.
+    Номер страницы проверяется так же, как в Paginator (при ошибке поднимается InvalidPage).
+    """
+    count = await queryset.acount()
+    page = Paginator(range(count), limit).page(page_number)
+    offset = (page.number - 1) * limit
+    items = [item async for item in queryset[offset:offset + limit]]
+    return items, page.number, page.paginator.num_pages
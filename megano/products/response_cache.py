@@ -0,0 +1,148 @@
+import asyncio
+import datetime
+import hashlib
+import json
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+GENERATION_KEY = 'storefront:generation:{name}'
+RESPONSE_KEY = 'storefront:response:{view}:{digest}'
+
+# Поколения данных, от которых зависят закэшированные ответы.
+PRODUCT = 'product'
+CATEGORY = 'category'
+TAG = 'tag'
+SALE = 'sale'
+REVIEW = 'review'
+
+
+def get_generations(names: Iterable[str]) -> Dict[str, float]:
+    """
+    Функция для получения текущих поколений данных.
+    Поколение - время последнего изменения; отсутствующее в кэше поколение начинается заново.
+    """
+    keys = {name: GENERATION_KEY.format(name=name) for name in names}
+    stored = cache.get_many(keys.values())
+    generations = {}
+    for name, key in keys.items():
+        if key not in stored:
+            cache.add(key, time.time(), timeout=None)
+            stored[key] = cache.get(key) or time.time()
+        generations[name] = stored[key]
+    return generations
+
+
+async def aget_generations(names: Iterable[str]) -> Dict[str, float]:
+    """Асинхронная версия get_generations."""
+    keys = {name: GENERATION_KEY.format(name=name) for name in names}
+    stored = await cache.aget_many(keys.values())
+    generations = {}
+    for name, key in keys.items():
+        if key not in stored:
+            await cache.aadd(key, time.time(), timeout=None)
+            stored[key] = await cache.aget(key) or time.time()
+        generations[name] = stored[key]
+    return generations
+
+
+def bump_generation(*names: str) -> None:
+    """Функция для сброса закэшированных ответов, зависящих от указанных данных."""
+    cache.set_many({GENERATION_KEY.format(name=name): time.time() for name in names}, timeout=None)
+
+
+def response_last_modified(versions: Dict[str, float]) -> int:
+    """
+    Функция для времени Last-Modified ответа: последнее изменение данных, но не раньше начала
+    текущего дня, так как ответ зависит и от даты (действующие скидки).
+    """
+    return int(max(*versions.values(), time.mktime(datetime.date.today().timetuple())))
+
+
+def not_modified(request: Any, etag: str, last_modified: int) -> bool:
+    """Функция для проверки условных заголовков запроса If-None-Match и If-Modified-Since."""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and last_modified <= if_modified_since
+
+
+def response_digest(view: Any, request: Any, args: Tuple, kwargs: Dict[str, Any],
+                    versions: Dict[str, float]) -> str:
+    """Функция для ключа ответа: Api, нормализованные параметры запроса, поколения данных и текущая дата."""
+    params = sorted((key, sorted(values)) for key, values in request.GET.lists())
+    return hashlib.md5(json.dumps(
+        [type(view).__name__, params, args, sorted(kwargs.items()), sorted(versions.items()),
+         str(datetime.date.today())],
+        default=str,
+    ).encode()).hexdigest()
+
+
+def cache_response(*generations: str, timeout: int = 60 * 60) -> Callable:
+    """
+    Декоратор для метода get APIView, одинакового для всех посетителей.
+    Ответ кэшируется по нормализованным параметрам запроса, текущей дате и поколениям
+    указанных данных, а также получает заголовки ETag и Last-Modified для ответов 304.
+    Асинхронный метод get (AsyncAPIView) оборачивается асинхронно, ответы строятся методом render Api.
+    """
+    def decorator(method: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(method):
+            @wraps(method)
+            async def async_wrapper(view: Any, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+                versions = await aget_generations(generations)
+                digest = response_digest(view, request, args, kwargs, versions)
+                etag = f'"{digest}"'
+                last_modified = response_last_modified(versions)
+                headers = {'ETag': etag, 'Last-Modified': http_date(last_modified), 'Cache-Control': 'no-cache'}
+
+                if not_modified(request, etag, last_modified):
+                    return view.render(None, status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+                key = RESPONSE_KEY.format(view=type(view).__name__, digest=digest)
+                data = await cache.aget(key)
+                if data is None:
+                    response = await method(view, request, *args, **kwargs)
+                    if response.status_code != status.HTTP_200_OK:
+                        return response
+                    await cache.aset(key, response.data, timeout)
+                else:
+                    response = view.render(data)
+                for header, value in headers.items():
+                    response[header] = value
+                return response
+            return async_wrapper
+
+        @wraps(method)
+        def wrapper(view: APIView, request: Request, *args: Any, **kwargs: Any) -> Response:
+            versions = get_generations(generations)
+            digest = response_digest(view, request, args, kwargs, versions)
+            etag = f'"{digest}"'
+            last_modified = response_last_modified(versions)
+            headers = {'ETag': etag, 'Last-Modified': http_date(last_modified), 'Cache-Control': 'no-cache'}
+
+            if not_modified(request, etag, last_modified):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+            key = RESPONSE_KEY.format(view=type(view).__name__, digest=digest)
+            data = cache.get(key)
+            if data is None:
+                response = method(view, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set(key, response.data, timeout)
+            else:
+                response = Response(data)
+            for header, value in headers.items():
+                response[header] = value
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,61 @@
+import datetime
+from typing import Iterable, List, Optional
+
+from django.db import transaction
+
+from .catalog import refresh_catalog_entries
+from .models import ActiveSale, Sale
+from .response_cache import PRODUCT, SALE, bump_generation
+
+BATCH_SIZE = 1000
+
+
+def refresh_active_sales(product_ids: Optional[Iterable[int]] = None,
+                         day: Optional[datetime.date] = None) -> List[int]:
+    """
+    Функция для пересчета таблицы ActiveSale на день day (по умолчанию сегодня) для указанных продуктов
+    (по умолчанию для всех): из скидок, действующих в этот день, для продукта выбирается первая созданная.
+    Перезаписываются только строки продуктов, у которых выбранная скидка изменилась; их id возвращаются.
+    """
+    day = day or datetime.date.today()
+    sales = Sale.objects.active(day)
+    stored = ActiveSale.objects.all()
+    if product_ids is not None:
+        product_ids = set(product_ids)
+        # Скидка, перенесенная на другой продукт, освобождает строку прежнего продукта.
+        product_ids.update(ActiveSale.objects.filter(
+            sale__in=Sale.objects.filter(product__in=product_ids).values('pk')).values_list('product_id', flat=True))
+        sales = sales.filter(product__in=product_ids)
+        stored = stored.filter(product__in=product_ids)
+
+    effective = {}
+    rows = sales.order_by('-pk').values_list('product_id', 'pk', 'salePrice', 'dateTo')
+    for product_id, *sale in rows.iterator(chunk_size=BATCH_SIZE):
+        effective[product_id] = tuple(sale)
+    current = {product_id: tuple(sale) for product_id, *sale in stored.values_list(
+        'product_id', 'sale_id', 'salePrice', 'dateTo').iterator(chunk_size=BATCH_SIZE)}
+    changed = sorted(pk for pk in effective.keys() | current.keys() if effective.get(pk) != current.get(pk))
+
+    with transaction.atomic():
+        for start in range(0, len(changed), BATCH_SIZE):
+            ActiveSale.objects.filter(product__in=changed[start:start + BATCH_SIZE]).delete()
+        ActiveSale.objects.bulk_create(
+            (ActiveSale(product_id=pk, sale_id=effective[pk][0], salePrice=effective[pk][1], dateTo=effective[pk][2])
+             for pk in changed if pk in effective),
+            batch_size=BATCH_SIZE)
+    return changed
+
+
+def activate_sales() -> List[int]:
+    """
+    Функция для ежедневного пересчета действующих скидок (команда activate_sales в начале дня):
+    обновляет ActiveSale, записи каталога продуктов, у которых скидка началась, закончилась
+    или сменилась, и один раз сбрасывает закэшированные ответы витрины. Возвращает id таких продуктов.
+    """
+    with transaction.atomic():
+        changed = refresh_active_sales()
+        for start in range(0, len(changed), BATCH_SIZE):
+            refresh_catalog_entries(changed[start:start + BATCH_SIZE])
+        if changed:
+            transaction.on_commit(lambda: bump_generation(SALE, PRODUCT))
+    return changed
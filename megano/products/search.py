@@ -0,0 +1,191 @@
+import re
+from typing import Iterable, List, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, QuerySet, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Product
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def product_documents(product_ids: Iterable[int]) -> List[Tuple[int, str, str, str]]:
+    """Функция для получения индексируемых полей продуктов: (id, title, description, теги)."""
+    products = Product.objects.filter(pk__in=list(product_ids)).only(
+        'pk', 'title', 'description').prefetch_related('tags')
+    return [
+        (product.pk, product.title, product.description, ' '.join(tag.name for tag in product.tags.all()))
+        for product in products
+    ]
+
+
+class ProductSearchBackend:
+    """
+    Базовый поисковый бэкенд каталога: поиск по вхождению подстроки в название.
+    Не требует индекса, поэтому методы обслуживания индекса ничего не делают.
+    """
+
+    def setup(self) -> None:
+        """Создает структуры индекса, если их еще нет."""
+
+    def index_products(self, product_ids: Iterable[int]) -> None:
+        """Добавляет или обновляет продукты в индексе."""
+
+    def remove_products(self, product_ids: Iterable[int]) -> None:
+        """Удаляет продукты из индекса."""
+
+    def clear(self) -> None:
+        """Удаляет все продукты из индекса."""
+
+    def is_empty(self) -> bool:
+        """Проверяет, что в индексе нет ни одного продукта."""
+        return False
+
+    def rebuild(self, batch_size: int = 1000) -> int:
+        """Перестраивает индекс для всех продуктов, возвращает количество проиндексированных."""
+        self.setup()
+        self.clear()
+        indexed = 0
+        last_pk = 0
+        while True:
+            ids = list(Product.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return indexed
+            self.index_products(ids)
+            indexed += len(ids)
+            last_pk = ids[-1]
+
+    def filter(self, queryset: QuerySet, query: str) -> QuerySet:
+        """Оставляет в queryset продуктов только найденные по запросу."""
+        return queryset.filter(title__icontains=query)
+
+    def rank(self, queryset: QuerySet, query: str, column: str = 'id') -> QuerySet:
+        """
+        Аннотирует queryset релевантностью search_rank (больше - релевантнее).
+        column - колонка таблицы queryset, в которой хранится id продукта.
+        """
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class SqliteFTSSearchBackend(ProductSearchBackend):
+    """Поисковый бэкенд на виртуальной таблице SQLite FTS5 (название, описание и теги)."""
+    table = 'products_product_fts'
+
+    @staticmethod
+    def match_expression(query: str) -> str:
+        """Превращает пользовательский ввод в безопасный запрос FTS5 с поиском по префиксам слов."""
+        return ' '.join(f'"{word}"*' for word in WORD_RE.findall(query))
+
+    def setup(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} '
+                f"USING fts5(title, description, tags, tokenize='unicode61 remove_diacritics 2')"
+            )
+
+    def index_products(self, product_ids: Iterable[int]) -> None:
+        documents = product_documents(product_ids)
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(doc[0],) for doc in documents])
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, title, description, tags) VALUES (%s, %s, %s, %s)', documents)
+
+    def remove_products(self, product_ids: Iterable[int]) -> None:
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(pk,) for pk in product_ids])
+
+    def clear(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def is_empty(self) -> bool:
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT 1 FROM {self.table} LIMIT 1')
+            return cursor.fetchone() is None
+
+    def filter(self, queryset: QuerySet, query: str) -> QuerySet:
+        match = self.match_expression(query)
+        if not match:
+            # В запросе нет ни одного слова (только знаки препинания) - искать нечего.
+            return queryset.none()
+        return queryset.filter(pk__in=RawSQL(f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', [match]))
+
+    def rank(self, queryset: QuerySet, query: str, column: str = 'id') -> QuerySet:
+        match = self.match_expression(query)
+        if not match:
+            return super().rank(queryset, query, column)
+        return queryset.annotate(search_rank=RawSQL(
+            f'SELECT -rank FROM {self.table} WHERE {self.table} MATCH %s '
+            f'AND rowid = "{queryset.model._meta.db_table}"."{column}"',
+            [match], output_field=FloatField(),
+        ))
+
+
+class PostgresSearchBackend(ProductSearchBackend):
+    """Поисковый бэкенд на tsvector с GIN-индексом для PostgreSQL."""
+    table = 'products_product_search'
+    config = 'russian'
+
+    def setup(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {self.table} ('
+                f'product_id bigint PRIMARY KEY REFERENCES products_product(id) ON DELETE CASCADE, '
+                f'document tsvector NOT NULL)'
+            )
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {self.table}_document ON {self.table} USING GIN (document)')
+
+    def index_products(self, product_ids: Iterable[int]) -> None:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.table} (product_id, document) VALUES (%s, '
+                f"setweight(to_tsvector('{self.config}', %s), 'A') || "
+                f"setweight(to_tsvector('{self.config}', %s), 'B') || "
+                f"setweight(to_tsvector('{self.config}', %s), 'B')) "
+                f'ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document',
+                product_documents(product_ids),
+            )
+
+    def remove_products(self, product_ids: Iterable[int]) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE product_id = ANY(%s)', [list(product_ids)])
+
+    def clear(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {self.table}')
+
+    def is_empty(self) -> bool:
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT 1 FROM {self.table} LIMIT 1')
+            return cursor.fetchone() is None
+
+    def filter(self, queryset: QuerySet, query: str) -> QuerySet:
+        return queryset.filter(pk__in=RawSQL(
+            f"SELECT product_id FROM {self.table} WHERE document @@ websearch_to_tsquery('{self.config}', %s)",
+            [query],
+        ))
+
+    def rank(self, queryset: QuerySet, query: str, column: str = 'id') -> QuerySet:
+        return queryset.annotate(search_rank=RawSQL(
+            f"SELECT ts_rank(document, websearch_to_tsquery('{self.config}', %s)) FROM {self.table} "
+            f'WHERE product_id = "{queryset.model._meta.db_table}"."{column}"',
+            [query], output_field=FloatField(),
+        ))
+
+
+def get_search_backend() -> ProductSearchBackend:
+    """
+    Функция для получения поискового бэкенда каталога.
+    Берется из настройки PRODUCT_SEARCH_BACKEND или выбирается по типу базы данных.
+    """
+    backend_path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    if connection.vendor == 'sqlite':
+        return SqliteFTSSearchBackend()
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return ProductSearchBackend()
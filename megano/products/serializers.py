@@ -1,8 +1,13 @@
 import datetime
 from rest_framework import serializers
-from typing import List, Dict
+from typing import Any, Dict, List, Optional, Tuple
 
-from .models import Product, Tag, Review, Specification, Category, CategoryIcon, Sale
+from .models import Product, Tag, Review, Specification, Category, CategoryIcon, Sale, ProductCatalogEntry
+from .images import responsive_image
+from .pagination import paginate_keyset
+
+# Количество отзывов в карточке продукта и на странице Api отзывов.
+REVIEWS_PAGE_SIZE = 10
 
 
 class ProductSpecificationSerializer(serializers.ModelSerializer):
@@ -45,7 +50,7 @@ class SaleSerializer(serializers.ModelSerializer):
         images = []
         images_tmp = instance.product.images.all()
         for image in images_tmp:
-            images.append({"src": f"/media/{image.__str__()}", "alt": image.name})
+            images.append({"src": f"/media/{image.__str__()}", "alt": image.name, **responsive_image(image.variants)})
         return images
 
     class Meta:
@@ -54,9 +59,11 @@ class SaleSerializer(serializers.ModelSerializer):
 
 
 class ProductSerializer(serializers.ModelSerializer):
-    """Сериализатор для продуктов."""
+    """Сериализатор для продуктов (с первой страницей отзывов, остальные - через Api отзывов)."""
     images = serializers.SerializerMethodField()
-    reviews = ReviewSerializer(many=True, required=False)
+    reviews = serializers.SerializerMethodField()
+    reviewsCount = serializers.IntegerField(source='review_count', read_only=True)
+    reviewsCursor = serializers.SerializerMethodField()
     tags = TagsProductSerializer(many=True, required=False)
     specifications = ProductSpecificationSerializer(many=True, required=False)
     price = serializers.SerializerMethodField()
@@ -65,7 +72,7 @@ class ProductSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Product
-        fields = '__all__'
+        exclude = 'rating_sum', 'review_count'
 
     def get_images(self, instance: Product) -> List[Dict[str, str]]:
         images = []
@@ -74,23 +81,32 @@ class ProductSerializer(serializers.ModelSerializer):
             images.append({'src': f'/media/{image.__str__()}', 'alt': image.name})
         return images
 
+    def get_reviews_page(self, instance: Product) -> Tuple[List[Review], Optional[str]]:
+        if not hasattr(instance, '_reviews_page'):
+            instance._reviews_page = paginate_keyset(instance.reviews.all(), 'pk', False, None, REVIEWS_PAGE_SIZE)
+        return instance._reviews_page
+
+    def get_reviews(self, instance: Product) -> List[Dict[str, Any]]:
+        reviews, _ = self.get_reviews_page(instance)
+        return ReviewSerializer(reviews, many=True).data
+
+    def get_reviewsCursor(self, instance: Product) -> Optional[str]:
+        _, cursor = self.get_reviews_page(instance)
+        return cursor
+
     def get_price(self, instance: Product) -> float:
-        today = datetime.date.today()
-        sales = Sale.objects.filter(
-            dateFrom__lte=today, dateTo__gte=today, product=instance.pk).values('salePrice').first()
-        if sales:
-            return sales['salePrice']
+        sale_price = instance.get_sale_price()
+        if sale_price is not None:
+            return sale_price
         return float(instance.price)
 
     def get_rating(self, instance: Product) -> float:
         return float(instance.rating)
 
     def get_salePrice(self, instance: Product) -> float:
-        today = datetime.date.today()
-        sales = Sale.objects.filter(
-            dateFrom__lte=today, dateTo__gte=today, product=instance.pk).values('salePrice').first()
-        if sales:
-            return sales['salePrice']
+        sale_price = instance.get_sale_price()
+        if sale_price is not None:
+            return sale_price
         return float(instance.price)
 
 
@@ -99,47 +115,81 @@ class ProductListSerializer(serializers.ModelSerializer):
     images = serializers.SerializerMethodField()
     tags = TagsProductSerializer(many=True, required=False)
     specifications = ProductSpecificationSerializer(many=True, required=False)
-    reviews = serializers.IntegerField(source='reviews.count')
+    reviews = serializers.IntegerField(source='num_reviews', read_only=True)
     price = serializers.SerializerMethodField()
     rating = serializers.SerializerMethodField()
     salePrice = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
-        fields = '__all__'
+        exclude = 'rating_sum', 'review_count'
 
     def get_images(self, instance: Product) -> List[Dict[str, str]]:
         images = []
         images_tmp = instance.images.all()
         for image in images_tmp:
-            images.append({'src': f'/media/{image.__str__()}', 'alt': image.name})
+            images.append({'src': f'/media/{image.__str__()}', 'alt': image.name, **responsive_image(image.variants)})
         return images
 
     def get_price(self, instance: Product) -> float:
-        today = datetime.date.today()
-        sales = Sale.objects.filter(
-            dateFrom__lte=today, dateTo__gte=today, product=instance.pk).values('salePrice').first()
-        if sales:
-            return sales['salePrice']
+        sale_price = instance.get_sale_price()
+        if sale_price is not None:
+            return sale_price
         return float(instance.price)
 
     def get_rating(self, instance: Product) -> float:
         return float(instance.rating)
 
     def get_salePrice(self, instance: Product) -> float:
-        today = datetime.date.today()
-        sales = Sale.objects.filter(
-            dateFrom__lte=today, dateTo__gte=today, product=instance.pk).values('salePrice').first()
-        if sales:
-            return sales['salePrice']
+        sale_price = instance.get_sale_price()
+        if sale_price is not None:
+            return sale_price
         return float(instance.price)
 
 
+class ProductCatalogEntrySerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для списка продуктов из денормализованной таблицы каталога:
+    отдает те же поля, что и ProductListSerializer.
+    """
+    id = serializers.IntegerField(source='product_id')
+    images = serializers.SerializerMethodField()
+    reviews = serializers.IntegerField(source='num_reviews')
+    price = serializers.SerializerMethodField()
+    rating = serializers.SerializerMethodField()
+    salePrice = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProductCatalogEntry
+        fields = ('id', 'category', 'title', 'description', 'fullDescription', 'price', 'salePrice', 'count', 'date',
+                  'freeDelivery', 'limited', 'active', 'images', 'tags', 'specifications', 'reviews', 'rating')
+
+    def get_images(self, instance: ProductCatalogEntry) -> List[Dict[str, str]]:
+        return [{'src': f'/media/{image["src"]}', 'alt': image['alt'], **responsive_image(image['variants'])}
+                for image in instance.images]
+
+    def get_price(self, instance: ProductCatalogEntry) -> float:
+        if instance.salePrice is not None:
+            return instance.salePrice
+        return float(instance.price)
+
+    def get_rating(self, instance: ProductCatalogEntry) -> float:
+        return float(instance.rating)
+
+    def get_salePrice(self, instance: ProductCatalogEntry) -> float:
+        return self.get_price(instance)
+
+
 class CategoryIconSerializer(serializers.ModelSerializer):
     """Сериализатор для иконок категорий."""
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = CategoryIcon
-        fields = 'id', 'src', 'alt'
+        fields = 'id', 'src', 'alt', 'srcset'
+
+    def get_srcset(self, instance: CategoryIcon) -> Optional[str]:
+        return responsive_image(instance.variants).get('srcset')
 
 
 class SubcategoriesCategorySerializer(serializers.ModelSerializer):
@@ -159,3 +209,10 @@ class CategoriesSerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = '__all__'
+
+
+class ProductSupplySerializer(serializers.Serializer):
+    """Сериализатор для новых цены и остатка продукта из пакетного обновления поставщика."""
+    id = serializers.IntegerField()
+    price = serializers.DecimalField(max_digits=8, decimal_places=2, min_value=0, required=False)
+    count = serializers.IntegerField(min_value=0, required=False)
@@ -0,0 +1,216 @@
+from typing import Any, Iterable, Optional, Set
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+
+from .banners import invalidate_banner_pool
+from .catalog import refresh_catalog_entries
+from .categories import invalidate_category_tree
+from .images import needs_variants, submit_variants
+from .models import Category, CategoryIcon, Product, ProductImage, Review, Sale, Specification, Tag
+from .response_cache import CATEGORY, PRODUCT, REVIEW, SALE, TAG, bump_generation
+from .sales import refresh_active_sales
+from .search import get_search_backend
+
+
+def products_changed(product_ids: Iterable[int]) -> None:
+    """Обновляет записи каталога и поисковый индекс продуктов."""
+    product_ids = [pk for pk in product_ids if pk is not None]
+    if product_ids:
+        refresh_catalog_entries(product_ids)
+        get_search_backend().index_products(product_ids)
+
+
+def products_changed_on_commit(product_ids: Iterable[int]) -> None:
+    """
+    Обновляет записи каталога после фиксации транзакции. Нужна при удалении связанных объектов:
+    при удалении продукта они удаляются каскадом раньше него, и запись каталога удаляемого продукта
+    нельзя создавать заново; после фиксации пересчитываются только оставшиеся продукты.
+    """
+    if settings.CATALOG_READ_MODEL:
+        product_ids = list(product_ids)
+        transaction.on_commit(lambda: refresh_catalog_entries(product_ids))
+
+
+@receiver(post_migrate)
+def setup_search_index(sender: Any, **kwargs: Any) -> None:
+    """
+    Создает поисковый индекс продуктов после миграций приложения products
+    и заполняет его, если индекс пуст, а продукты уже есть (база, созданная до появления индекса).
+    """
+    if sender.name == 'products':
+        backend = get_search_backend()
+        backend.setup()
+        if backend.is_empty() and Product.objects.exists():
+            backend.rebuild()
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender: Any, instance: Product, raw: bool = False, **kwargs: Any) -> None:
+    """
+    Обновляет запись каталога и поисковый индекс после сохранения продукта.
+    Продукты из фикстур (loaddata) только добавляются в поисковый индекс.
+    """
+    if not raw:
+        products_changed([instance.pk])
+    else:
+        get_search_backend().index_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender: Any, instance: Product, **kwargs: Any) -> None:
+    """Удаляет продукт из поискового индекса."""
+    get_search_backend().remove_products([instance.pk])
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender: Any, instance: Review, created: bool = False, raw: bool = False, **kwargs: Any) -> None:
+    """Обновляет счетчики рейтинга продукта в той же транзакции, что и сохранение отзыва."""
+    if raw:
+        return
+    products = Product.objects.filter(pk=instance.product_id)
+    if created:
+        products.add_rating(instance.rate)
+    else:
+        products.reconcile_ratings()
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender: Any, instance: Review, **kwargs: Any) -> None:
+    """Вычитает оценку удаленного отзыва из счетчиков рейтинга продукта."""
+    Product.objects.filter(pk=instance.product_id).add_rating(-instance.rate, -1)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=Review)
+def product_related_saved(sender: Any, instance: Any, raw: bool = False, **kwargs: Any) -> None:
+    """Обновляет запись каталога после изменения изображения или отзыва продукта."""
+    if not raw:
+        refresh_catalog_entries([instance.product_id])
+
+
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_delete, sender=Review)
+def product_related_deleted(sender: Any, instance: Any, **kwargs: Any) -> None:
+    """Обновляет запись каталога после удаления изображения или отзыва продукта."""
+    products_changed_on_commit([instance.product_id])
+
+
+@receiver(post_save, sender=Sale)
+def sale_saved(sender: Any, instance: Sale, raw: bool = False, **kwargs: Any) -> None:
+    """Пересчитывает действующую скидку и запись каталога продукта после изменения его скидки."""
+    if not raw:
+        changed = refresh_active_sales([instance.product_id])
+        refresh_catalog_entries([instance.product_id, *changed])
+
+
+@receiver(post_delete, sender=Sale)
+def sale_deleted(sender: Any, instance: Sale, **kwargs: Any) -> None:
+    """Пересчитывает действующую скидку продукта после удаления его скидки, запись каталога - после фиксации."""
+    changed = refresh_active_sales([instance.product_id])
+    products_changed_on_commit([instance.product_id, *changed])
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=CategoryIcon)
+def image_saved(sender: Any, instance: Any, raw: bool = False, **kwargs: Any) -> None:
+    """Ставит построение уменьшенных копий нового или замененного изображения после фиксации транзакции."""
+    if not raw and needs_variants(instance):
+        transaction.on_commit(lambda: submit_variants(sender, instance.pk))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Specification)
+def tag_saved(sender: Any, instance: Any, raw: bool = False, created: bool = False, **kwargs: Any) -> None:
+    """Обновляет записи каталога и поисковый индекс продуктов с измененным тегом или характеристикой."""
+    if not raw and not created:
+        products_changed(instance.products.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Specification)
+def tag_pre_delete(sender: Any, instance: Any, **kwargs: Any) -> None:
+    """Запоминает продукты тега или характеристики до удаления связей."""
+    instance._catalog_product_ids = list(instance.products.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Specification)
+def tag_deleted(sender: Any, instance: Any, **kwargs: Any) -> None:
+    """Обновляет записи каталога и поисковый индекс продуктов удаленного тега или характеристики."""
+    products_changed(getattr(instance, '_catalog_product_ids', []))
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+@receiver(m2m_changed, sender=Product.specifications.through)
+def product_tags_changed(sender: Any, instance: Any, action: str, reverse: bool,
+                         pk_set: Optional[Set[int]], **kwargs: Any) -> None:
+    """
+    Обновляет записи каталога и поисковый индекс при изменении тегов или характеристик продукта
+    (с любой стороны связи).
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            products_changed([instance.pk])
+    elif action == 'pre_clear':
+        instance._catalog_product_ids = list(instance.products.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        products_changed(pk_set)
+    elif action == 'post_clear':
+        products_changed(getattr(instance, '_catalog_product_ids', []))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=CategoryIcon)
+@receiver(post_delete, sender=CategoryIcon)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(m2m_changed, sender=Category.tags.through)
+def category_tree_changed(sender: Any, **kwargs: Any) -> None:
+    """Сбрасывает закэшированное дерево категорий при изменении категорий, их иконок и тегов."""
+    invalidate_category_tree()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def banner_candidates_changed(sender: Any, **kwargs: Any) -> None:
+    """Сбрасывает пул кандидатов в баннеры при изменении продуктов и категорий."""
+    invalidate_banner_pool()
+
+
+GENERATION_SENDERS = {
+    Product: PRODUCT,
+    ProductImage: PRODUCT,
+    Specification: PRODUCT,
+    Product.tags.through: PRODUCT,
+    Product.specifications.through: PRODUCT,
+    Category: CATEGORY,
+    CategoryIcon: CATEGORY,
+    Category.tags.through: CATEGORY,
+    Tag: TAG,
+    Sale: SALE,
+    Review: REVIEW,
+}
+
+
+def storefront_data_changed(sender: Any, **kwargs: Any) -> None:
+    """
+    Сбрасывает закэшированные ответы витрины, зависящие от измененной модели, после фиксации транзакции:
+    иначе параллельный запрос мог бы закэшировать еще не измененные данные под новым поколением.
+    """
+    if kwargs.get('action', 'post_').startswith('post_'):
+        generation = GENERATION_SENDERS[sender]
+        transaction.on_commit(lambda: bump_generation(generation))
+
+
+for generation_sender in GENERATION_SENDERS:
+    if generation_sender._meta.auto_created:
+        m2m_changed.connect(storefront_data_changed, sender=generation_sender)
+    else:
+        post_save.connect(storefront_data_changed, sender=generation_sender)
+        post_delete.connect(storefront_data_changed, sender=generation_sender)
@@ -0,0 +1,66 @@
+from typing import Any, Dict, Iterable, Type
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Field, Model
+from django.db.models.expressions import RawSQL
+
+from .models import Product, ProductCatalogEntry
+from .response_cache import PRODUCT, bump_generation
+from .transfer import batched
+
+CHUNK_SIZE = 1000
+# Поля продукта, которые меняет поставщик.
+SUPPLY_FIELDS = ('price', 'count')
+
+
+def values_case(model: Type[Model], values: Dict[int, Any], output_field: Field) -> RawSQL:
+    """
+    Функция для построения выражения CASE id WHEN ... THEN ... END со значением по id строки
+    (для UPDATE всех строк одним запросом, как bulk_update, но без компиляции When для каждой строки).
+    """
+    column = connection.ops.quote_name(model._meta.pk.column)
+    branches = ' '.join('WHEN %s THEN %s' for _ in values)
+    params = [value for line in sorted(values.items()) for value in line]
+    return RawSQL(f'CASE {column} {branches} END', params, output_field=output_field)
+
+
+def apply_product_updates(items: Iterable[Dict[str, Any]], chunk_size: int = CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Функция для пакетного изменения цен и остатков: items - записи {id, price, count} с новыми значениями
+    (price и count необязательны). Записи обрабатываются частями по chunk_size в одной транзакции:
+    строки продуктов части блокируются и читаются одним запросом, затем каждое поле изменившихся продуктов
+    записывается одним UPDATE ... CASE (только строки, где значение действительно изменилось).
+    Сигналы моделей не отправляются: цена и остаток в записях каталога (при включенной настройке
+    CATALOG_READ_MODEL) меняются теми же запросами,
+    а закэшированные ответы витрины сбрасываются один раз после фиксации.
+    Возвращает {'updated': количество, 'unchanged': количество, 'missing': [id несуществующих продуктов]}.
+    """
+    result = {'updated': 0, 'unchanged': 0, 'missing': []}
+    with transaction.atomic():
+        for chunk in batched(items, chunk_size):
+            # Для повторяющихся id действует последняя запись.
+            updates = {item['id']: item for item in chunk}
+            products = Product.objects.select_for_update().only('pk', *SUPPLY_FIELDS).in_bulk(list(updates))
+            changed: Dict[str, Dict[int, Any]] = {name: {} for name in SUPPLY_FIELDS}
+            for pk, item in updates.items():
+                product = products.get(pk)
+                if product is None:
+                    result['missing'].append(pk)
+                    continue
+                fields = [name for name in SUPPLY_FIELDS if name in item and getattr(product, name) != item[name]]
+                for name in fields:
+                    changed[name][pk] = item[name]
+                result['updated' if fields else 'unchanged'] += 1
+            for name, values in changed.items():
+                if not values:
+                    continue
+                field = Product._meta.get_field(name)
+                Product.objects.filter(pk__in=values).update(**{name: values_case(Product, values, field)})
+                if not settings.CATALOG_READ_MODEL:
+                    continue
+                ProductCatalogEntry.objects.filter(pk__in=values).update(
+                    **{name: values_case(ProductCatalogEntry, values, field)})
+        if result['updated']:
+            transaction.on_commit(lambda: bump_generation(PRODUCT))
+    return result
@@ -0,0 +1,109 @@
+import datetime
+import random
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+
+from .catalog import catalog_products, save_catalog_entries
+from .models import Category, Product, ProductImage, Review, Sale, Specification, Tag
+from .sales import refresh_active_sales
+
+BATCH_SIZE = 5000
+
+NOUNS = ['Смартфон', 'Телевизор', 'Ноутбук', 'Планшет', 'Наушники', 'Смарт-часы', 'Приставка', 'Монитор',
+         'Колонка', 'Роутер', 'Фотоаппарат', 'Видеокарта']
+BRANDS = ['Xiaomi', 'Samsung', 'Apple', 'HUAWEI', 'Sony', 'LG', 'ASUS', 'Lenovo', 'Philips', 'Honor', 'Realme',
+          'Acer', 'Dell', 'Canon', 'Nikon', 'JBL', 'TP-Link', 'Lumax', 'Haier', 'Hisense']
+WORDS = ['черный', 'белый', 'зеленый', 'синий', 'Pro', 'Ultra', 'Max', 'Lite', 'Plus', 'OLED', 'LED', 'AMOLED',
+         'NFC', '5G', 'Wi-Fi', 'Bluetooth', 'HDMI', 'USB', 'GPS', 'ГБ', 'ядер', 'камера', 'дюйм', 'зарядка']
+
+
+def generate_categories(rnd: random.Random, roots: int = 6, children: int = 4,
+                        grandchildren: int = 4) -> List[Category]:
+    """Функция для создания дерева категорий из трех уровней, возвращает категории нижнего уровня."""
+    tags = Tag.objects.bulk_create(Tag(name=f'{word} {number}') for number, word in enumerate(WORDS))
+    level = Category.objects.bulk_create(
+        Category(title=f'{noun}', active=True, favourite=number < 3) for number, noun in enumerate(NOUNS[:roots]))
+    for count in (children, grandchildren):
+        level = Category.objects.bulk_create(
+            Category(title=f'{parent.title} {number + 1}', parent=parent, active=True)
+            for parent in level for number in range(count))
+    Category.tags.through.objects.bulk_create(
+        Category.tags.through(category_id=category.pk, tag_id=tag.pk)
+        for category in Category.objects.all() for tag in rnd.sample(tags, 3))
+    return level
+
+
+def generate_storefront(products: int, reviews: int, sale_share: float = 0.1, seed: int = 1,
+                        progress: Optional[Callable[[str], None]] = None) -> Dict[str, int]:
+    """
+    Функция для заполнения базы синтетической витриной: дерево категорий из трех уровней, products продуктов
+    с изображениями, тегами и характеристиками, reviews отзывов (счетчики рейтинга согласованы с ними)
+    и действующие скидки для доли sale_share продуктов. Данные вставляются пакетами без сигналов,
+    затем пересчитывается ActiveSale; при включенной настройке CATALOG_READ_MODEL таблица каталога заполняется в конце.
+    Возвращает количество созданных объектов.
+    """
+    rnd = random.Random(seed)
+    report = progress or (lambda message: None)
+    today = datetime.date.today()
+    with transaction.atomic():
+        leaves = generate_categories(rnd)
+        tags = list(Tag.objects.all())
+        specifications = Specification.objects.bulk_create(
+            Specification(name=name, value=value) for name in ('Цвет', 'Гарантия', 'Страна')
+            for value in ('1', '2', '3'))
+        per_product = [reviews // products + (number < reviews % products) for number in range(products)]
+        sales = 0
+        for offset in range(0, products, BATCH_SIZE):
+            rates = []
+            batch = []
+            for number in range(offset, min(offset + BATCH_SIZE, products)):
+                product_rates = [rnd.randint(1, 5) for _ in range(per_product[number])]
+                rates.append(product_rates)
+                batch.append(Product(
+                    title=f'{rnd.choice(NOUNS)} {rnd.choice(BRANDS)} {" ".join(rnd.sample(WORDS, 3))}',
+                    description=' '.join(rnd.choices(WORDS, k=12)),
+                    price=rnd.randint(10, 5000),
+                    count=10 ** 6,
+                    active=rnd.random() < 0.9,
+                    limited=rnd.random() < 0.05,
+                    freeDelivery=rnd.random() < 0.5,
+                    category=rnd.choice(leaves),
+                    rating_sum=sum(product_rates),
+                    review_count=len(product_rates),
+                    rating=round(sum(product_rates) / len(product_rates), 1) if product_rates else 0,
+                ))
+            batch = Product.objects.bulk_create(batch)
+            ProductImage.objects.bulk_create(
+                ProductImage(product=product, image=f'products/images/{product.pk}.webp', name=product.title[:200])
+                for product in batch)
+            Product.tags.through.objects.bulk_create(
+                Product.tags.through(product_id=product.pk, tag_id=tag.pk)
+                for product in batch for tag in rnd.sample(tags, 2))
+            Product.specifications.through.objects.bulk_create(
+                Product.specifications.through(product_id=product.pk, specification_id=specification.pk)
+                for product in batch for specification in rnd.sample(specifications, 3))
+            on_sale = [product for product in batch if rnd.random() < sale_share]
+            Sale.objects.bulk_create(
+                Sale(product=product, salePrice=product.price * 8 // 10,
+                     dateFrom=today - datetime.timedelta(days=rnd.randint(0, 30)),
+                     dateTo=today + datetime.timedelta(days=rnd.randint(1, 30)))
+                for product in on_sale)
+            sales += len(on_sale)
+            Review.objects.bulk_create(
+                (Review(product=product, author=f'author {number}', email=f'author{number}@example.com',
+                        text='Отличный товар', rate=rate)
+                 for product, product_rates in zip(batch, rates) for number, rate in enumerate(product_rates)),
+                batch_size=BATCH_SIZE)
+            report(f'{offset + len(batch)} of {products} products generated')
+        refresh_active_sales()
+        if settings.CATALOG_READ_MODEL:
+            last_pk = 0
+            while True:
+                batch = list(catalog_products().filter(pk__gt=last_pk).order_by('pk')[:BATCH_SIZE])
+                if not batch:
+                    break
+                save_catalog_entries(batch)
+                last_pk = batch[-1].pk
+    return {'categories': Category.objects.count(), 'products': products, 'reviews': reviews, 'sales': sales}
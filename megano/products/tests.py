@@ -1,3 +1,690 @@
-from django.test import TestCase
+import datetime
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+from PIL import Image
+
+from .banners import build_banner_pool
+from .models import (ActiveSale, Category, CategoryIcon, Product, ProductCatalogEntry, ProductImage, Review, Sale,
+                     Specification, Tag)
+from .response_cache import GENERATION_KEY, PRODUCT, REVIEW, SALE, TAG
+from .sales import activate_sales, refresh_active_sales
+from .synthetic import generate_storefront
+from .transfer import ProductImporter, export_records, read_records, write_records
+
+
+class ProductListViewTestCase(TestCase):
+    """Тесты для Api каталога продуктов."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        tag = Tag.objects.create(name='tag')
+        specification = Specification.objects.create(name='name', value='value')
+        for number in range(30):
+            product = Product.objects.create(title=f'product {number}', price=100 + number)
+            product.tags.add(tag)
+            product.specifications.add(specification)
+            ProductImage.objects.create(product=product, image=f'products/images/{number}.webp')
+            for _ in range(number % 3):
+                Review.objects.create(product=product, author='author', email='a@a.ru', text='text', rate=5)
+
+    def test_catalog_query_count_does_not_depend_on_page_size(self) -> None:
+        for limit in (5, 20):
+            with self.assertNumQueries(5):
+                response = self.client.get(reverse('product-list'), {'limit': limit})
+            self.assertEqual(len(response.json()['items']), limit)
+
+    def test_catalog_reviews_count(self) -> None:
+        response = self.client.get(reverse('product-list'), {'limit': 3})
+        self.assertEqual([item['reviews'] for item in response.json()['items']], [0, 1, 2])
+
+
+@override_settings(CATALOG_READ_MODEL=True)
+class ProductCatalogEntryTestCase(TestCase):
+    """Тесты для поддержки таблицы ProductCatalogEntry сигналами."""
+
+    def test_entry_follows_product_changes(self) -> None:
+        product = Product.objects.create(title='product', price=100)
+        tag = Tag.objects.create(name='tag')
+        product.tags.add(tag)
+        ProductImage.objects.create(product=product, image='products/images/1.webp', name='alt')
+        Review.objects.create(product=product, author='author', email='a@a.ru', text='text', rate=4)
+        Sale.objects.create(product=product, salePrice=80,
+                            dateFrom=datetime.date.today(), dateTo=datetime.date.today())
+
+        entry = ProductCatalogEntry.objects.get(product=product)
+        self.assertEqual((entry.price, entry.salePrice), (100, 80))
+        self.assertEqual(entry.num_reviews, 1)
+        self.assertEqual([image['src'] for image in entry.images], ['/products/images/1.webp'])
+        self.assertEqual(entry.tags, [{'id': tag.pk, 'name': 'tag'}])
+
+        tag.name = 'renamed'
+        tag.save()
+        entry.refresh_from_db()
+        self.assertEqual(entry.tags, [{'id': tag.pk, 'name': 'renamed'}])
+
+        tag.products.remove(product)
+        with self.captureOnCommitCallbacks(execute=True):
+            product.salePrice.all().delete()
+        entry.refresh_from_db()
+        self.assertEqual(entry.tags, [])
+        self.assertEqual((entry.price, entry.salePrice), (100, None))
+
+        specification = Specification.objects.create(name='name', value='value')
+        product.specifications.add(specification)
+        specification.value = 'changed'
+        specification.save()
+        entry.refresh_from_db()
+        self.assertEqual(entry.specifications, [{'id': specification.pk, 'name': 'name', 'value': 'changed'}])
+
+    def test_entries_serialized_like_products(self) -> None:
+        cheap = Product.objects.create(title='cheap', price=50, fullDescription='full', active=True)
+        product = Product.objects.create(title='product', price=100, fullDescription='full', active=True)
+        product.tags.add(Tag.objects.create(name='tag'))
+        product.specifications.add(Specification.objects.create(name='name', value='value'))
+        for number in range(2):
+            ProductImage.objects.create(product=product, image=f'products/images/{number}.webp', name='alt')
+        Review.objects.create(product=product, author='author', email='a@a.ru', text='text', rate=4)
+        Sale.objects.create(product=product, salePrice=40,
+                            dateFrom=datetime.date.today(), dateTo=datetime.date.today())
+
+        params = {'sort': 'price', 'sortType': 'inc'}
+        with override_settings(CATALOG_READ_MODEL=False):
+            expected = self.client.get(reverse('product-list'), params).json()['items']
+        items = self.client.get(reverse('product-list'), params).json()['items']
+        self.assertEqual([item['id'] for item in expected], [cheap.pk, product.pk])
+        self.assertEqual(items, expected)
+
+    def test_product_deleted_with_related_objects(self) -> None:
+        product = Product.objects.create(title='product', price=100)
+        ProductImage.objects.create(product=product, image='products/images/1.webp')
+        Review.objects.create(product=product, author='author', email='a@a.ru', text='text', rate=4)
+        Sale.objects.create(product=product, salePrice=80,
+                            dateFrom=datetime.date.today(), dateTo=datetime.date.today())
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(ProductCatalogEntry.objects.exists())
+
+    @override_settings(CATALOG_READ_MODEL=False)
+    def test_entries_not_maintained_when_disabled(self) -> None:
+        product = Product.objects.create(title='product', price=100)
+        Review.objects.create(product=product, author='author', email='a@a.ru', text='text', rate=4)
+        self.assertFalse(ProductCatalogEntry.objects.exists())
+
+    def test_catalog_served_from_entries(self) -> None:
+        for number in range(3):
+            Product.objects.create(title=f'product {number}', price=100 + number, active=True)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('product-list'), {'sort': 'price', 'sortType': 'dec'})
+        self.assertEqual([item['price'] for item in response.json()['items']], [102, 101, 100])
+
+
+class KeysetPaginationTestCase(TestCase):
+    """Тесты для постраничной выборки каталога по курсору."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        for number in range(7):
+            Product.objects.create(title=f'product {number}', price=100 + number % 3)
+
+    def test_cursor_pages_cover_catalog_without_count(self) -> None:
+        params = {'sort': 'price', 'sortType': 'dec', 'limit': 3, 'cursor': ''}
+        ids = []
+        while params['cursor'] is not None:
+            with self.assertNumQueries(4):
+                data = self.client.get(reverse('product-list'), params).json()
+            self.assertNotIn('lastPage', data)
+            ids.extend(item['id'] for item in data['items'])
+            params['cursor'] = data['nextCursor']
+        expected = Product.objects.order_by('-price', '-pk').values_list('pk', flat=True)
+        self.assertEqual(ids, list(expected))
+
+    def test_invalid_cursor(self) -> None:
+        response = self.client.get(reverse('product-list'), {'cursor': 'invalid'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_limit_is_validated_and_clamped(self) -> None:
+        for limit, count in (('0', 1), ('-5', 1), ('1000', 7)):
+            response = self.client.get(reverse('product-list'), {'cursor': '', 'limit': limit})
+            self.assertEqual(len(response.json()['items']), count)
+        for params in ({'cursor': '', 'limit': 'ten'}, {'limit': '2.5'}):
+            self.assertEqual(self.client.get(reverse('product-list'), params).status_code, 400)
+
+
+class ProductSearchTestCase(TestCase):
+    """Тесты для поиска по каталогу."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.phone = Product.objects.create(title='Смартфон Xiaomi 13 Pro', description='зеленый')
+        cls.tv = Product.objects.create(title='Телевизор Samsung', description='Смартфон в подарок')
+        Product.objects.create(title='Наушники JBL')
+
+    def test_search_is_case_insensitive_and_ranked(self) -> None:
+        response = self.client.get(reverse('product-list'), {'filter[name]': 'смартфон'})
+        self.assertEqual([item['id'] for item in response.json()['items']], [self.phone.pk, self.tv.pk])
+
+    def test_search_index_follows_product_changes(self) -> None:
+        self.tv.tags.add(Tag.objects.create(name='OLED'))
+        self.phone.delete()
+        response = self.client.get(reverse('product-list'), {'filter[name]': 'oled смарт', 'sort': 'price'})
+        self.assertEqual([item['id'] for item in response.json()['items']], [self.tv.pk])
+
+    def test_query_without_words_finds_nothing(self) -> None:
+        response = self.client.get(reverse('product-list'), {'filter[name]': '?!'})
+        self.assertEqual(response.json()['items'], [])
+
+    def test_loaddata_indexes_products(self) -> None:
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with open(f'{directory}/products.json', 'w', encoding='utf-8') as file:
+            file.write('[{"model": "products.product", "pk": 100, '
+                       '"fields": {"title": "Планшет Lenovo", "date": "2024-01-01T00:00:00Z"}}]')
+        call_command('loaddata', f'{directory}/products.json', verbosity=0)
+        response = self.client.get(reverse('product-list'), {'filter[name]': 'планшет'})
+        self.assertEqual([item['id'] for item in response.json()['items']], [100])
+
+
+class CategoryTreeTestCase(TestCase):
+    """Тесты для дерева категорий."""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.root = Category.objects.create(title='root')
+        self.child = Category.objects.create(title='child', parent=self.root)
+        self.grandchild = Category.objects.create(title='grandchild', parent=self.child)
+        self.product = Product.objects.create(title='product', category=self.grandchild)
+
+    def test_catalog_filters_whole_subtree(self) -> None:
+        for category in (self.root, self.child, self.grandchild):
+            response = self.client.get(reverse('product-list'), {'category': category.pk})
+            self.assertEqual([item['id'] for item in response.json()['items']], [self.product.pk])
+
+    def test_tree_is_cached_and_invalidated(self) -> None:
+        self.client.get(reverse('categories_list'))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('categories_list'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(title='other')
+        response = self.client.get(reverse('categories_list'))
+        self.assertEqual([item['title'] for item in response.json()], ['root', 'other'])
+
+
+class ResponseCacheTestCase(TestCase):
+    """Тесты для кэширования ответов витрины."""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.product = Product.objects.create(title='product', price=100, limited=True)
+
+    def test_response_cached_until_data_changes(self) -> None:
+        self.client.get(reverse('limited_list'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('limited_list'))
+        self.assertEqual(response.json()[0]['title'], 'product')
+
+        self.product.title = 'renamed'
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.product.save()
+        # До фиксации транзакции поколение не меняется, и ответ берется из кэша.
+        with self.assertNumQueries(0):
+            self.client.get(reverse('limited_list'))
+        for callback in callbacks:
+            callback()
+        response = self.client.get(reverse('limited_list'))
+        self.assertEqual(response.json()[0]['title'], 'renamed')
+
+    def test_conditional_request(self) -> None:
+        etag = self.client.get(reverse('limited_list'))['ETag']
+        response = self.client.get(reverse('limited_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(product=self.product, author='author', email='a@a.ru', text='text')
+        response = self.client.get(reverse('limited_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['reviews'], 1)
+
+    def test_if_modified_since_expires_at_day_start(self) -> None:
+        yesterday = time.mktime((datetime.date.today() - datetime.timedelta(days=1)).timetuple())
+        cache.set_many({GENERATION_KEY.format(name=name): yesterday for name in (PRODUCT, SALE, REVIEW, TAG)})
+        response = self.client.get(reverse('limited_list'), HTTP_IF_MODIFIED_SINCE=http_date(yesterday + 60))
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse('limited_list'), HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+
+class ProductRatingTestCase(TestCase):
+    """Тесты для счетчиков рейтинга продукта."""
+
+    def setUp(self) -> None:
+        self.product = Product.objects.create(title='product', rating=3)
+
+    def test_rating_follows_reviews(self) -> None:
+        for rate in (5, 4):
+            Review.objects.create(product=self.product, author='author', email='a@a.ru', text='text', rate=rate)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_sum, self.product.review_count), (9, 2))
+        self.assertEqual(self.product.rating, Decimal('4.5'))
+
+        self.product.reviews.filter(rate=5).delete()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_sum, self.product.review_count, self.product.rating), (4, 1, 4))
+
+        self.product.reviews.all().delete()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_sum, self.product.review_count, self.product.rating), (0, 0, 0))
+
+    def test_reconcile_ratings(self) -> None:
+        Review.objects.bulk_create(
+            Review(product=self.product, author='author', email='a@a.ru', text='text', rate=rate) for rate in (5, 2))
+        self.assertEqual(Product.objects.reconcile_ratings(), [self.product.pk])
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_sum, self.product.review_count), (7, 2))
+        self.assertEqual(self.product.rating, Decimal('3.5'))
+        self.assertEqual(Product.objects.reconcile_ratings(), [])
+
+
+class ProductReviewsTestCase(TestCase):
+    """Тесты для постраничной выдачи отзывов продукта."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.product = Product.objects.create(title='product', price=100)
+        for number in range(25):
+            Review.objects.create(product=cls.product, author=f'author {number}', email='a@a.ru', text='text',
+                                  rate=number % 5 + 1)
+
+    def test_product_embeds_first_page(self) -> None:
+        data = self.client.get(reverse('product_detail', args=[self.product.pk])).json()
+        self.assertEqual(len(data['reviews']), 10)
+        self.assertEqual(data['reviewsCount'], 25)
+        self.assertIsNotNone(data['reviewsCursor'])
+        self.assertNotIn('rating_sum', data)
+
+    def test_review_pages_follow_cursor(self) -> None:
+        url = reverse('review-create', args=[self.product.pk])
+        authors = []
+        cursor = self.client.get(reverse('product_detail', args=[self.product.pk])).json()['reviewsCursor']
+        while cursor:
+            data = self.client.get(url, {'cursor': cursor}).json()
+            self.assertEqual(data['total'], 25)
+            authors += [review['author'] for review in data['items']]
+            cursor = data['nextCursor']
+        self.assertEqual(authors, [f'author {number}' for number in range(10, 25)])
+
+
+class BannersTestCase(TestCase):
+    """Тесты для выбора баннеров из пула кандидатов."""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.categories = [Category.objects.create(title=f'category {number}', favourite=True) for number in range(3)]
+        for category in self.categories:
+            for number in range(5):
+                Product.objects.create(title=f'{category.title} product {number}', category=category)
+
+    def test_banner_per_favourite_category(self) -> None:
+        response = self.client.get(reverse('banners_list'))
+        self.assertEqual([item['category'] for item in response.json()], [category.pk for category in self.categories])
+
+    def test_pool_is_cached_and_sampled(self) -> None:
+        self.client.get(reverse('banners_list'))
+        with self.assertNumQueries(4):
+            self.client.get(reverse('banners_list'))
+        pool = build_banner_pool(size=2)
+        self.assertEqual([len(candidates) for candidates in pool.values()], [2, 2, 2])
+
+
+class AsyncViewsTestCase(TestCase):
+    """Тесты для асинхронных Api ASGI-развертывания: ответы совпадают с синхронными Api."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.category = Category.objects.create(title='category')
+        cls.child = Category.objects.create(title='child', parent=cls.category)
+        tag = Tag.objects.create(name='tag')
+        cls.category.tags.add(tag)
+        specification = Specification.objects.create(name='name', value='value')
+        for number in range(12):
+            product = Product.objects.create(title=f'product {number}', price=100 + number, category=cls.child)
+            product.tags.add(tag)
+            product.specifications.add(specification)
+            ProductImage.objects.create(product=product, image=f'products/images/{number}.webp')
+        cls.product = product
+        Sale.objects.create(product=product, salePrice=50, dateFrom='2000-01-01', dateTo='2100-01-01')
+        for number in range(12):
+            Review.objects.create(product=product, author='author', email='a@a.ru', text=f'text {number}', rate=4)
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def async_get(self, path: str, data: dict = None) -> HttpResponse:
+        async def get() -> HttpResponse:
+            return await self.async_client.get(path, data)
+
+        with override_settings(ROOT_URLCONF=settings.ASGI_URLCONF):
+            return async_to_sync(get)()
+
+    def test_responses_match_sync_views(self) -> None:
+        requests = [
+            (f'/api/product/{self.product.pk}/', None),
+            ('/api/tags/', None),
+            ('/api/tags/', {'category': self.category.pk}),
+            ('/api/categories/', None),
+            ('/api/catalog/', {'limit': 5, 'currentPage': 2, 'sort': 'price', 'sortType': 'dec'}),
+            ('/api/catalog/', {'category': self.category.pk, 'filter[name]': 'product 1'}),
+            ('/api/catalog/', {'limit': 5, 'cursor': ''}),
+        ]
+        for path, data in requests:
+            with self.subTest(path=path, data=data):
+                response = self.async_get(path, data)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), self.client.get(path, data).json())
+
+    def test_errors(self) -> None:
+        self.assertEqual(self.async_get('/api/product/0/').status_code, 404)
+        self.assertEqual(self.async_get('/api/catalog/', {'cursor': 'bad'}).status_code, 400)
+
+
+class SyntheticDataTestCase(TestCase):
+    """Тесты для генератора синтетической витрины."""
+
+    def test_generated_data_is_consistent(self) -> None:
+        data = generate_storefront(products=50, reviews=120, sale_share=0.5)
+        self.assertEqual((Product.objects.count(), Review.objects.count()), (50, 120))
+        self.assertEqual(Product.objects.reconcile_ratings(), [])
+        self.assertEqual(Sale.objects.active().count(), data['sales'])
+        self.assertTrue(Category.objects.filter(parent__parent__isnull=False).exists())
+        self.assertFalse(Product.objects.filter(category__parent__parent__isnull=True).exists())
+
+
+@override_settings(IMAGE_WORKER_THREADS=0, IMAGE_DERIVATIVE_WIDTHS=[160, 320, 640], IMAGE_DERIVATIVE_FORMATS=['webp'])
+class ImageVariantsTestCase(TestCase):
+    """Тесты для уменьшенных копий изображений продуктов и иконок категорий."""
+
+    def setUp(self) -> None:
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+
+    @staticmethod
+    def upload(name: str, width: int, height: int) -> SimpleUploadedFile:
+        buffer = BytesIO()
+        Image.new('RGB', (width, height), 'red').save(buffer, format='PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def test_variants_are_built_after_upload(self) -> None:
+        product = Product.objects.create(title='product', price=100)
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=product, image=self.upload('photo.png', 400, 200))
+        image.refresh_from_db()
+        self.assertEqual(image.variants['source'], image.image.name)
+        self.assertEqual([(variant['width'], variant['format']) for variant in image.variants['images']],
+                         [(160, 'webp'), (320, 'webp'), (400, 'webp')])
+        storage = image.image.storage
+        for variant in image.variants['images']:
+            with Image.open(storage.open(variant['src'])) as derivative:
+                self.assertEqual((derivative.format, derivative.width), ('WEBP', variant['width']))
+
+        item = self.client.get(reverse('product-list')).json()['items'][0]
+        self.assertTrue(item['images'][0]['src'].endswith('.320w.webp'))
+        self.assertEqual(item['images'][0]['srcset'].count('w, '), 2)
+
+    def test_replaced_image_gets_new_variants(self) -> None:
+        category = Category.objects.create(title='category')
+        with self.captureOnCommitCallbacks(execute=True):
+            icon = CategoryIcon.objects.create(category=category, src=self.upload('icon.png', 100, 100))
+        icon.refresh_from_db()
+        first = icon.variants['images']
+        self.assertEqual([variant['width'] for variant in first], [100])
+        with self.captureOnCommitCallbacks(execute=True):
+            icon.src = self.upload('icon.png', 200, 200)
+            icon.save()
+        icon.refresh_from_db()
+        self.assertEqual([variant['width'] for variant in icon.variants['images']], [160, 200])
+        self.assertNotEqual(first[0]['src'].rsplit('.', 3)[1], icon.variants['images'][0]['src'].rsplit('.', 3)[1])
+        srcset = self.client.get(reverse('categories_list')).json()[0]['image']['srcset']
+        self.assertIn('200w', srcset)
+
+    def test_command_follows_settings_and_force_overwrites(self) -> None:
+        product = Product.objects.create(title='product', price=100)
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=product, image=self.upload('photo.png', 400, 200))
+        call_command('build_image_derivatives', stdout=StringIO())
+        image.refresh_from_db()
+        self.assertEqual([variant['width'] for variant in image.variants['images']], [160, 320, 400])
+
+        with override_settings(IMAGE_DERIVATIVE_WIDTHS=[200]):
+            out = StringIO()
+            call_command('build_image_derivatives', stdout=out)
+        self.assertIn('built: 1', out.getvalue())
+        image.refresh_from_db()
+        self.assertEqual([variant['width'] for variant in image.variants['images']], [200])
+
+        storage = image.image.storage
+        name = image.variants['images'][0]['src']
+        with storage.open(name, 'wb') as derivative:
+            derivative.write(b'stale')
+        with override_settings(IMAGE_DERIVATIVE_WIDTHS=[200]):
+            call_command('build_image_derivatives', stdout=StringIO())
+            with storage.open(name) as derivative:
+                self.assertEqual(derivative.read(), b'stale')
+            call_command('build_image_derivatives', force=True, stdout=StringIO())
+        image.refresh_from_db()
+        self.assertEqual(image.variants['images'][0]['src'], name)
+        with Image.open(storage.open(name)) as derivative:
+            self.assertEqual(derivative.width, 200)
+
+    def test_missing_file_is_logged(self) -> None:
+        product = Product.objects.create(title='product', price=100)
+        with self.assertLogs('products.images', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=product, image='products/images/missing.png')
+        image.refresh_from_db()
+        self.assertEqual(image.variants, {})
+
+
+class ProductTransferTestCase(TestCase):
+    """Тесты для потоковой выгрузки и загрузки продуктов."""
+
+    def setUp(self) -> None:
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = f'{directory}/products'
+
+    def export(self, fmt: str) -> str:
+        stream = StringIO()
+        for _ in write_records(export_records(batch_size=3), stream, fmt):
+            pass
+        return stream.getvalue()
+
+    def test_export_import_round_trip(self) -> None:
+        generate_storefront(products=10, reviews=0, sale_share=0.5)
+        originals = list(Product.objects.order_by('pk'))
+        exported = {fmt: self.export(fmt) for fmt in ('jsonl', 'csv')}
+        for fmt, data in exported.items():
+            with self.subTest(fmt=fmt):
+                records = list(read_records(StringIO(data), fmt))
+                for record in records:
+                    record.pop('id')
+                    record['title'] = f'{fmt} {record["title"]}'
+                importer = ProductImporter()
+                importer.run(records, batch_size=4)
+                self.assertEqual(importer.created, 10)
+                copies = Product.objects.filter(title__startswith=f'{fmt} ').order_by('pk')
+                for original, copy in zip(originals, copies):
+                    self.assertEqual((copy.price, copy.category_id), (original.price, original.category_id))
+                    self.assertEqual(set(copy.tags.values_list('pk', flat=True)),
+                                     set(original.tags.values_list('pk', flat=True)))
+                    self.assertEqual(set(copy.specifications.values_list('pk', flat=True)),
+                                     set(original.specifications.values_list('pk', flat=True)))
+                    self.assertEqual(list(copy.salePrice.values_list('salePrice', 'dateFrom', 'dateTo')),
+                                     list(original.salePrice.values_list('salePrice', 'dateFrom', 'dateTo')))
+                    self.assertEqual(list(copy.images.values_list('image', flat=True)),
+                                     list(original.images.values_list('image', flat=True)))
+
+    def test_import_command_updates_and_creates(self) -> None:
+        product = Product.objects.create(title='old', price=100, count=1)
+        product.tags.add(Tag.objects.create(name='old tag'))
+        with open(f'{self.path}.csv', 'w', encoding='utf-8') as file:
+            file.write('id,title,price,category,tags\n')
+            file.write(f'{product.pk},,150,Электроника/Ноутбуки,"[""new tag""]"\n')
+            file.write('1000,fresh,20,Электроника/Ноутбуки,\n')
+        call_command('import_products', f'{self.path}.csv', stdout=StringIO())
+
+        product.refresh_from_db()
+        self.assertEqual((product.title, product.price, product.count), ('old', 150, 1))
+        self.assertEqual(product.category.parent.title, 'Электроника')
+        self.assertEqual(list(product.tags.values_list('name', flat=True)), ['new tag'])
+        self.assertEqual(Product.objects.get(pk=1000).category_id, product.category_id)
+        self.assertGreater(Product.objects.create(title='next').pk, 1000)
+        response = self.client.get(reverse('product-list'), {'filter[name]': 'fresh'})
+        self.assertEqual([item['id'] for item in response.json()['items']], [1000])
+
+    @override_settings(IMAGE_WORKER_THREADS=0, IMAGE_DERIVATIVE_WIDTHS=[160], IMAGE_DERIVATIVE_FORMATS=['webp'])
+    def test_imported_images_get_variants(self) -> None:
+        with override_settings(MEDIA_ROOT=self.path.rsplit('/', 1)[0]):
+            storage = ProductImage._meta.get_field('image').storage
+            buffer = BytesIO()
+            Image.new('RGB', (400, 200), 'red').save(buffer, format='PNG')
+            name = storage.save('products/images/photo.png', SimpleUploadedFile('photo.png', buffer.getvalue()))
+            with open(f'{self.path}.jsonl', 'w', encoding='utf-8') as file:
+                file.write(f'{{"title": "product", "price": "10", "images": [{{"src": "{name}"}}]}}\n')
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('import_products', f'{self.path}.jsonl', stdout=StringIO())
+            image = ProductImage.objects.get()
+            self.assertEqual([(variant['width'], variant['format']) for variant in image.variants['images']],
+                             [(160, 'webp')])
+            self.assertTrue(storage.exists(image.variants['images'][0]['src']))
+
+    def test_invalid_record_rolls_back_import(self) -> None:
+        with open(f'{self.path}.jsonl', 'w', encoding='utf-8') as file:
+            file.write('{"title": "first", "price": "10"}\n{"title": "second", "price": "ten"}\n')
+        with self.assertRaisesMessage(CommandError, 'record 2, price'):
+            call_command('import_products', f'{self.path}.jsonl', stdout=StringIO())
+        self.assertFalse(Product.objects.exists())
+
+
+@override_settings(CATALOG_READ_MODEL=True)
+class ProductSupplyTestCase(TestCase):
+    """Тесты для пакетного изменения цен и остатков."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.products = [Product.objects.create(title=f'product {number}', price=100, count=10) for number in range(3)]
+        cls.supplier = User.objects.create_user(username='supplier', password='supplier')
+        cls.supplier.user_permissions.add(Permission.objects.get(codename='change_product'))
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_permission_is_required(self) -> None:
+        url = reverse('product-supply')
+        self.assertEqual(self.client.post(url, [], content_type='application/json').status_code, 403)
+        self.client.force_login(User.objects.create_user(username='customer', password='customer'))
+        self.assertEqual(self.client.post(url, [], content_type='application/json').status_code, 403)
+
+    def test_only_changed_rows_are_updated(self) -> None:
+        first, second, third = self.products
+        self.client.get(reverse('product-list'))
+        self.client.force_login(self.supplier)
+        items = [
+            {'id': first.pk, 'price': '120.50'},
+            {'id': second.pk, 'price': '100.00', 'count': 10},
+            {'id': third.pk, 'count': 3},
+            {'id': 0, 'count': 1},
+        ]
+        response = self.client.post(reverse('product-supply'), items, content_type='application/json')
+        self.assertEqual(response.json(), {'updated': 2, 'unchanged': 1, 'missing': [0]})
+        self.assertEqual([(product.price, product.count) for product in Product.objects.order_by('pk')],
+                         [(Decimal('120.50'), 10), (100, 10), (100, 3)])
+        self.assertEqual(ProductCatalogEntry.objects.get(pk=first.pk).price, Decimal('120.50'))
+        prices = [item['price'] for item in self.client.get(reverse('product-list')).json()['items']]
+        self.assertEqual(prices[0], 120.5)
+
+        response = self.client.post(reverse('product-supply'), [{'id': first.pk, 'count': -1}],
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_command_applies_feed(self) -> None:
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with open(f'{directory}/feed.csv', 'w', encoding='utf-8') as file:
+            file.write('id,price,count\n')
+            file.writelines(f'{product.pk},90,{number}\n' for number, product in enumerate(self.products))
+        call_command('apply_supply', f'{directory}/feed.csv', chunk_size=2, stdout=StringIO())
+        self.assertEqual(list(Product.objects.order_by('pk').values_list('price', 'count')),
+                         [(90, 0), (90, 1), (90, 2)])
+        with open(f'{directory}/feed.csv', 'a', encoding='utf-8') as file:
+            file.write(f'{self.products[0].pk},-5,1\n')
+        with self.assertRaisesMessage(CommandError, 'Record 4'):
+            call_command('apply_supply', f'{directory}/feed.csv', stdout=StringIO())
+
+
+@override_settings(CATALOG_READ_MODEL=True)
+class ActiveSaleTestCase(TestCase):
+    """Тесты для таблицы действующих скидок ActiveSale."""
+
+    def setUp(self) -> None:
+        self.today = datetime.date.today()
+        self.product = Product.objects.create(title='product', price=100)
+        cache.clear()
+
+    def sale(self, price: int, days_from: int, days_to: int, product: Product = None) -> Sale:
+        return Sale.objects.create(product=product or self.product, salePrice=price,
+                                   dateFrom=self.today + datetime.timedelta(days=days_from),
+                                   dateTo=self.today + datetime.timedelta(days=days_to))
+
+    def test_one_effective_sale_per_product(self) -> None:
+        first = self.sale(80, -5, 5)
+        self.sale(70, -1, 1)
+        self.sale(60, 1, 5)
+        self.assertEqual(list(ActiveSale.objects.values_list('sale_id', 'salePrice')), [(first.pk, 80)])
+        response = self.client.get(reverse('sales_list'))
+        self.assertEqual([item['id'] for item in response.json()['items']], [first.pk])
+        self.assertEqual(self.client.get(reverse('product_detail', args=[self.product.pk])).json()['price'], 80)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(ActiveSale.objects.get().salePrice, 70)
+        self.assertEqual(ProductCatalogEntry.objects.get(pk=self.product.pk).salePrice, 70)
+
+    def test_sales_are_switched_at_day_boundary(self) -> None:
+        ending = self.sale(80, -5, 0)
+        self.sale(60, 1, 5)
+        self.assertEqual(ActiveSale.objects.get().sale_id, ending.pk)
+
+        tomorrow = self.today + datetime.timedelta(days=1)
+        self.assertFalse(ActiveSale.objects.current(tomorrow).exists())
+        self.assertEqual(refresh_active_sales(day=tomorrow), [self.product.pk])
+        self.assertEqual(ActiveSale.objects.get().salePrice, 60)
+        self.assertEqual(refresh_active_sales(day=tomorrow), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(activate_sales(), [self.product.pk])
+        self.assertEqual(ProductCatalogEntry.objects.get(pk=self.product.pk).salePrice, 80)
+
+    def test_moved_sale_releases_previous_product(self) -> None:
+        other = Product.objects.create(title='other', price=100)
+        sale = self.sale(80, -5, 5)
+        sale.product = other
+        sale.save()
+        self.assertEqual(list(ActiveSale.objects.values_list('product_id', 'sale_id')), [(other.pk, sale.pk)])
+        self.assertIsNone(ProductCatalogEntry.objects.get(pk=self.product.pk).salePrice)
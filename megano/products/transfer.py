@@ -0,0 +1,291 @@
+import csv
+import json
+from decimal import Decimal
+from functools import partial
+from itertools import islice
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from .banners import invalidate_banner_pool
+from .catalog import refresh_catalog_entries
+from .categories import invalidate_category_tree
+from .images import submit_variants
+from .models import Category, Product, ProductImage, Sale, Specification, Tag
+from .response_cache import CATEGORY, PRODUCT, SALE, TAG, bump_generation
+from .sales import refresh_active_sales
+from .search import get_search_backend
+
+FORMATS = ('jsonl', 'csv')
+BATCH_SIZE = 2000
+
+# Поля продукта в записи обмена; у существующих продуктов обновляются только переданные поля.
+PRODUCT_FIELDS = ['title', 'description', 'fullDescription', 'price', 'count', 'freeDelivery', 'limited', 'active']
+# Вложенные поля: в JSONL - списки, в CSV - ячейки с JSON.
+NESTED_FIELDS = ['tags', 'specifications', 'images', 'sales']
+CSV_COLUMNS = ['id'] + PRODUCT_FIELDS + ['category'] + NESTED_FIELDS
+
+# Разделитель названий в пути категории: "Смартфоны и гаджеты/Смартфоны".
+CATEGORY_SEPARATOR = '/'
+
+
+def batched(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Функция для разбиения потока на списки не длиннее size."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def read_records(stream: IO[str], fmt: str) -> Iterator[Dict[str, Any]]:
+    """Функция для потокового чтения записей продуктов из JSONL или CSV (пустые ячейки CSV пропускаются)."""
+    if fmt == 'jsonl':
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+        return
+    for row in csv.DictReader(stream):
+        record = {key: value for key, value in row.items() if key and value not in (None, '')}
+        for field in NESTED_FIELDS:
+            if field in record:
+                record[field] = json.loads(record[field])
+        yield record
+
+
+def write_records(records: Iterable[Dict[str, Any]], stream: IO[str], fmt: str) -> Iterator[int]:
+    """Функция для потоковой записи продуктов в JSONL или CSV; после каждой записи возвращает их количество."""
+    writer = None
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+    for written, record in enumerate(records, 1):
+        if writer is None:
+            stream.write(json.dumps(record, ensure_ascii=False, cls=DjangoJSONEncoder) + '\n')
+        else:
+            writer.writerow({
+                key: json.dumps(value, ensure_ascii=False, cls=DjangoJSONEncoder) if key in NESTED_FIELDS else value
+                for key, value in record.items()
+            })
+        yield written
+
+
+def category_paths() -> Dict[int, str]:
+    """Функция для путей всех категорий по id ("родитель/категория")."""
+    categories = {pk: (title, parent_id) for pk, title, parent_id in
+                  Category.objects.values_list('pk', 'title', 'parent_id')}
+    paths: Dict[int, str] = {}
+
+    def path(pk: int) -> str:
+        if pk not in paths:
+            title, parent_id = categories[pk]
+            paths[pk] = f'{path(parent_id)}{CATEGORY_SEPARATOR}{title}' if parent_id else title
+        return paths[pk]
+
+    for pk in categories:
+        path(pk)
+    return paths
+
+
+def export_records(batch_size: int = BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    """Функция для потоковой выгрузки продуктов со связями: продукты читаются пачками по возрастанию id."""
+    paths = category_paths()
+    products = Product.objects.order_by('pk').prefetch_related('tags', 'specifications', 'images', 'salePrice')
+    last_pk = 0
+    while True:
+        batch = list(products.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return
+        for product in batch:
+            record = {'id': product.pk}
+            record.update((field, getattr(product, field)) for field in PRODUCT_FIELDS)
+            record['category'] = paths.get(product.category_id, '')
+            record['tags'] = [tag.name for tag in product.tags.all()]
+            record['specifications'] = [{'name': specification.name, 'value': specification.value}
+                                        for specification in product.specifications.all()]
+            record['images'] = [{'src': image.image.name, 'alt': image.name} for image in product.images.all()]
+            record['sales'] = [{'salePrice': sale.salePrice, 'dateFrom': sale.dateFrom, 'dateTo': sale.dateTo}
+                               for sale in product.salePrice.all()]
+            yield record
+        last_pk = batch[-1].pk
+
+
+class ProductImporter:
+    """
+    Загрузка записей продуктов пачками: продукты создаются bulk_create (новые, в том числе с заданным id)
+    и обновляются bulk_update (существующие), теги, характеристики и категории находятся по названию
+    или создаются, связи многие-ко-многим заменяются для всей пачки несколькими запросами,
+    изображения и скидки добавляются, если у продукта таких еще нет. Сигналы моделей не отправляются:
+    действующие скидки (ActiveSale), поисковый индекс и (при включенной настройке CATALOG_READ_MODEL)
+    записи каталога обновляются для каждой пачки, уменьшенные копии новых изображений ставятся
+    в пул (submit_variants) после фиксации транзакции, кэши витрины сбрасываются один раз в finish.
+    Справочники тегов, характеристик и категорий кэшируются, поэтому память не зависит от числа продуктов.
+    """
+
+    def __init__(self) -> None:
+        self.categories: Dict[str, int] = {}
+        self.tags: Dict[str, int] = {}
+        self.specifications: Dict[Tuple[str, str], int] = {}
+        self.created = 0
+        self.updated = 0
+        self.explicit_ids = False
+        self.image_ids: List[int] = []
+
+    def category_id(self, path: str) -> Optional[int]:
+        """Возвращает id категории по пути, создавая недостающие категории пути."""
+        if not path:
+            return None
+        if path not in self.categories:
+            parent_path, _, title = path.rpartition(CATEGORY_SEPARATOR)
+            parent_id = self.category_id(parent_path)
+            category = Category.objects.filter(title=title, parent_id=parent_id).order_by('pk').first()
+            if category is None:
+                category = Category.objects.create(title=title, parent_id=parent_id, active=True)
+            self.categories[path] = category.pk
+        return self.categories[path]
+
+    def resolve_tags(self, names: Set[str]) -> None:
+        """Находит или создает теги с указанными названиями."""
+        missing = names - self.tags.keys()
+        if missing:
+            for pk, name in Tag.objects.filter(name__in=missing).order_by('-pk').values_list('pk', 'name'):
+                self.tags[name] = pk
+            created = Tag.objects.bulk_create(Tag(name=name) for name in sorted(missing - self.tags.keys()))
+            self.tags.update((tag.name, tag.pk) for tag in created)
+
+    def resolve_specifications(self, pairs: Set[Tuple[str, str]]) -> None:
+        """Находит или создает характеристики с указанными названиями и значениями."""
+        missing = pairs - self.specifications.keys()
+        if missing:
+            names = {name for name, _ in missing}
+            for pk, name, value in Specification.objects.filter(name__in=names).order_by('-pk').values_list(
+                    'pk', 'name', 'value'):
+                if (name, value) in missing:
+                    self.specifications[(name, value)] = pk
+            created = Specification.objects.bulk_create(
+                Specification(name=name, value=value) for name, value in sorted(missing - self.specifications.keys()))
+            self.specifications.update(((item.name, item.value), item.pk) for item in created)
+
+    @staticmethod
+    def clean(record: Dict[str, Any], number: int) -> Dict[str, Any]:
+        """Приводит поля продукта записи к типам модели, ValidationError содержит номер записи."""
+        fields = {}
+        for name in PRODUCT_FIELDS:
+            if name in record:
+                field = Product._meta.get_field(name)
+                try:
+                    fields[name] = field.clean(field.to_python(record[name]), None)
+                except ValidationError as error:
+                    raise ValidationError(f'record {number}, {name}: {"; ".join(error.messages)}')
+        if 'category' in record:
+            fields['category_id'] = record['category']
+        return fields
+
+    def import_batch(self, records: List[Dict[str, Any]], first_number: int = 1) -> List[int]:
+        """Загружает пачку записей, возвращает id продуктов пачки."""
+        cleaned = [self.clean(record, number) for number, record in enumerate(records, first_number)]
+        for fields in cleaned:
+            if 'category_id' in fields:
+                fields['category_id'] = self.category_id(fields['category_id'])
+        ids = [int(record['id']) for record in records if record.get('id') not in (None, '')]
+        existing = Product.objects.in_bulk(ids)
+
+        new, changed, update_fields = [], [], set()
+        products = []
+        for record, fields in zip(records, cleaned):
+            pk = int(record['id']) if record.get('id') not in (None, '') else None
+            product = existing.get(pk)
+            if product is None:
+                if not fields.get('title'):
+                    raise ValidationError(f'record {first_number + len(products)}: title is required for new products')
+                product = Product(pk=pk, **fields)
+                self.explicit_ids |= pk is not None
+                new.append(product)
+            else:
+                for name, value in fields.items():
+                    setattr(product, name, value)
+                update_fields.update(fields)
+                changed.append(product)
+            products.append(product)
+        Product.objects.bulk_create(new)
+        if changed and update_fields:
+            Product.objects.bulk_update(changed, sorted(update_fields))
+        self.created += len(new)
+        self.updated += len(changed)
+
+        self.link(records, products)
+        return [product.pk for product in products]
+
+    def link(self, records: List[Dict[str, Any]], products: List[Product]) -> None:
+        """Заменяет теги и характеристики продуктов пачки и добавляет новые изображения и скидки."""
+        self.resolve_tags({name for record in records for name in record.get('tags', [])})
+        self.resolve_specifications({(item['name'], item['value'])
+                                     for record in records for item in record.get('specifications', [])})
+        relations = [
+            (Product.tags.through, 'tag_id', 'tags', lambda name: self.tags[name]),
+            (Product.specifications.through, 'specification_id', 'specifications',
+             lambda item: self.specifications[(item['name'], item['value'])]),
+        ]
+        for through, column, key, resolve in relations:
+            replaced = [(product.pk, record[key]) for record, product in zip(records, products) if key in record]
+            if replaced:
+                through.objects.filter(product_id__in=[pk for pk, _ in replaced]).delete()
+                through.objects.bulk_create(
+                    (through(product_id=pk, **{column: resolve(item)}) for pk, items in replaced for item in items),
+                    ignore_conflicts=True)
+
+        product_ids = [product.pk for record, product in zip(records, products) if 'images' in record]
+        existing_images = set(ProductImage.objects.filter(product_id__in=product_ids).values_list('product_id', 'image'))
+        images = ProductImage.objects.bulk_create(
+            ProductImage(product_id=product.pk, image=image['src'], name=image.get('alt', ''))
+            for record, product in zip(records, products) for image in record.get('images', [])
+            if (product.pk, image['src']) not in existing_images)
+        self.image_ids.extend(image.pk for image in images)
+
+        product_ids = [product.pk for record, product in zip(records, products) if 'sales' in record]
+        existing_sales = set(Sale.objects.filter(product_id__in=product_ids).values_list(
+            'product_id', 'salePrice', 'dateFrom', 'dateTo'))
+        sales = []
+        for record, product in zip(records, products):
+            for item in record.get('sales', []):
+                sale = Sale(product_id=product.pk, salePrice=Decimal(str(item['salePrice'])),
+                            dateFrom=item.get('dateFrom'), dateTo=item.get('dateTo'))
+                for name in ('dateFrom', 'dateTo'):
+                    setattr(sale, name, Sale._meta.get_field(name).to_python(getattr(sale, name)))
+                if (product.pk, sale.salePrice, sale.dateFrom, sale.dateTo) not in existing_sales:
+                    sales.append(sale)
+        Sale.objects.bulk_create(sales)
+
+    def run(self, records: Iterable[Dict[str, Any]], batch_size: int = BATCH_SIZE,
+            progress: Optional[Callable[[int], None]] = None) -> None:
+        """Загружает поток записей пачками по batch_size, после каждой пачки вызывает progress(загружено)."""
+        loaded = 0
+        for batch in batched(records, batch_size):
+            product_ids = self.import_batch(batch, loaded + 1)
+            refresh_active_sales(product_ids)
+            if settings.CATALOG_READ_MODEL:
+                refresh_catalog_entries(product_ids)
+            get_search_backend().index_products(product_ids)
+            self.submit_image_variants()
+            loaded += len(batch)
+            if progress:
+                progress(loaded)
+        self.finish()
+
+    def submit_image_variants(self) -> None:
+        """Ставит построение копий изображений пачки после фиксации транзакции (bulk_create не отправляет post_save)."""
+        for pk in self.image_ids:
+            transaction.on_commit(partial(submit_variants, ProductImage, pk))
+        self.image_ids = []
+
+    def finish(self) -> None:
+        """Сбрасывает кэши витрины один раз на всю загрузку и продолжает последовательность id после явных id."""
+        if self.explicit_ids:
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), [Product]):
+                    cursor.execute(sql)
+        bump_generation(PRODUCT, CATEGORY, TAG, SALE)
+        invalidate_category_tree()
+        invalidate_banner_pool()
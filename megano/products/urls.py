@@ -9,6 +9,7 @@ from .views import (
     ReviewCreateView,
     SalesList,
     ProductListView,
+    ProductSupplyView,
 )
 
 urlpatterns = [
@@ -21,4 +22,5 @@ urlpatterns = [
     path('api/product/<int:pk>/reviews', ReviewCreateView.as_view(), name='review-create'),
     path('api/sales/', SalesList.as_view(), name='sales_list'),
     path('api/catalog/', ProductListView.as_view(), name='product-list'),
+    path('api/products/supply/', ProductSupplyView.as_view(), name='product-supply'),
 ]
@@ -1,18 +1,33 @@
+from django.conf import settings
 from django.core.paginator import Paginator
 from rest_framework import status
 from rest_framework.authentication import SessionAuthentication, BasicAuthentication
+from rest_framework.serializers import Serializer
 from rest_framework.views import APIView
 from rest_framework.request import Request
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-
-from django.db.models import Count, QuerySet
-from datetime import datetime, date
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import AllowAny, BasePermission, IsAuthenticated
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.http import HttpRequest
+from datetime import datetime
+from typing import List, Optional, Tuple, Type, Union
 from urllib.parse import unquote
 
 from .serializers import ProductSerializer, TagsProductSerializer, CategoriesSerializer, ReviewSerializer, \
-    SaleSerializer, ProductListSerializer
-from .models import Product, Tag, Category, Review, Sale
+    SaleSerializer, ProductListSerializer, ProductCatalogEntrySerializer, ProductSupplySerializer, REVIEWS_PAGE_SIZE
+from .models import Product, Tag, Review, Sale, ProductCatalogEntry
+from .pagination import KEYSET_SORT_FIELDS, page_limit, paginate_keyset
+from .search import get_search_backend
+from .banners import get_banners
+from .categories import CategoryTree, get_category_tree
+from .response_cache import CATEGORY, PRODUCT, REVIEW, SALE, TAG, cache_response
+from .supply import apply_product_updates
+
+# Наибольшее количество записей в одном запросе пакетного обновления цен и остатков.
+SUPPLY_MAX_ITEMS = 50000
 
 
 class ProductDetail(APIView):
@@ -21,7 +36,7 @@ class ProductDetail(APIView):
     serializer_class = ProductSerializer
     def get(self, request: Request, pk: int) -> Response:
 
-        product = Product.objects.get(pk=pk)
+        product = Product.objects.with_sale_price().get(pk=pk)
         serialized = ProductSerializer(product, many=False)
         return Response(serialized.data)
 
@@ -30,11 +45,12 @@ class TagsList(APIView):
     """Api для получения списка tags"""
 
     serializer_class = TagsProductSerializer
+    @cache_response(TAG, CATEGORY)
     def get(self, request: Request) -> Response:
         category_pk = request.GET.get('category')
         if category_pk:
-            category = Category.objects.get(pk=category_pk)
-            tags = category.tags.all()
+            category = get_category_tree().get(int(category_pk))
+            tags = category.tags.all() if category else []
         else:
             tags = Tag.objects.all()
         data = TagsProductSerializer(tags, many=True)
@@ -46,8 +62,9 @@ class CategoryList(APIView):
 
     serializer_class = CategoriesSerializer
 
+    @cache_response(CATEGORY, TAG)
     def get(self, request: Request) -> Response:
-        categories = Category.objects.filter(parent=None)
+        categories = get_category_tree().roots()
         data = CategoriesSerializer(categories, many=True)
         return Response(data.data)
 
@@ -58,15 +75,7 @@ class BannersList(APIView):
     serializer_class = ProductListSerializer
 
     def get(self, request: Request) -> Response:
-        categories_favourite = Category.objects.filter(favourite=True)[:3]
-        banners = []
-
-        for category in categories_favourite:
-            random_product = Product.objects.filter(category=category).order_by('?').first()
-            if random_product:
-                banners.append(random_product)
-
-        serialized = ProductListSerializer(banners, many=True)
+        serialized = ProductListSerializer(get_banners(), many=True)
         return Response(serialized.data)
 
 
@@ -75,8 +84,12 @@ class LimitedList(APIView):
 
     serializer_class = ProductListSerializer
 
+    @cache_response(PRODUCT, SALE, REVIEW, TAG)
     def get(self, request: Request) -> Response:
-        products = Product.objects.filter(limited=True)[:16]
+        if settings.CATALOG_READ_MODEL:
+            entries = ProductCatalogEntry.objects.filter(limited=True)[:16]
+            return Response(ProductCatalogEntrySerializer(entries, many=True).data)
+        products = Product.objects.for_list().filter(limited=True)[:16]
         serialized = ProductListSerializer(products, many=True)
         return Response(serialized.data)
 
@@ -86,19 +99,35 @@ class PopularList(APIView):
 
     serializer_class = ProductListSerializer
 
+    @cache_response(PRODUCT, SALE, REVIEW, TAG)
     def get(self, request: Request) -> Response:
-        products = Product.objects.filter(active=True).annotate(
-            count_reviews=Count('reviews')).order_by('-count_reviews')[:8]
+        if settings.CATALOG_READ_MODEL:
+            entries = ProductCatalogEntry.objects.filter(active=True).order_by('-num_reviews')[:8]
+            return Response(ProductCatalogEntrySerializer(entries, many=True).data)
+        products = Product.objects.for_list().filter(active=True).order_by('-num_reviews')[:8]
         serialized = ProductListSerializer(products, many=True)
         return Response(serialized.data)
 
 
 class ReviewCreateView(APIView):
-    """Api для добавления нового отзыва"""
+    """Api для получения страницы отзывов продукта и добавления нового отзыва"""
 
     serializer_class = ReviewSerializer
     authentication_classes = [SessionAuthentication, BasicAuthentication]
-    permission_classes = [IsAuthenticated]
+
+    def get_permissions(self) -> List[BasePermission]:
+        if self.request.method == 'GET':
+            return [AllowAny()]
+        return [IsAuthenticated()]
+
+    def get(self, request: Request, pk: int) -> Response:
+        """Функция для получения отзывов продукта по курсору (как в reviewsCursor карточки продукта)."""
+        product = get_object_or_404(Product.objects.only('pk', 'review_count'), pk=pk)
+        limit = page_limit(request, REVIEWS_PAGE_SIZE)
+        reviews, next_cursor = paginate_keyset(
+            Review.objects.filter(product=pk), 'pk', False, request.GET.get('cursor'), limit)
+        serialized = ReviewSerializer(reviews, many=True)
+        return Response({'items': serialized.data, 'nextCursor': next_cursor, 'total': product.review_count})
 
     def post(self, request: Request, pk: int, *args, **kwargs) -> Response:
         product = Product.objects.get(pk=pk)
@@ -106,23 +135,53 @@ class ReviewCreateView(APIView):
         request.data['date'] = datetime.now()
         serializer = ReviewSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
-            product = serializer.instance.product
-            product.update_rating()
-            reviews = Review.objects.filter(product=pk)
-            serialized = ReviewSerializer(reviews, many=True)
-            return Response(serialized.data, status=status.HTTP_201_CREATED)
+            with transaction.atomic():
+                serializer.save()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class CanChangeProducts(BasePermission):
+    """Разрешение для пользователей с правом изменения продуктов (products.change_product)."""
+
+    def has_permission(self, request: Request, view: APIView) -> bool:
+        return request.user.has_perm('products.change_product')
+
+
+class ProductSupplyView(APIView):
+    """
+    Api для пакетного изменения цен и остатков поставщиком: принимает список {id, price, count}
+    (не больше SUPPLY_MAX_ITEMS записей) и применяет его одной транзакцией.
+    """
+
+    serializer_class = ProductSupplySerializer
+    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    permission_classes = [CanChangeProducts]
+
+    def post(self, request: Request) -> Response:
+        serializer = ProductSupplySerializer(data=request.data, many=True, max_length=SUPPLY_MAX_ITEMS)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(apply_product_updates(serializer.validated_data))
+
+
 class SalesList(APIView):
-    """Api для получения списка продуктов cо скидками"""
+    """
+    Api для получения списка продуктов cо скидками (поддерживает параметр cursor, как каталог).
+    Отдаются скидки из ActiveSale - по одной действующей на продукт.
+    """
 
     serializer_class = SaleSerializer
 
+    @cache_response(SALE, PRODUCT)
     def get(self, request: Request) -> Response:
-        today = date.today()
-        sales = Sale.objects.filter(dateFrom__lte=today, dateTo__gte=today).order_by('dateFrom')
+        if 'cursor' in request.GET:
+            sales, next_cursor = paginate_keyset(
+                Sale.objects.effective(), 'dateFrom', False, request.GET['cursor'], 4)
+            serialized = SaleSerializer(sales, many=True)
+            return Response({'items': serialized.data, 'nextCursor': next_cursor})
+
+        sales = Sale.objects.effective().order_by('dateFrom')
         paginator = Paginator(sales, 4)
         page_number = request.GET.get('currentPage', 1)
         current_page = paginator.page(page_number)
@@ -131,35 +190,44 @@ class SalesList(APIView):
                          'lastPage': paginator.num_pages})
 
 
-def filter_products(request: Request) -> QuerySet[Product]:
-    """Функция для фильтрации списка продуктов"""
+def get_search_query(request: Union[Request, HttpRequest]) -> str:
+    """Функция для получения поискового запроса из параметров или из адреса страницы каталога"""
 
-    name = request.query_params.get('filter[name]')
-    min_price = request.query_params.get('filter[minPrice]')
-    max_price = request.query_params.get('filter[maxPrice]')
-    free_delivery = request.query_params.get('filter[freeDelivery]')
-    available = request.query_params.get('filter[available]')
-    category_id = request.GET.get('category')
-    tags = request.query_params.getlist('tags[]')
+    name = request.GET.get('filter[name]')
     try:
         filter_catalog = str(request.META['HTTP_REFERER'].split('/')[4])
         if filter_catalog.startswith('?filter=') and not name:
             name = unquote(str(filter_catalog).split('=')[1])
     except:
         pass
+    return name
+
+
+def filter_products(request: Union[Request, HttpRequest], tree: Optional[CategoryTree] = None) -> QuerySet[Product]:
+    """
+    Функция для фильтрации списка продуктов (запрос не выполняется).
+    tree - уже полученное дерево категорий, иначе оно берется из кэша при фильтре по категории.
+    """
+
+    name = get_search_query(request)
+    min_price = request.GET.get('filter[minPrice]')
+    max_price = request.GET.get('filter[maxPrice]')
+    free_delivery = request.GET.get('filter[freeDelivery]')
+    available = request.GET.get('filter[available]')
+    category_id = request.GET.get('category')
+    tags = request.GET.getlist('tags[]')
 
     products = Product.objects.all()
 
     if category_id:
-        categories = [obj.pk for obj in Category.objects.filter(parent_id=category_id)]
-        categories.append(int(category_id))
+        categories = (tree or get_category_tree()).descendant_ids(int(category_id))
         products = products.filter(category_id__in=categories)
 
     if tags:
         products = products.filter(tags__in=tags)
 
     if name:
-        products = products.filter(title__icontains=name)
+        products = get_search_backend().filter(products, name)
 
     if min_price:
         products = products.filter(price__gte=min_price)
@@ -178,10 +246,12 @@ def filter_products(request: Request) -> QuerySet[Product]:
     return products
 
 
-def sort_products(request: Request, products: QuerySet[Product]) -> QuerySet[Product]:
-    """Функция для сортировки списка продуктов"""
+def sort_products(request: Union[Request, HttpRequest], products: QuerySet) -> QuerySet:
+    """
+    Функция для сортировки списка продуктов или записей ProductCatalogEntry.
+    Сортировка по отзывам использует поле num_reviews (аннотацию ProductQuerySet.for_list).
+    """
 
-    products = products.annotate(num_reviews=Count('reviews'))
     sort_by = request.GET.get('sort', 'pk')
     sort_type = request.GET.get('sortType', 'inc')
 
@@ -198,21 +268,56 @@ def sort_products(request: Request, products: QuerySet[Product]) -> QuerySet[Pro
     return products
 
 
+def catalog_products(request: Union[Request, HttpRequest],
+                     tree: Optional[CategoryTree] = None) -> Tuple[QuerySet, Type[Serializer], str]:
+    """
+    Функция для получения отфильтрованного запроса каталога, его сериализатора и колонки с id продукта
+    (из таблицы ProductCatalogEntry, если включена настройка CATALOG_READ_MODEL).
+    """
+    products = filter_products(request, tree)
+    if settings.CATALOG_READ_MODEL:
+        return ProductCatalogEntry.objects.filter(product__in=products.values('pk')), ProductCatalogEntrySerializer, \
+            'product_id'
+    return products.for_list(), ProductListSerializer, 'id'
+
+
+def order_catalog(request: Union[Request, HttpRequest], products: QuerySet, rank_column: str) -> QuerySet:
+    """Функция для сортировки каталога: по релевантности при поиске без sort (или с sort=relevance), иначе по sort."""
+    search_query = get_search_query(request)
+    if search_query and request.GET.get('sort', 'relevance') == 'relevance':
+        return get_search_backend().rank(products, search_query, rank_column).order_by('-search_rank', 'pk')
+    return sort_products(request, products)
+
+
 class ProductListView(APIView):
-    """Api для получения списка продуктов для каталога"""
+    """
+    Api для получения списка продуктов для каталога.
+    При поиске без параметра sort (или с sort=relevance) продукты упорядочены по релевантности.
+    С параметром cursor (пустым для первой страницы) отдает страницы по ключу сортировки
+    без подсчета общего количества: {"items": [...], "nextCursor": "..."}.
+    """
 
     serializer_class = ProductListSerializer
 
     def get(self, request: Request, *args, **kwargs) -> Response:
 
-        products = filter_products(request)
-        products = sort_products(request, products)
+        products, serializer_class, rank_column = catalog_products(request)
+        limit = page_limit(request, 20)
+
+        if 'cursor' in request.GET:
+            field = KEYSET_SORT_FIELDS.get(request.GET.get('sort'), 'pk')
+            descending = request.GET.get('sortType') == 'dec'
+            items, next_cursor = paginate_keyset(products, field, descending, request.GET['cursor'], limit)
+            serializer = serializer_class(items, many=True)
+            return Response({'items': serializer.data, 'nextCursor': next_cursor})
+
+        products = order_catalog(request, products, rank_column)
 
-        paginator = Paginator(products, int(request.GET.get('limit', 20)))
+        paginator = Paginator(products, limit)
         page_number = request.GET.get('currentPage', 1)
         paginated_queryset = paginator.page(page_number)
 
-        serializer = ProductListSerializer(paginated_queryset, many=True)
+        serializer = serializer_class(paginated_queryset, many=True)
 
         return Response({"items": serializer.data, 'currentPage': paginated_queryset.number,
                          'lastPage': paginator.num_pages})
@@ -0,0 +1,46 @@
+# Generated by Django 4.2 on 2026-10-18 19:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import users.models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Profile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone', models.CharField(blank=True, default='', max_length=50)),
+                ('fullName', models.CharField(blank=True, default='', max_length=256)),
+                ('email', models.EmailField(blank=True, default='', max_length=128)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Profile',
+                'verbose_name_plural': 'Profiles',
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Avatar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.FileField(upload_to=users.models.profile_avatars_directory_path)),
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='users.profile', verbose_name='avatar')),
+            ],
+            options={
+                'verbose_name': 'Avatar',
+                'verbose_name_plural': 'Avatars',
+                'ordering': ['pk'],
+            },
+        ),
+    ]